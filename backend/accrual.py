@@ -0,0 +1,82 @@
+"""
+Fixed-point accrual math for StreamFi.
+Amounts are integers in STRM base units (2 decimals, so 1 STRM = 100), rates are
+base units per second and timestamps are integer nanoseconds from time.time_ns().
+A session accrues floor(elapsed_ns * rate / 1e9) base units since it started, plus
+whatever it had carried over from earlier rates; what can still be claimed is that
+minus everything already claimed. This is the
+same integer formula as contracts/streamfi.py (elapsed * rate), at nanosecond
+rather than whole-second resolution, so balances are exact and reproducible.
+"""
+
+import time
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+
+# STRM is an ASA with 2 decimals
+STRM_DECIMALS = 2
+BASE_UNITS_PER_STRM = 10 ** STRM_DECIMALS
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class InsufficientAccrual(Exception):
+    """A claim asked for more than the session has accrued."""
+
+    def __init__(self, requested, claimable):
+        super().__init__(f"Requested {requested} base units but only {claimable} have accrued")
+        self.requested = requested
+        self.claimable = claimable
+
+
+def now_ns():
+    """Current wall-clock time in integer nanoseconds."""
+    return time.time_ns()
+
+
+def to_base_units(amount):
+    """
+    Convert a STRM amount (number or numeric string) to base units, rounding down to
+    the token's precision. Goes through Decimal(str(...)) so 1.15 becomes 115, not 114.
+    """
+    try:
+        value = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValueError(f"Invalid STRM amount: {amount!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid STRM amount: {amount!r}")
+    return int((value * BASE_UNITS_PER_STRM).to_integral_value(rounding=ROUND_DOWN))
+
+
+def to_strm(base_units):
+    """Base units as a STRM number for JSON responses (exact to 2 decimals)."""
+    return base_units / BASE_UNITS_PER_STRM
+
+
+def accrued(rate, start_ns, at_ns):
+    """
+    Base units accrued at `rate` (base units/second) between start_ns and at_ns.
+    Splitting elapsed time into whole seconds and a remainder keeps every product far
+    below 2**63, so the same expression can run inside SQLite without overflowing.
+    """
+    elapsed = max(at_ns - start_ns, 0)
+    seconds, remainder = divmod(elapsed, NS_PER_SECOND)
+    return seconds * rate + remainder * rate // NS_PER_SECOND
+
+
+def claimable(session, at_ns):
+    """What a session can still claim: everything accrued minus everything already claimed."""
+    total = session["carried"] + accrued(session["rate"], session["start_ns"], at_ns)
+    return max(total - session["total_claimed"], 0)
+
+
+def change_rate(session, rate, at_ns):
+    """
+    The session moved to `rate` from at_ns on: what accrued at the old rate until then
+    is banked in carried and accrual restarts at at_ns. Returns a new session dict.
+    """
+    return {
+        "start_ns": at_ns,
+        "rate": rate,
+        "total_claimed": session["total_claimed"],
+        "carried": session["carried"] + accrued(session["rate"], session["start_ns"], at_ns),
+    }
@@ -0,0 +1,252 @@
+"""
+Pooled, keep-alive algod client for StreamFi.
+The SDK's AlgodClient opens a new HTTPS connection (and TLS handshake) for every
+call and has no retry logic. PooledAlgodClient keeps connections alive in a small
+pool, applies per-call timeouts, retries idempotent reads with jittered backoff,
+and counts how often connections are reused.
+"""
+
+import http.client
+import json
+import queue
+import random
+import socket
+import threading
+import time
+from urllib import parse
+
+from algosdk import constants, error
+from algosdk.v2client import algod
+
+# Long-poll endpoint: algod holds the request open until the next round arrives
+WAIT_FOR_BLOCK_PATH = "/status/wait-for-block-after/"
+
+# Errors that mean a pooled keep-alive connection was closed by the server while idle (or,
+# after a request was written, that the server dropped it at some unknown point)
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# Status codes worth retrying for reads
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class AlgodConnectionError(error.AlgodHTTPError):
+    """
+    The connection to algod could not be opened, so the request was never sent.
+    Unlike a timeout or a 5xx, this is safe to resend elsewhere even for a POST.
+    """
+
+
+def submission_rejected(e):
+    """
+    True when a failed transaction submission provably did not reach the network: the
+    connection was never opened, or the node answered 4xx (invalid, or rate limited).
+    After a timeout, a 5xx or a dropped response the node may have accepted it.
+    """
+    if isinstance(e, AlgodConnectionError):
+        return True
+    return isinstance(e, error.AlgodHTTPError) and e.code is not None and 400 <= e.code < 500
+
+
+class _NotConnected(Exception):
+    # Raised by _send when opening the connection fails, before any bytes were written
+    pass
+
+
+class PooledAlgodClient(algod.AlgodClient):
+    """
+    AlgodClient with a persistent connection pool.
+
+    timeout: seconds per call (long-polls on wait-for-block get `long_poll_timeout`).
+    retries: extra attempts for GET requests on connection errors, timeouts, 429 and 5xx.
+    backoff: base delay for retries; each attempt doubles it and adds random jitter.
+    """
+
+    def __init__(self, algod_token, algod_address, headers=None, pool_size=10,
+                 timeout=10, long_poll_timeout=70, retries=3, backoff=0.2):
+        super().__init__(algod_token, algod_address, headers)
+        url = parse.urlsplit(algod_address)
+        self._scheme = url.scheme or "http"
+        self._host = url.hostname
+        self._port = url.port
+        self._base_path = url.path.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.long_poll_timeout = long_poll_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+
+    def stats(self):
+        """Connection reuse and retry counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["idle_connections"] = self._pool.qsize()
+        return stats
+
+    def close(self):
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _acquire(self, timeout):
+        try:
+            conn = self._pool.get_nowait()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            self._count("connections_reused")
+            return conn, True
+        except queue.Empty:
+            pass
+        return self._new_connection(timeout), False
+
+    def _new_connection(self, timeout):
+        connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+        self._count("connections_opened")
+        return connection_class(self._host, self._port, timeout=timeout)
+
+    def _release(self, conn, response):
+        if response.will_close:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None,
+                      response_format="json", timeout=None):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header[constants.algod_auth_header] = self.algod_token
+
+        if timeout is None:
+            timeout = self.long_poll_timeout if requrl.startswith(WAIT_FOR_BLOCK_PATH) else self.timeout
+
+        path = requrl if requrl in constants.unversioned_paths else algod.api_version_path_prefix + requrl
+        if params:
+            path = path + "?" + parse.urlencode(params)
+        path = self._base_path + path
+
+        # Only reads are retried; a POST may already have been applied by the node
+        attempts = 1 + (self.retries if method.upper() == "GET" else 0)
+        self._count("requests")
+        for attempt in range(attempts):
+            try:
+                status, body = self._send(method, path, data, header, timeout)
+            except _NotConnected as e:
+                if attempt + 1 >= attempts:
+                    self._count("errors")
+                    raise AlgodConnectionError(f"algod connection failed: {e.__cause__}") from e.__cause__
+            except (socket.timeout, TimeoutError) as e:
+                self._count("timeouts")
+                if attempt + 1 >= attempts:
+                    self._count("errors")
+                    raise error.AlgodHTTPError(f"algod request timed out after {timeout}s: {requrl}") from e
+            except (OSError, http.client.HTTPException) as e:
+                if attempt + 1 >= attempts:
+                    self._count("errors")
+                    raise error.AlgodHTTPError(f"algod connection failed: {e}") from e
+            else:
+                if status in RETRYABLE_STATUS and attempt + 1 < attempts:
+                    pass  # Fall through to the backoff below
+                else:
+                    return self._parse(status, body, response_format)
+            self._count("retries")
+            time.sleep(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff))
+
+    def _send(self, method, path, data, header, timeout):
+        # A GET dropped on a reused connection is resent once on a fresh one. Anything else is
+        # raised: a POST body that was written may have been accepted before the connection died
+        conn, reused = self._acquire(timeout)
+        if conn.sock is None:
+            # Connect explicitly so a failure here is known to have sent nothing
+            try:
+                conn.connect()
+            except Exception as e:
+                conn.close()
+                raise _NotConnected() from e
+        try:
+            conn.request(method, path, body=data, headers=header)
+            response = conn.getresponse()
+            body = response.read()
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused or method.upper() != "GET":
+                raise
+            # The server dropped an idle keep-alive connection; reading again is harmless
+            conn = self._new_connection(timeout)
+            try:
+                conn.request(method, path, body=data, headers=header)
+                response = conn.getresponse()
+                body = response.read()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn, response)
+        return response.status, body
+
+    @staticmethod
+    def _parse(status, body, response_format):
+        if status >= 400:
+            text = body.decode("utf-8", errors="replace")
+            message, payload = text, {}
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                pass
+            if isinstance(payload, dict):
+                message = payload.get("message", text)
+            else:
+                payload = {}
+            raise error.AlgodHTTPError(message, status, payload.get("data"))
+        if response_format != "json":
+            return body
+        if not body and status == 200:
+            # Some algod responses return 200 with an empty body
+            return {}
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+
+
+_shared_clients = {}
+_shared_lock = threading.Lock()
+
+
+def create_algod_client(algod_token, algod_address, **options):
+    """
+    Return the process-wide pooled client for this address and token.
+    The backend and the contracts/ scripts all go through here so connections are reused.
+    """
+    key = (algod_address, algod_token)
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = PooledAlgodClient(algod_token, algod_address, **options)
+            _shared_clients[key] = client
+        return client
@@ -0,0 +1,204 @@
+"""
+Multi-node algod routing and failover for StreamFi.
+Spreads algod traffic over several endpoints: nodes are health-probed through
+status(), calls go to the lowest-latency healthy node, and a call that fails
+because a node is down, slow or rate-limiting is retried on the next node.
+Writes (transaction submissions) move to another node only when the first one
+provably did not take them.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from algosdk import error
+from algosdk.v2client import algod
+
+from algod_pool import AlgodConnectionError, create_algod_client
+from log_config import log_event
+
+# HTTP codes that say "this node cannot serve you right now" rather than "bad request"
+FAILOVER_STATUS = {429, 500, 502, 503, 504}
+
+
+class NodeState:
+    """Health and latency bookkeeping for one algod endpoint."""
+
+    def __init__(self, address, client):
+        self.address = address
+        self.client = client
+        self.healthy = True
+        self.latency = None  # Smoothed probe/request latency in seconds
+        self.last_round = None
+        self.requests = 0
+        self.failures = 0
+        self.selected = 0
+
+    def observe(self, seconds, alpha=0.3):
+        self.latency = seconds if self.latency is None else (1 - alpha) * self.latency + alpha * seconds
+
+
+class AlgodRouter(algod.AlgodClient):
+    """
+    AlgodClient that routes every call to the best of several nodes.
+
+    Every SDK method funnels through algod_request, so overriding it is enough to route
+    status(), suggested_params(), send_transaction() and the rest. Failed calls are
+    retried on the remaining nodes in latency order; 4xx responses (e.g. an invalid
+    transaction) are returned as-is because another node would reject them too.
+    A POST fails over only if its connection could not be opened or the node answered
+    429. After a timeout or a 5xx the node may already have accepted the transaction,
+    so the error goes to the caller instead.
+    """
+
+    def __init__(self, algod_token, addresses, probe_interval=10, max_lag_rounds=2, **client_options):
+        if not addresses:
+            raise ValueError("AlgodRouter needs at least one algod address")
+        super().__init__(algod_token, addresses[0])
+        self.nodes = [NodeState(address, create_algod_client(algod_token, address, **client_options))
+                      for address in addresses]
+        self.probe_interval = probe_interval
+        self.max_lag_rounds = max_lag_rounds  # Nodes further behind the best round count as unhealthy
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._probed = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    # -- probing -------------------------------------------------------------
+
+    def probe(self):
+        """Call status() on every node in parallel and update health and latency."""
+        def probe_node(node):
+            started = time.monotonic()
+            try:
+                status = node.client.status()
+            except Exception:
+                with self._lock:
+                    node.healthy = False
+                    node.failures += 1
+                return
+            with self._lock:
+                node.observe(time.monotonic() - started)
+                node.last_round = status.get("last-round")
+                node.healthy = True
+
+        threads = [threading.Thread(target=probe_node, args=(node,), daemon=True) for node in self.nodes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self._lock:
+            # A node that answers but is stuck behind the others is not safe to route to
+            rounds = [node.last_round for node in self.nodes if node.healthy and node.last_round is not None]
+            if rounds:
+                best = max(rounds)
+                for node in self.nodes:
+                    if node.healthy and node.last_round is not None and best - node.last_round > self.max_lag_rounds:
+                        node.healthy = False
+            self._probed = True
+
+    def start(self):
+        """Start periodic background probing (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="algod-router-probe", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                log_event("algod_probe_failed", level=logging.WARNING, error=e)
+            self._stop.wait(self.probe_interval)
+
+    # -- routing -------------------------------------------------------------
+
+    def ranked_nodes(self):
+        """Nodes in routing order: healthy ones by latency first, then the rest as a last resort."""
+        if not self._probed:
+            self.probe()
+        with self._lock:
+            unknown = float("inf")
+            healthy = sorted((n for n in self.nodes if n.healthy), key=lambda n: n.latency if n.latency is not None else unknown)
+            unhealthy = [n for n in self.nodes if not n.healthy]
+            return healthy + unhealthy
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None,
+                      response_format="json", timeout=None):
+        last_error = None
+        for attempt, node in enumerate(self.ranked_nodes()):
+            with self._lock:
+                node.requests += 1
+                if attempt == 0:
+                    node.selected += 1
+                else:
+                    self.failovers += 1
+            started = time.monotonic()
+            try:
+                result = node.client.algod_request(
+                    method, requrl, params=params, data=data, headers=headers,
+                    response_format=response_format, timeout=timeout
+                )
+            except error.AlgodHTTPError as e:
+                if e.code is not None and e.code not in FAILOVER_STATUS:
+                    raise  # The request itself is bad; another node would say the same
+                with self._lock:
+                    node.failures += 1
+                    node.healthy = False
+                if method.upper() != "GET" and not (isinstance(e, AlgodConnectionError) or e.code == 429):
+                    # The node may have taken the transaction: resending it elsewhere would answer
+                    # "already in ledger", and the caller would treat a landed claim as failed
+                    raise
+                last_error = e
+                continue
+            if not requrl.startswith("/status/wait-for-block-after/"):
+                # Long-polls take a round by design and would skew the latency estimate
+                with self._lock:
+                    node.observe(time.monotonic() - started)
+            return result
+        raise last_error
+
+    def stats(self):
+        """Per-node health, latency and routing counters."""
+        with self._lock:
+            return {
+                "failovers": self.failovers,
+                "nodes": [
+                    {
+                        "address": node.address,
+                        "healthy": node.healthy,
+                        "latency_ms": round(node.latency * 1000, 2) if node.latency is not None else None,
+                        "last_round": node.last_round,
+                        "requests": node.requests,
+                        "selected": node.selected,
+                        "failures": node.failures,
+                    }
+                    for node in self.nodes
+                ],
+            }
+
+
+def algod_addresses(default_address):
+    """Algod endpoints from STREAMFI_ALGOD_ADDRESSES (comma separated), else the single default."""
+    configured = os.environ.get("STREAMFI_ALGOD_ADDRESSES", "")
+    addresses = [address.strip() for address in configured.split(",") if address.strip()]
+    return addresses or [default_address]
+
+
+def create_routed_client(algod_token, default_address, **options):
+    """
+    Client for the configured algod endpoints: a plain pooled client for one node,
+    an AlgodRouter with health probing and failover for several.
+    """
+    addresses = algod_addresses(default_address)
+    if len(addresses) == 1:
+        return create_algod_client(algod_token, addresses[0], **options)
+    return AlgodRouter(algod_token, addresses, **options)
@@ -0,0 +1,13 @@
+"""
+ASGI entry point for serving the Flask app under an ASGI server.
+
+    uvicorn asgi:app --workers 4 --timeout-graceful-shutdown 30
+
+The WSGI app runs in the ASGI server's thread pool via asgiref's adapter.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from server import create_app
+
+app = WsgiToAsgi(create_app())
@@ -0,0 +1,624 @@
+"""
+Asyncio-native variant of the StreamFi claim and balance API.
+Serves /api/login, /api/balance, /api/balance/stream, /api/claim and /api/logout (plus
+/api/health) with the same JSON contract as server.py, so frontend/script_algorand.js
+works unchanged. The app
+is built on Quart, and algod is reached through httpx.AsyncClient. A claim waiting for
+confirmation is a suspended coroutine instead of a blocked thread, so one process can
+hold thousands of them, and the same goes for open balance event streams. A single
+long-poll on status_after_block and one read of each new block's transaction IDs
+resolve every waiting claim once per round.
+
+    cd backend
+    hypercorn async_server:app --bind 0.0.0.0:5000
+    uvicorn async_server:app --port 5000
+
+Async claims (202 + status URL), idempotency keys, dry runs and the treasury check stay
+on the Flask server. Use the in-memory session store (the default), or keep
+STREAMFI_SESSION_DB on a local disk: SQLite calls run on the event loop. With
+STREAMFI_SESSION_DB shared with gunicorn workers, streams served here also receive the
+workers' session events, so a proxy can send /api/balance/stream here and the rest there.
+"""
+
+import asyncio
+import base64
+import copy
+import logging
+import os
+import time
+
+import httpx
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError, ConfirmationTimeoutError
+from algosdk.transaction import AssetTransferTxn, SuggestedParams
+from quart import Quart, jsonify, make_response, request
+from quart_cors import cors
+
+from accrual import BASE_UNITS_PER_STRM, InsufficientAccrual, NS_PER_SECOND, claimable, now_ns, to_base_units, to_strm
+from algod_pool import AlgodConnectionError, submission_rejected
+from block_follower import TXIDS_FAILURES_BEFORE_FALLBACK
+from config import (
+    ALGOD_ADDRESS, ALGOD_TOKEN, COMPANY_ADDRESS, CONFIRMATION_ROUNDS,
+    EMPLOYEE_WALLET_ADDRESS, EXPLORER_TX_URL, SSE_KEEPALIVE_SECONDS, STRM_ASSET_ID
+)
+from log_config import configure_logging, log_event
+from roster import create_roster, rate_updates
+from session_events import create_event_broker, format_sse, session_payload
+from session_store import create_session_store
+from signer_service import LocalSigner, create_signer
+
+# Network, wallets, asset and confirmation rounds come from config.py (shared with server.py)
+
+# Connections kept open to algod; calls beyond this wait for a free connection instead of a thread
+ALGOD_MAX_CONNECTIONS = int(os.environ.get("STREAMFI_ALGOD_CONNECTIONS", "100"))
+
+# Wall-clock cap on the CONFIRMATION_ROUNDS wait, so a claim still gets an answer when algod
+# stops producing rounds
+CONFIRMATION_TIMEOUT = float(os.environ.get("STREAMFI_CONFIRMATION_TIMEOUT", "30"))
+
+
+class AsyncAlgodClient:
+    """
+    The algod calls the claim path makes, over one pooled httpx.AsyncClient.
+    Errors are raised as algosdk's AlgodHTTPError, like the synchronous client, and as
+    AlgodConnectionError when no connection could be made (nothing was sent).
+    """
+
+    def __init__(self, address, token="", timeout=10.0, max_connections=ALGOD_MAX_CONNECTIONS):
+        headers = {"X-Algo-API-Token": token} if token else {}
+        self._http = httpx.AsyncClient(
+            base_url=address.rstrip("/") + "/v2",
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def _request(self, method, path, timeout=None, **kwargs):
+        try:
+            response = await self._http.request(method, path, timeout=timeout or self._http.timeout, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            raise AlgodConnectionError(f"{method} {path}: {e}")
+        except httpx.HTTPError as e:
+            raise AlgodHTTPError(f"{method} {path}: {e}")
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise AlgodHTTPError(message, code=response.status_code)
+        return response.json()
+
+    async def status(self):
+        return await self._request("GET", "/status")
+
+    async def status_after_block(self, round_num):
+        # algod holds the request for up to a minute when no round arrives
+        return await self._request("GET", f"/status/wait-for-block-after/{round_num}", timeout=70.0)
+
+    async def suggested_params(self):
+        res = await self._request("GET", "/transactions/params")
+        return SuggestedParams(
+            res["fee"],
+            res["last-round"],
+            res["last-round"] + 1000,
+            res["genesis-hash"],
+            res["genesis-id"],
+            False,
+            res["consensus-version"],
+            res["min-fee"],
+        )
+
+    async def send_transaction(self, signed_txn):
+        """Submit one signed transaction and return its ID."""
+        body = base64.b64decode(encoding.msgpack_encode(signed_txn))
+        res = await self._request(
+            "POST", "/transactions", content=body, headers={"Content-Type": "application/x-binary"}
+        )
+        return res["txId"]
+
+    async def pending_transaction_info(self, tx_id):
+        return await self._request("GET", f"/transactions/pending/{tx_id}")
+
+    async def get_block_txids(self, round_num):
+        return await self._request("GET", f"/blocks/{round_num}/txids")
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class AsyncParamsCache:
+    """Suggested params reused for `max_age` seconds; concurrent misses share one fetch."""
+
+    def __init__(self, algod_client, max_age=60):
+        self.algod_client = algod_client
+        self.max_age = max_age
+        self._params = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self):
+        if self._params is not None and time.monotonic() - self._fetched_at < self.max_age:
+            self.hits += 1
+            return copy.copy(self._params)
+        async with self._lock:
+            # Another coroutine may have fetched while this one waited for the lock
+            if self._params is None or time.monotonic() - self._fetched_at >= self.max_age:
+                self.misses += 1
+                self._params = await self.algod_client.suggested_params()
+                self._fetched_at = time.monotonic()
+        return copy.copy(self._params)
+
+    def invalidate(self):
+        self._params = None
+
+
+class LoopQueue:
+    """
+    Event queue for a stream coroutine that session_events can fill from any thread
+    (the SQLite relay thread, or the event loop itself): put_nowait() hands the event
+    to the loop, which drops it if the subscriber has fallen `max_queue` events behind.
+    """
+
+    def __init__(self, loop, max_queue=100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def put_nowait(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            pass  # The loop has shut down; the stream is gone with it
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            pass  # Slow consumer; it resyncs from the next full session event
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class RoundFollower:
+    """
+    One status_after_block long-poll per process, and one read of each new block's
+    transaction IDs (GET /v2/blocks/{round}/txids) that resolves every claim waiting in
+    the process, as block_follower.BlockFollower does for server.py. watch() returns an
+    asyncio future keyed by the transaction ID, so algod load grows with rounds, not with
+    rounds times waiting claims. Against an algod without the txids endpoint, the
+    outstanding transactions' pending info is read once per round instead.
+    """
+
+    def __init__(self, algod_client):
+        self.algod_client = algod_client
+        self.round = None  # Last round whose transactions have been matched
+        self._watches = {}  # tx_id -> {"future", "wait_rounds", "last_round"}
+        self._txids_supported = True
+        self._txids_failures = 0
+        self._task = None
+        self.block_calls = 0
+        self.pending_calls = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def current(self):
+        """The latest round seen (fetched once if the follower has not seen one yet)."""
+        if self.round is None:
+            self.round = (await self.algod_client.status())["last-round"]
+        return self.round
+
+    def watch(self, tx_id, wait_rounds=CONFIRMATION_ROUNDS):
+        """
+        Future resolved with {"txid", "confirmed-round"} once `tx_id` is in a block; it fails
+        with ConfirmationTimeoutError after `wait_rounds` rounds, or with an Exception carrying
+        the pool error. Watch before submitting so the landing round cannot be missed.
+        """
+        entry = self._watches.get(tx_id)
+        if entry is None:
+            entry = {
+                "future": asyncio.get_running_loop().create_future(),
+                "wait_rounds": wait_rounds,
+                "last_round": None if self.round is None else self.round + wait_rounds,
+            }
+            self._watches[tx_id] = entry
+        self.start()
+        return entry["future"]
+
+    def unwatch(self, tx_id):
+        """Stop following `tx_id` (it was never sent, or its waiter gave up)."""
+        entry = self._watches.pop(tx_id, None)
+        if entry is not None and not entry["future"].done():
+            entry["future"].cancel()
+
+    async def _run(self):
+        while True:
+            try:
+                last = await self.current()
+                for entry in self._watches.values():
+                    if entry["last_round"] is None:
+                        entry["last_round"] = last + entry["wait_rounds"]
+                status = await self.algod_client.status_after_block(last)
+                for round_num in range(last + 1, status["last-round"] + 1):
+                    await self._match_round(round_num)
+                    self.round = round_num
+                    await self._expire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_event("round_follow_failed", level=logging.WARNING, error=e)
+                await asyncio.sleep(1)
+
+    async def _match_round(self, round_num):
+        if not self._watches:
+            return
+        outstanding = list(self._watches)
+        if self._txids_supported:
+            try:
+                self.block_calls += 1
+                txids = (await self.algod_client.get_block_txids(round_num)).get("blockTxids") or []
+            except AlgodHTTPError as e:
+                if e.code not in (404, 501):
+                    raise
+                # A lagging node may not have the round yet; give up on the endpoint only if it keeps failing
+                self._txids_failures += 1
+                if self._txids_failures >= TXIDS_FAILURES_BEFORE_FALLBACK:
+                    self._txids_supported = False
+                    log_event("block_txids_unavailable", level=logging.INFO, error=e)
+            else:
+                self._txids_failures = 0
+                for tx_id in set(txids).intersection(outstanding):
+                    self._resolve(tx_id, round_num)
+                return
+        for tx_id in outstanding:
+            await self._check_pending(tx_id)
+
+    async def _check_pending(self, tx_id):
+        self.pending_calls += 1
+        try:
+            info = await self.algod_client.pending_transaction_info(tx_id)
+        except AlgodHTTPError as e:
+            if e.code == 404:
+                return  # Not in the pool: a later round or the expiry decides
+            raise
+        if info.get("confirmed-round", 0) > 0:
+            self._resolve(tx_id, info["confirmed-round"])
+        elif info.get("pool-error"):
+            self._fail(tx_id, Exception(f"Transaction rejected: {info['pool-error']}"))
+
+    async def _expire(self):
+        expired = [
+            (tx_id, e) for tx_id, e in self._watches.items()
+            if e["last_round"] is not None and self.round >= e["last_round"]
+        ]
+        for tx_id, entry in expired:
+            # Last look before giving up (also reports a pool error instead of a plain timeout)
+            await self._check_pending(tx_id)
+            self._fail(tx_id, ConfirmationTimeoutError(
+                f"Transaction {tx_id} not confirmed after {entry['wait_rounds']} rounds"
+            ))
+
+    def _resolve(self, tx_id, round_num):
+        entry = self._watches.pop(tx_id, None)
+        if entry is not None and not entry["future"].done():
+            entry["future"].set_result({"txid": tx_id, "confirmed-round": round_num})
+
+    def _fail(self, tx_id, error):
+        entry = self._watches.pop(tx_id, None)
+        if entry is not None and not entry["future"].done():
+            entry["future"].set_exception(error)
+
+    def stats(self):
+        return {
+            "round": self.round,
+            "watching": len(self._watches),
+            "block_calls": self.block_calls,
+            "pending_calls": self.pending_calls,
+            "txids_endpoint": self._txids_supported,
+        }
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+# Async algod client, cached params and the shared round follower (created in the serving loop)
+algod_client = None
+params_cache = None
+round_follower = None
+
+# Signs company transactions through the signer service, as in server.py
+signer = create_signer()
+
+# Sessions (in-memory unless STREAMFI_SESSION_DB is set), their change events and the
+# hot-reloaded roster, as in server.py
+session_store = create_session_store()
+session_events = create_event_broker()
+
+def publish_session(name, session):
+    if session is not None:
+        session_events.publish(name, "session", session_payload(session))
+
+def apply_roster_changes(employees):
+    """Move active sessions to the roster's rates from now on (see server.apply_roster_changes)."""
+    now = now_ns()
+    updates = rate_updates(employees, session_store.all())
+    for name, rate in updates:
+        publish_session(name, session_store.change_rate(name, rate, now))
+    if updates:
+        log_event("roster_rates_applied", changed=len(updates), stopped=sum(1 for _, rate in updates if rate == 0))
+
+roster = create_roster(on_change=apply_roster_changes)
+
+app = cors(Quart(__name__))
+
+
+@app.before_serving
+async def startup():
+    global algod_client, params_cache, round_follower
+    configure_logging()
+    algod_client = AsyncAlgodClient(ALGOD_ADDRESS, ALGOD_TOKEN)
+    params_cache = AsyncParamsCache(algod_client)
+    round_follower = RoundFollower(algod_client)
+    round_follower.start()
+    roster.start()
+
+
+@app.after_serving
+async def shutdown():
+    roster.stop()
+    await round_follower.stop()
+    await algod_client.aclose()
+
+
+async def wait_for_confirmation(tx_id, wait_rounds=CONFIRMATION_ROUNDS, timeout=CONFIRMATION_TIMEOUT):
+    """
+    Await `tx_id` through the shared round follower (see RoundFollower.watch). Raises
+    ConfirmationTimeoutError after `wait_rounds` rounds, or after `timeout` seconds when
+    rounds stop arriving. Returns {"txid", "confirmed-round"}.
+    """
+    try:
+        return await asyncio.wait_for(round_follower.watch(tx_id, wait_rounds), timeout)
+    except asyncio.TimeoutError:
+        raise ConfirmationTimeoutError(f"Transaction {tx_id} not confirmed within {timeout:g}s")
+    finally:
+        round_follower.unwatch(tx_id)
+
+
+async def sign(txn):
+    # Local signing is microseconds of CPU; the signer service is a blocking socket call
+    if isinstance(signer, LocalSigner):
+        return signer.sign(txn)
+    return await asyncio.to_thread(signer.sign, txn)
+
+
+@app.route('/api/health', methods=['GET'])
+async def health():
+    """Health check endpoint (same fields the frontend reads from server.py)."""
+    return jsonify({
+        "status": "ok",
+        "network": "testnet",
+        "server": "async",
+        "company_wallet": COMPANY_ADDRESS,
+        "employee_wallet": EMPLOYEE_WALLET_ADDRESS,
+        "asset_id": STRM_ASSET_ID,
+        "roster": roster.stats(),
+        "current_round": round_follower.round if round_follower else None,
+        "round_follower": round_follower.stats() if round_follower else None
+    })
+
+
+@app.route('/api/login', methods=['POST'])
+async def login():
+    """Start a streaming session for a roster employee (see server.login)."""
+    try:
+        data = await request.get_json()
+        employee_name = data.get('name')
+
+        employee = roster.get(employee_name)
+        if employee is None:
+            return jsonify({"error": "Employee not found"}), 404
+
+        publish_session(employee_name, session_store.start(employee_name, employee.rate_base_units, now_ns()))
+        log_event("login", employee=employee_name, rate=employee.rate)
+
+        return jsonify({
+            "success": True,
+            "rate": employee.rate,
+            "designation": employee.designation
+        })
+
+    except Exception as e:
+        log_event("login_failed", level=logging.ERROR, error=e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/balance', methods=['POST'])
+async def get_balance():
+    """Claimable balance for an employee (see server.get_balance)."""
+    try:
+        data = await request.get_json()
+        session = session_store.get(data.get('name'))
+        if session is None:
+            return jsonify({"balance": 0})
+
+        now = now_ns()
+        balance = claimable(session, now)
+        return jsonify({
+            "balance": to_strm(balance),
+            "balance_base_units": balance,
+            "elapsed_seconds": round((now - session["start_ns"]) / NS_PER_SECOND, 2)
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/balance/stream', methods=['GET'])
+async def balance_stream():
+    """
+    Server-Sent Events stream of an employee's session (see server.balance_stream).
+    Each open stream is a suspended coroutine, so there is no per-process stream limit here.
+    """
+    employee_name = request.args.get('name')
+    if employee_name not in roster:
+        return jsonify({"error": "Employee not found"}), 404
+
+    # Subscribe before reading the snapshot so no change can slip in between
+    events = session_events.subscribe(employee_name, LoopQueue(asyncio.get_running_loop()))
+
+    async def generate():
+        try:
+            session = session_store.get(employee_name)
+            if session is not None:
+                yield format_sse("session", session_payload(session))
+            else:
+                yield format_sse("logout", {"total_claimed": 0})
+            while True:
+                try:
+                    event, data = await events.get(SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            # Runs when the client disconnects and the generator is cancelled
+            session_events.unsubscribe(employee_name, events)
+
+    response = await make_response(
+        generate(),
+        {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.timeout = None  # Streams stay open for as long as the dashboard does
+    return response
+
+
+@app.route('/api/claim', methods=['POST'])
+async def claim_tokens():
+    """
+    Transfer claimed STRM from the company wallet to the employee collective wallet and
+    wait for confirmation (see server.claim_tokens). The amount is reserved against the
+    session before the transfer is built, and returned only if the transfer provably never
+    reached the network (see algod_pool.submission_rejected).
+    """
+    employee_name = None
+    try:
+        data = await request.get_json()
+        employee_name = data.get('name')
+
+        if employee_name not in roster:
+            return jsonify({"error": "Employee not found"}), 404
+        try:
+            amount_base_units = to_base_units(data.get('amount', 0))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if amount_base_units < BASE_UNITS_PER_STRM:
+            return jsonify({"error": "Minimum 1 STRM required"}), 400
+
+        try:
+            session = session_store.claim(employee_name, amount_base_units, now_ns())
+            publish_session(employee_name, session)
+        except InsufficientAccrual as e:
+            return jsonify({
+                "error": "Amount exceeds accrued balance",
+                "claimable": to_strm(e.claimable),
+                "claimable_base_units": e.claimable
+            }), 400
+        if session is None:
+            return jsonify({"error": "No active streaming session"}), 400
+
+        amount = to_strm(amount_base_units)
+        claim_id = os.urandom(16).hex()
+        log_event("claim_started", claim_id=claim_id, employee=employee_name, amount=amount, mode="asyncio")
+
+        try:
+            txn = AssetTransferTxn(
+                sender=COMPANY_ADDRESS,
+                sp=await params_cache.get(),
+                receiver=EMPLOYEE_WALLET_ADDRESS,
+                amt=amount_base_units,
+                index=STRM_ASSET_ID,
+                note=claim_id.encode()
+            )
+            signed_txn = await sign(txn)
+        except Exception:
+            # Nothing was signed, so nothing can reach the network: the reserved amount goes back
+            publish_session(employee_name, session_store.release(employee_name, amount_base_units))
+            raise
+
+        tx_id = txn.get_txid()
+        round_follower.watch(tx_id)  # Before sending, so the round it lands in cannot be missed
+        try:
+            await algod_client.send_transaction(signed_txn)
+        except Exception as e:
+            if submission_rejected(e):
+                # algod was never reached or refused the transfer, so the reservation goes back
+                round_follower.unwatch(tx_id)
+                publish_session(employee_name, session_store.release(employee_name, amount_base_units))
+                params_cache.invalidate()
+                raise
+            # Timeout, 5xx or dropped response: the transfer may have landed, so keep the
+            # reservation and let the confirmation wait decide
+            log_event("claim_submit_uncertain", level=logging.WARNING, claim_id=claim_id, tx_id=tx_id, error=e)
+        log_event("claim_submitted", claim_id=claim_id, tx_id=tx_id)
+
+        # A submitted transfer may still land after a timeout, so its reservation is kept
+        try:
+            confirmed_txn = await wait_for_confirmation(tx_id)
+        except ConfirmationTimeoutError as e:
+            log_event("claim_unconfirmed", level=logging.WARNING, claim_id=claim_id, tx_id=tx_id, error=e)
+            return jsonify({
+                "error": str(e),
+                "claim_id": claim_id,
+                "transaction_id": tx_id,
+                "status": "pending",
+                "explorer_url": f"{EXPLORER_TX_URL}{tx_id}"
+            }), 504
+        log_event("claim_confirmed", claim_id=claim_id, tx_id=tx_id, block=confirmed_txn['confirmed-round'])
+
+        return jsonify({
+            "success": True,
+            "claim_id": claim_id,
+            "transaction_id": tx_id,
+            "amount": amount,
+            "block": confirmed_txn['confirmed-round'],
+            "from": COMPANY_ADDRESS,
+            "to": EMPLOYEE_WALLET_ADDRESS,
+            "explorer_url": f"{EXPLORER_TX_URL}{tx_id}"
+        })
+
+    except Exception as e:
+        log_event("claim_failed", level=logging.ERROR, employee=employee_name, error=e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/logout', methods=['POST'])
+async def logout():
+    """End an employee's streaming session (see server.logout)."""
+    try:
+        data = await request.get_json()
+        employee_name = data.get('name')
+        session = session_store.end(employee_name)
+        if session is not None:
+            total_claimed = to_strm(session["total_claimed"])
+            session_events.publish(employee_name, "logout", {"total_claimed": total_claimed})
+            log_event("logout", employee=employee_name, total_claimed=total_claimed)
+        return jsonify({"success": True})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print(" STREAMFI ASYNC BACKEND - READY FOR DEMO!")
+    print("=" * 70)
+    print(f" Company Wallet: {COMPANY_ADDRESS}")
+    print(f" STRM Asset ID: {STRM_ASSET_ID}")
+    print(f" Employees: {len(roster)}")
+    print("=" * 70)
+    print("\n ✅ Server running on http://localhost:5000\n")
+    app.run(port=5000)
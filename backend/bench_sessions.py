@@ -0,0 +1,133 @@
+"""
+Memory and throughput benchmark for the in-process session stores.
+Compares the dict-per-session store (InMemorySessionStore, the default) with the
+column-backed CompactSessionStore at a given number of concurrent streams:
+memory held by the sessions, and operations per second for login, balance reads,
+claims, a bulk balance pass over every session, and logout/login churn.
+
+Usage:
+    python bench_sessions.py --sessions 200000
+    python bench_sessions.py --sessions 500000 --json sessions.json
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from accrual import NS_PER_SECOND
+from session_store import CompactSessionStore, InMemorySessionStore
+
+STORES = {
+    "dict": InMemorySessionStore,
+    "compact": CompactSessionStore,
+}
+
+# Base units per second each benchmark session accrues
+RATE = 100
+
+
+def measure_memory(factory, names, now):
+    """Bytes allocated by `factory()` holding a session for every name (names themselves excluded)."""
+    gc.collect()
+    tracemalloc.start()
+    store = factory()
+    for i, name in enumerate(names):
+        store.start(name, RATE, now + i)  # Employees log in at different times
+    used, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, used
+
+
+def timed(operation, count):
+    """Run operation() once and return operations per second for `count` operations."""
+    started = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - started
+    return round(count / elapsed) if elapsed else 0
+
+
+def bench_store(kind, names, churn):
+    now = time.time_ns()
+    store, memory = measure_memory(STORES[kind], names, now)
+    later = now + 60 * NS_PER_SECOND  # One minute of accrual: every claim below is covered
+    sample = names[::max(len(names) // 100_000, 1)]  # Per-session operations on up to ~100k names
+
+    def reads():
+        for name in sample:
+            store.get(name)
+
+    def claims():
+        for name in sample:
+            store.claim(name, RATE, later)
+
+    def bulk():
+        store.balances(later)
+
+    def logins():
+        fresh = factory()
+        for i, name in enumerate(sample):
+            fresh.start(name, RATE, now + i)
+
+    def churn_pass():
+        # Log out a slice of employees and log a new set in: the compact store reuses the slots
+        for i in range(churn):
+            store.end(names[i])
+            store.start(f"churn-{i:07d}", RATE, now)
+
+    factory = STORES[kind]
+    results = {
+        "sessions": len(names),
+        "memory_mb": round(memory / 2**20, 2),
+        "bytes_per_session": round(memory / len(names), 1),
+        "login_ops": timed(logins, len(sample)),
+        "get_ops": timed(reads, len(sample)),
+        "claim_ops": timed(claims, len(sample)),
+        "bulk_balance_sessions_per_s": timed(bulk, len(names)),
+        "churn_ops": timed(churn_pass, churn),
+    }
+    table = getattr(store, "table", None)
+    results["slots_after_churn"] = table.capacity() if table is not None else None  # Includes the unused tail block
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dict and compact session stores")
+    parser.add_argument("--sessions", type=int, default=200_000, help="concurrent streaming sessions")
+    parser.add_argument("--churn", type=int, default=10_000, help="logout + new login pairs in the churn pass")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # Names are shared by both stores and created up front, so they do not count as session memory
+    names = [f"employee-{i:07d}" for i in range(args.sessions)]
+    churn = min(args.churn, args.sessions)
+    results = {kind: bench_store(kind, names, churn) for kind in STORES}
+
+    print(f"\n{'=' * 78}")
+    print(f" STREAMFI SESSION STORE BENCHMARK - {args.sessions} sessions")
+    print(f"{'=' * 78}")
+    rows = [
+        ("memory (MB)", "memory_mb"),
+        ("bytes / session", "bytes_per_session"),
+        ("login / s", "login_ops"),
+        ("balance read / s", "get_ops"),
+        ("claim / s", "claim_ops"),
+        ("bulk balance sessions / s", "bulk_balance_sessions_per_s"),
+        ("logout+login churn / s", "churn_ops"),
+        ("slots after churn", "slots_after_churn"),
+    ]
+    print(f" {'':<28}{'dict':>16}{'compact':>16}{'compact/dict':>14}")
+    for label, key in rows:
+        dict_value, compact_value = results["dict"][key], results["compact"][key]
+        ratio = f"{compact_value / dict_value:.2f}x" if dict_value and compact_value is not None else ""
+        print(f" {label:<28}{str(dict_value):>16}{str(compact_value):>16}{ratio:>14}")
+    print(f"{'=' * 78}\n")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
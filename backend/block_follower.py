@@ -0,0 +1,256 @@
+"""
+Shared confirmation follower for StreamFi transactions.
+algosdk's wait_for_confirmation polls pending_transaction_info and status_after_block
+for every transaction, so N in-flight claims mean N polling loops against algod. Here
+one thread follows the chain instead. It calls status_after_block once per round and
+reads each new block's transaction IDs once (GET /v2/blocks/{round}/txids). From that
+one pass it resolves every transaction waiting in the process. A newly watched
+transaction is also checked once with pending_transaction_info, which catches one that
+confirmed before it was watched or was dropped from the pool. Algod load grows with
+rounds and transactions, not rounds times transactions.
+
+Against an algod without the txids endpoint, the follower checks the outstanding
+transactions' pending info once per round from the same thread. A single 404 may just be a
+lagging node behind a router, so the fallback is permanent only after several in a row.
+
+Every watch also has a wall-clock deadline (ROUND_TIMEOUT_SECONDS per waited round). It is
+enforced even while algod calls keep failing, so no waiter hangs on an unreachable node.
+"""
+
+import concurrent.futures
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from algosdk.error import AlgodHTTPError, ConfirmationTimeoutError
+
+from log_config import log_event
+
+# Consecutive txids failures (404/501) before the follower stops asking for block txids
+TXIDS_FAILURES_BEFORE_FALLBACK = 3
+
+# Wall-clock seconds allowed per waited round (rounds take about 3s): a watch for N rounds
+# expires after N times this even if the follower cannot see any rounds
+ROUND_TIMEOUT_SECONDS = 10
+
+
+class BlockFollower:
+    """
+    Resolves watched transaction IDs from one round-following thread.
+    watch() returns a Future of {"txid", "confirmed-round"}; it fails with
+    ConfirmationTimeoutError after `wait_rounds` rounds or `wait_rounds * round_timeout`
+    seconds, whichever comes first, or with an Exception carrying the pool error when
+    algod drops the transaction. The thread sleeps while nothing is being watched.
+    """
+
+    def __init__(self, algod_client, round_timeout=ROUND_TIMEOUT_SECONDS):
+        self.algod_client = algod_client
+        self.round_timeout = round_timeout
+        self._watches = {}  # tx_id -> {"future", "wait_rounds", "last_round", "deadline", "checked"}
+        self._round = None  # Last round whose transactions have been matched
+        self._txids_supported = True
+        self._txids_failures = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.rounds = 0
+        self.block_calls = 0
+        self.pending_calls = 0
+
+    def watch(self, tx_id, wait_rounds=4):
+        """Future resolved when `tx_id` confirms (shared if it is already watched)."""
+        with self._lock:
+            entry = self._watches.get(tx_id)
+            if entry is None:
+                entry = {
+                    "future": Future(),
+                    "wait_rounds": wait_rounds,
+                    "last_round": None,
+                    "deadline": time.monotonic() + wait_rounds * self.round_timeout,
+                    "checked": False,
+                }
+                self._watches[tx_id] = entry
+            future = entry["future"]
+        self._start()
+        self._wakeup.set()
+        return future
+
+    def wait(self, tx_id, wait_rounds=4):
+        """Block until `tx_id` confirms; returns {"txid", "confirmed-round"}."""
+        future = self.watch(tx_id, wait_rounds)
+        try:
+            return future.result(timeout=wait_rounds * self.round_timeout)
+        except concurrent.futures.TimeoutError:
+            # The follower thread is stuck in an algod call: expire the watch from here
+            self._fail(tx_id, self._deadline_error(tx_id, wait_rounds))
+            return future.result(timeout=1)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._watches)
+
+    def reset(self, algod_client=None):
+        """Follow a different client (or resync the round after a network switch)."""
+        with self._lock:
+            if algod_client is not None:
+                self.algod_client = algod_client
+            self._round = None
+            self._txids_supported = True
+            self._txids_failures = 0
+
+    # -- follower thread -------------------------------------------------------------
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="block-follower", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._watches
+                if idle:
+                    # Nothing to follow: forget the round so waking up resyncs with the chain
+                    self._round = None
+                    self._wakeup.clear()
+            if idle:
+                self._wakeup.wait()
+                continue
+            try:
+                self._pass()
+            except Exception as e:
+                log_event("block_follow_failed", level=logging.WARNING, error=e)
+                time.sleep(1)
+            self._expire_overdue()
+
+    def _pass(self):
+        if self._round is None:
+            self._round = self.algod_client.status().get("last-round", 0)
+        self._check_new()
+        # Blocks until a round after self._round exists: one call per round, however many watches
+        latest = self.algod_client.status_after_block(self._round).get("last-round", self._round)
+        for round_num in range(self._round + 1, latest + 1):
+            self._match_round(round_num)
+            self._round = round_num
+            self.rounds += 1
+        self._expire()
+
+    def _check_new(self):
+        # One pending-info read per newly watched transaction: catches one that confirmed before
+        # it was watched (or a pool error); later rounds are covered by the block scan
+        with self._lock:
+            new = [(tx_id, e) for tx_id, e in self._watches.items() if not e["checked"]]
+            for tx_id, entry in new:
+                entry["checked"] = True
+                entry["last_round"] = self._round + entry["wait_rounds"]
+        for tx_id, entry in new:
+            try:
+                self._check_pending(tx_id)
+            except Exception:
+                entry["checked"] = False  # Check it again on the next pass
+                raise
+
+    def _match_round(self, round_num):
+        with self._lock:
+            if not self._watches:
+                return
+            outstanding = list(self._watches)
+        if self._txids_supported:
+            try:
+                self.block_calls += 1
+                txids = self.algod_client.get_block_txids(round_num).get("blockTxids") or []
+            except (AlgodHTTPError, AttributeError) as e:
+                if isinstance(e, AlgodHTTPError) and e.code not in (404, 501):
+                    raise
+                # Older algod (or a client without the call): check pending info for this round,
+                # and for good once it keeps failing
+                self._txids_failures += 1
+                if isinstance(e, AttributeError) or self._txids_failures >= TXIDS_FAILURES_BEFORE_FALLBACK:
+                    self._txids_supported = False
+                    log_event("block_txids_unavailable", level=logging.INFO, error=e)
+            else:
+                self._txids_failures = 0
+                for tx_id in set(txids).intersection(outstanding):
+                    self._resolve(tx_id, round_num)
+                return
+        for tx_id in outstanding:
+            self._check_pending(tx_id)
+
+    def _check_pending(self, tx_id):
+        self.pending_calls += 1
+        try:
+            info = self.algod_client.pending_transaction_info(tx_id)
+        except AlgodHTTPError as e:
+            if e.code == 404:
+                return  # Not in the pool (yet): the block scan or the deadline decides
+            raise
+        if info.get("confirmed-round", 0) > 0:
+            self._resolve(tx_id, info["confirmed-round"])
+        elif info.get("pool-error"):
+            self._fail(tx_id, Exception(f"Transaction rejected: {info['pool-error']}"))
+
+    def _expire(self):
+        with self._lock:
+            expired = [
+                (tx_id, e) for tx_id, e in self._watches.items()
+                if e["last_round"] is not None and self._round >= e["last_round"]
+            ]
+        for tx_id, entry in expired:
+            # Last look before giving up (also reports a pool error instead of a plain timeout)
+            self._check_pending(tx_id)
+            self._fail(tx_id, ConfirmationTimeoutError(
+                f"Transaction {tx_id} not confirmed after {entry['wait_rounds']} rounds"
+            ))
+
+    def _expire_overdue(self):
+        # Wall-clock deadlines, checked after every pass whether or not algod answered
+        now = time.monotonic()
+        with self._lock:
+            overdue = [(tx_id, e) for tx_id, e in self._watches.items() if now >= e["deadline"]]
+        for tx_id, entry in overdue:
+            self._fail(tx_id, self._deadline_error(tx_id, entry["wait_rounds"]))
+
+    def _deadline_error(self, tx_id, wait_rounds):
+        return ConfirmationTimeoutError(
+            f"Transaction {tx_id} not confirmed within {wait_rounds * self.round_timeout:g}s"
+        )
+
+    def _resolve(self, tx_id, round_num):
+        with self._lock:
+            entry = self._watches.pop(tx_id, None)
+        if entry is not None:
+            entry["future"].set_result({"txid": tx_id, "confirmed-round": round_num})
+
+    def _fail(self, tx_id, error):
+        with self._lock:
+            entry = self._watches.pop(tx_id, None)
+        if entry is not None:
+            entry["future"].set_exception(error)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "watching": len(self._watches),
+                "round": self._round,
+                "rounds": self.rounds,
+                "block_calls": self.block_calls,
+                "pending_calls": self.pending_calls,
+                "txids_endpoint": self._txids_supported,
+            }
+
+
+# One follower per algod client, shared by everything that waits on that client
+_followers = {}
+_followers_lock = threading.Lock()
+
+
+def follower_for(algod_client):
+    """The shared BlockFollower for `algod_client` (created on first use)."""
+    with _followers_lock:
+        follower = _followers.get(id(algod_client))
+        if follower is None or follower.algod_client is not algod_client:
+            follower = BlockFollower(algod_client)
+            _followers[id(algod_client)] = follower
+        return follower
@@ -0,0 +1,27 @@
+"""
+Network, wallet and asset settings shared by server.py and async_server.py.
+Both servers import these names from here so they always talk to the same
+network and move the same asset between the same wallets.
+"""
+
+# TestNet Configuration
+ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"  # Public TestNet RPC endpoint
+ALGOD_TOKEN = ""  # No token needed for public Algonode endpoints
+STRM_ASSET_ID = 749531304  # ARC-20 token asset id used by this demo
+
+# WALLET 1: Company wallet (holds STRM tokens that will be streamed / claimed)
+# Its key is never in the code: signer_service.py holds it (see create_signer)
+COMPANY_ADDRESS = "ZX2LBXKXNBRCJVECB7AHU22PPMDIDHCRAPKEVZ5UIUSGZF2LISTEG3IPEQ"
+
+# WALLET 2: Employee collective wallet (where tokens are transferred when claimed)
+# For demo simplicity, this single wallet acts as the recipient for all employee claims
+EMPLOYEE_WALLET_ADDRESS = "QZTLJBJSCVDHPCJXT3LQGDCRNBA3IRYVCPLFEA3GWN6YCTNOP4FPH7F4HE"
+
+# Explorer page of a transaction (append the transaction ID)
+EXPLORER_TX_URL = "https://testnet.explorer.perawallet.app/tx/"
+
+# Rounds a synchronous claim waits for confirmation before answering with a timeout
+CONFIRMATION_ROUNDS = 4
+
+# Seconds between keep-alive comments on idle event streams (keeps proxies from closing them)
+SSE_KEEPALIVE_SECONDS = 15
@@ -0,0 +1,125 @@
+"""
+Background confirmation tracking for StreamFi claims.
+Lets the API return right after submission while the shared block follower
+(block_follower.py) follows each transaction until it is confirmed, rejected,
+or expires.
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from log_config import log_event
+
+# Claim lifecycle states reported by the status endpoint
+STATUS_PENDING = "pending"
+STATUS_CONFIRMED = "confirmed"
+STATUS_FAILED = "failed"
+
+
+class ConfirmationTracker:
+    """
+    Tracks submitted transactions through a BlockFollower.
+
+    Each tracked claim gets a claim ID that callers can use to look up its status.
+    Finished claims are kept for `retention` seconds so clients can still read the result.
+    """
+
+    def __init__(self, follower, max_rounds=10, retention=600):
+        self.follower = follower
+        self.max_rounds = max_rounds  # Rounds to wait before giving up on a transaction
+        self.retention = retention  # Seconds to keep finished claims around
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def new_claim_id(self):
+        """Generate an opaque claim ID (also used as the transaction note)."""
+        return uuid.uuid4().hex
+
+    def track(self, claim_id, tx_id, details=None, on_confirmed=None, on_failed=None):
+        """
+        Register a submitted transaction under `claim_id`.
+        `tx_id` may be None when the claim is still queued; call set_transaction() once it is sent.
+        `on_confirmed(record)` runs once in the follower thread when the transaction lands.
+        `on_failed(record)` runs once if it is rejected or expires.
+        """
+        record = {
+            "claim_id": claim_id,
+            "transaction_id": tx_id,
+            "status": STATUS_PENDING,
+            "block": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "details": details or {},
+        }
+        entry = {"record": record, "on_confirmed": on_confirmed, "on_failed": on_failed}
+        with self._lock:
+            self._evict_finished()
+            self._claims[claim_id] = entry
+        if tx_id is not None:
+            self._follow(entry, tx_id)
+        return dict(record)
+
+    def set_transaction(self, claim_id, tx_id):
+        """Attach the transaction ID to a claim that was registered before submission."""
+        with self._lock:
+            entry = self._claims.get(claim_id)
+            if entry:
+                entry["record"]["transaction_id"] = tx_id
+        if entry:
+            self._follow(entry, tx_id)
+
+    def fail(self, claim_id, error):
+        """Mark a claim failed without polling (e.g. its submission was rejected)."""
+        with self._lock:
+            entry = self._claims.get(claim_id)
+        if entry and entry["record"]["status"] == STATUS_PENDING:
+            self._finish(entry, STATUS_FAILED, error=error)
+
+    def get(self, claim_id):
+        """Return a copy of the claim record, or None if unknown or evicted."""
+        with self._lock:
+            entry = self._claims.get(claim_id)
+            return dict(entry["record"]) if entry else None
+
+    def pending_count(self):
+        """Number of claims still waiting for confirmation."""
+        with self._lock:
+            return sum(1 for e in self._claims.values() if e["record"]["status"] == STATUS_PENDING)
+
+    def _follow(self, entry, tx_id):
+        def done(future):
+            if future.exception() is not None:
+                self._finish(entry, STATUS_FAILED, error=str(future.exception()))
+            else:
+                self._finish(entry, STATUS_CONFIRMED, block=future.result()["confirmed-round"])
+        self.follower.watch(tx_id, self.max_rounds).add_done_callback(done)
+
+    def _finish(self, entry, status, block=None, error=None):
+        with self._lock:
+            record = entry["record"]
+            if record["status"] != STATUS_PENDING:
+                return
+            record["status"] = status
+            record["block"] = block
+            record["error"] = error
+            record["finished_at"] = time.time()
+            callback = entry["on_confirmed"] if status == STATUS_CONFIRMED else entry["on_failed"]
+            snapshot = dict(record)
+        if callback:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                log_event("claim_callback_failed", level=logging.ERROR, claim_id=record["claim_id"], error=e)
+
+    def _evict_finished(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.retention
+        expired = [
+            cid for cid, e in self._claims.items()
+            if e["record"]["finished_at"] is not None and e["record"]["finished_at"] < cutoff
+        ]
+        for cid in expired:
+            del self._claims[cid]
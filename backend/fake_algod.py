@@ -0,0 +1,308 @@
+"""
+In-process algod stand-in for benchmarks and local runs.
+Implements the AlgodClient calls the backend makes (suggested_params,
+send_transaction(s), simulate_transactions, pending_transaction_info, account_info,
+account_asset_info, get_block_txids, status, status_after_block) with configurable latency and failure rates, and advances
+rounds on a timer so confirmation waits behave like a real (if faster) network.
+FakeIndexerClient answers indexer transaction searches from what a FakeAlgodClient
+has confirmed.
+"""
+
+import base64
+import hashlib
+import random
+import threading
+import time
+
+from algosdk.error import AlgodHTTPError
+from algosdk.transaction import SuggestedParams
+
+
+class FakeAlgodClient:
+    """
+    Drop-in replacement for algod.AlgodClient in benchmarks.
+
+    latency / jitter: seconds added to every call (uniform jitter on top of latency).
+    failure_rate: probability that a call raises AlgodHTTPError (HTTP 503).
+    round_time: seconds per round; transactions confirm in the round after submission.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, round_time=2.8,
+                 fee=1000, validity=1000, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.round_time = round_time
+        self.fee = fee
+        self.validity = validity  # Rounds between first_valid and last_valid
+        self.genesis_hash = base64.b64encode(hashlib.sha256(b"streamfi-fake-algod").digest()).decode()
+        self.genesis_id = "fakenet-v1"
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self._base_round = 1000
+        self._pending = {}  # tx_id -> {"submitted": round it was submitted in, "txn": the Transaction}
+        self._by_round = {}  # confirmed round -> [tx_id] (transactions confirm the round after submission)
+        self._leases = {}  # (sender, lease) -> last valid round of the transaction holding it
+        # address -> {"amount": microAlgos received, "assets": {asset id: amount}}. Asset holdings
+        # are debited too, so a sender with a holding here cannot overdraw it
+        self._accounts = {}
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    # -- helpers -----------------------------------------------------------
+
+    def current_round(self):
+        """Round number implied by the elapsed time."""
+        return self._base_round + int((time.monotonic() - self._started) / self.round_time)
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise AlgodHTTPError(f"fake algod: injected failure in {name}", code=503)
+
+    # -- AlgodClient surface ------------------------------------------------
+
+    def status(self, **kwargs):
+        self._call("status")
+        return {"last-round": self.current_round(), "time-since-last-round": 0}
+
+    def status_after_block(self, block_num, **kwargs):
+        self._call("status_after_block")
+        # Block until the requested round has passed, like algod's long-poll
+        target = block_num + 1
+        while self.current_round() < target:
+            wait = self._started + (target - self._base_round) * self.round_time - time.monotonic()
+            time.sleep(max(wait, 0.001))
+        return {"last-round": self.current_round(), "time-since-last-round": 0}
+
+    def suggested_params(self, **kwargs):
+        self._call("suggested_params")
+        first = self.current_round()
+        return SuggestedParams(
+            fee=self.fee,
+            first=first,
+            last=first + self.validity,
+            gh=self.genesis_hash,
+            gen=self.genesis_id,
+            flat_fee=True,
+            min_fee=self.fee,
+        )
+
+    def _rejection(self, txns, current):
+        """Why algod would reject this group right now, or None. Caller holds the lock."""
+        total_fee = 0
+        for txn in txns:
+            tx_id = txn.get_txid()
+            inner = getattr(txn, "transaction", txn)
+            if tx_id in self._pending:
+                return f"transaction already in ledger: {tx_id}"
+            if not inner.first_valid_round <= current <= inner.last_valid_round:
+                return (f"transaction {tx_id}: txn dead: round {current} outside of "
+                        f"{inner.first_valid_round}--{inner.last_valid_round}")
+            # Like algod, a lease blocks other transactions from the same sender until it expires
+            lease = getattr(inner, "lease", None)
+            if lease:
+                holder = self._leases.get((inner.sender, lease))
+                if holder is not None and holder >= current:
+                    return f"transaction {tx_id} using an overlapping lease"
+            total_fee += inner.fee
+        # Asset holdings the fake knows about cannot go negative (others are not tracked)
+        spent = {}
+        for txn in txns:
+            inner = getattr(txn, "transaction", txn)
+            if inner.type == "axfer" and inner.amount:
+                key = (inner.sender, inner.index)
+                spent[key] = spent.get(key, 0) + inner.amount
+        for (sender, asset_id), amount in spent.items():
+            holding = self._accounts.get(sender, {}).get("assets", {}).get(asset_id)
+            if holding is not None and amount > holding:
+                return f"underflow on subtracting {amount} from sender amount {holding} of asset {asset_id}"
+        # Fees are pooled across the group
+        if total_fee < self.fee * len(txns):
+            return f"fee too small: group pays {total_fee}, needs {self.fee * len(txns)}"
+        return None
+
+    def send_transaction(self, txn, **kwargs):
+        return self.send_transactions([txn], **kwargs)
+
+    def send_transactions(self, txns, **kwargs):
+        self._call("send_transactions")
+        txns = list(txns)
+        current = self.current_round()
+        with self._lock:
+            rejection = self._rejection(txns, current)
+            if rejection is not None:
+                raise AlgodHTTPError(rejection, code=400)
+            for txn in txns:
+                inner = getattr(txn, "transaction", txn)
+                if getattr(inner, "lease", None):
+                    self._leases[(inner.sender, inner.lease)] = inner.last_valid_round
+                self._pending[txn.get_txid()] = {"submitted": current, "txn": inner}
+                self._by_round.setdefault(current + 1, []).append(txn.get_txid())
+                self._apply(inner)
+        return txns[0].get_txid()
+
+    def simulate_transactions(self, request, **kwargs):
+        """
+        Run the same checks as send_transactions without committing anything and answer
+        in algod's simulate response shape. Programs are not evaluated, so app calls
+        report no opcode cost.
+        """
+        self._call("simulate_transactions")
+        current = self.current_round()
+        groups = []
+        for group in request.txn_groups:
+            txns = list(group.txns)
+            with self._lock:
+                failure = self._rejection(txns, current)
+            if failure is None and not request.allow_empty_signatures:
+                unsigned = [i for i, txn in enumerate(txns) if getattr(txn, "signature", None) is None]
+                if unsigned:
+                    failure = f"transaction {unsigned[0]}: signedtxn has no sig"
+            result = {"txn-results": [{"txn-result": {"pool-error": ""}} for _ in txns]}
+            if failure is not None:
+                result["failure-message"] = failure
+                result["failed-at"] = [0]
+            groups.append(result)
+        return {"version": 2, "last-round": current, "txn-groups": groups}
+
+    def _apply(self, txn):
+        # ALGO credits and asset movements: enough to answer account_info for funding and opt-in
+        # checks and account_asset_info for balance checks. Caller holds the lock
+        if txn.type == "pay":
+            account = self._accounts.setdefault(txn.receiver, {"amount": 0, "assets": {}})
+            account["amount"] += txn.amt
+        elif txn.type == "axfer" and txn.receiver:
+            sender_assets = self._accounts.get(txn.sender, {}).get("assets", {})
+            if txn.index in sender_assets:
+                sender_assets[txn.index] -= txn.amount or 0
+            account = self._accounts.setdefault(txn.receiver, {"amount": 0, "assets": {}})
+            account["assets"][txn.index] = account["assets"].get(txn.index, 0) + (txn.amount or 0)
+
+    def credit(self, address, amount, asset_id=None):
+        """Give `address` microAlgos, or units of `asset_id` (opting it in), e.g. a treasury to pay from."""
+        with self._lock:
+            account = self._accounts.setdefault(address, {"amount": 0, "assets": {}})
+            if asset_id is None:
+                account["amount"] += amount
+            else:
+                account["assets"][asset_id] = account["assets"].get(asset_id, 0) + amount
+
+    def account_info(self, address, **kwargs):
+        self._call("account_info")
+        with self._lock:
+            account = self._accounts.get(address, {"amount": 0, "assets": {}})
+            return {
+                "address": address,
+                "amount": account["amount"],
+                "assets": [{"asset-id": asset_id, "amount": amount} for asset_id, amount in account["assets"].items()],
+            }
+
+    def account_asset_info(self, address, asset_id, **kwargs):
+        self._call("account_asset_info")
+        current = self.current_round()
+        with self._lock:
+            amount = self._accounts.get(address, {"assets": {}})["assets"].get(asset_id)
+        if amount is None:
+            raise AlgodHTTPError("account asset info not found", code=404)
+        return {"round": current, "asset-holding": {"asset-id": asset_id, "amount": amount, "is-frozen": False}}
+
+    def pending_transaction_info(self, transaction_id, **kwargs):
+        self._call("pending_transaction_info")
+        with self._lock:
+            entry = self._pending.get(transaction_id)
+        if entry is None:
+            raise AlgodHTTPError("txn does not exist", code=404)
+        confirmed_round = entry["submitted"] + 1
+        if self.current_round() >= confirmed_round:
+            return {"confirmed-round": confirmed_round, "pool-error": ""}
+        return {"confirmed-round": 0, "pool-error": ""}
+
+    def get_block_txids(self, round_num, **kwargs):
+        self._call("get_block_txids")
+        if round_num > self.current_round():
+            raise AlgodHTTPError(f"failed to retrieve information from the ledger: round {round_num} not available", code=404)
+        with self._lock:
+            return {"blockTxids": list(self._by_round.get(round_num, []))}
+
+    def confirmed_transactions(self):
+        """[(tx_id, confirmed round, Transaction)] for everything confirmed so far, in submission order."""
+        current = self.current_round()
+        with self._lock:
+            entries = list(self._pending.items())
+        return [
+            (tx_id, entry["submitted"] + 1, entry["txn"])
+            for tx_id, entry in entries
+            if entry["submitted"] + 1 <= current
+        ]
+
+    def call_counts(self):
+        """Number of calls per method since creation (for reporting)."""
+        with self._lock:
+            return dict(self.calls)
+
+
+class FakeIndexerClient:
+    """
+    Indexer stand-in over a FakeAlgodClient: search_transactions_by_address() returns the
+    fake's confirmed transactions in the indexer's JSON shape, paged with next-token.
+    """
+
+    def __init__(self, algod_client, round_time_base=None):
+        self.algod_client = algod_client
+        # Wall-clock time of the fake's base round, for round-time fields
+        self.round_time_base = round_time_base if round_time_base is not None else int(time.time())
+
+    def _transaction(self, tx_id, confirmed_round, txn):
+        entry = {
+            "id": tx_id,
+            "sender": txn.sender,
+            "tx-type": txn.type,
+            "fee": txn.fee,
+            "confirmed-round": confirmed_round,
+            "round-time": self.round_time_base + int(
+                (confirmed_round - self.algod_client._base_round) * self.algod_client.round_time
+            ),
+        }
+        if txn.note:
+            entry["note"] = base64.b64encode(txn.note).decode()
+        if txn.type == "pay":
+            entry["payment-transaction"] = {"receiver": txn.receiver, "amount": txn.amt}
+        elif txn.type == "axfer":
+            entry["asset-transfer-transaction"] = {
+                "asset-id": txn.index, "receiver": txn.receiver, "amount": txn.amount or 0
+            }
+        return entry
+
+    def health(self):
+        self.algod_client._call("indexer_health")
+        return {"round": self.algod_client.current_round(), "db-available": True, "is-migrating": False}
+
+    def search_transactions_by_address(self, address, limit=None, next_page=None, txn_type=None,
+                                       min_round=None, max_round=None, asset_id=None, **kwargs):
+        self.algod_client._call("indexer_search")
+        matches = [
+            (tx_id, confirmed_round, txn)
+            for tx_id, confirmed_round, txn in self.algod_client.confirmed_transactions()
+            if address in (txn.sender, getattr(txn, "receiver", None))
+            and (txn_type is None or txn.type == txn_type)
+            and (asset_id is None or getattr(txn, "index", None) == asset_id)
+            and (min_round is None or confirmed_round >= min_round)
+            and (max_round is None or confirmed_round <= max_round)
+        ]
+        # The next-token is just the offset into the result list
+        offset = int(next_page) if next_page else 0
+        limit = limit or 1000
+        page = matches[offset:offset + limit]
+        response = {
+            "current-round": self.algod_client.current_round(),
+            "transactions": [self._transaction(*match) for match in page],
+        }
+        if offset + limit < len(matches):
+            response["next-token"] = str(offset + limit)
+        return response
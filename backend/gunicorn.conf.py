@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for running the StreamFi backend in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden with a STREAMFI_* environment variable.
+With more than one worker, set STREAMFI_SESSION_DB so all workers share the
+same accrual state and relay session events to each other's dashboards; the
+in-memory session store and event broker are per process.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("STREAMFI_BIND", "0.0.0.0:5000")
+
+# Threaded workers: claims spend most of their time waiting on algod, so several threads
+# per process pay off
+worker_class = "gthread"
+workers = int(os.environ.get("STREAMFI_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# A balance event stream holds a thread for as long as the dashboard is open, so each worker
+# gets STREAMFI_MAX_STREAMS threads for streams on top of STREAMFI_THREADS for everything else:
+# open dashboards never starve login and claims. Up to workers * STREAMFI_MAX_STREAMS
+# dashboards stream at once; past that they get a 503 and poll. For thousands of dashboards,
+# route /api/balance/stream to async_server.py instead.
+request_threads = int(os.environ.get("STREAMFI_THREADS", "8"))
+max_streams = int(os.environ.setdefault("STREAMFI_MAX_STREAMS", "32"))
+threads = request_threads + max_streams
+
+# Keep client connections open between dashboard requests
+keepalive = int(os.environ.get("STREAMFI_KEEPALIVE", "5"))
+
+# Sync claims can wait a few rounds for confirmation; give them room before the worker is killed
+timeout = int(os.environ.get("STREAMFI_TIMEOUT", "60"))
+
+# On SIGTERM, workers stop accepting requests and get this long to finish in-flight claims
+graceful_timeout = int(os.environ.get("STREAMFI_DRAIN_TIMEOUT", "30"))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get("STREAMFI_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("STREAMFI_MAX_REQUESTS_JITTER", "500"))
+
+accesslog = os.environ.get("STREAMFI_ACCESS_LOG", "-")
+
+
+def on_starting(server):
+    if workers > 1 and not os.environ.get("STREAMFI_SESSION_DB"):
+        server.log.warning(
+            "Running %d workers with in-memory sessions and events; set STREAMFI_SESSION_DB to share them", workers
+        )
+
+
+def worker_exit(server, worker):
+    # Drain claims that are queued for batching or still awaiting confirmation
+    import server as streamfi_server
+
+    drained = streamfi_server.drain(graceful_timeout)
+    if not drained:
+        worker.log.warning("Worker %s exited with claims still in flight", worker.pid)
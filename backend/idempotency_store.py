@@ -0,0 +1,260 @@
+"""
+Idempotency records for StreamFi claims.
+A claim sent with an idempotency key is recorded before anything is submitted; a
+retry with the same key gets the stored result (or the in-flight claim's status)
+instead of a second on-chain transfer. Like session_store.py there is an in-memory
+store and a SQLite store that several worker processes can share.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_util import thread_connection
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# Keys are remembered well past the lease window of the transfer they guard (~1000 rounds)
+DEFAULT_RETENTION = 24 * 3600
+
+# Seconds between sweeps of expired keys from the shared SQLite table
+EVICT_INTERVAL = 60
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a claim with different parameters."""
+
+
+class IdempotencyStore:
+    """
+    Interface for idempotency backends.
+    Records carry key, fingerprint, claim_id, status, transaction_id, response_status,
+    response_body and created_at.
+    """
+
+    def begin(self, key, fingerprint, claim_id, now=None):
+        """
+        Atomically claim `key` for a new request.
+        Returns (record, created): created is True when this call inserted the record, False
+        when an earlier request with the same key exists (its record is returned instead).
+        Raises IdempotencyConflict when the earlier request had a different fingerprint.
+        """
+        raise NotImplementedError
+
+    def attach_transaction(self, key, tx_id):
+        """Remember the transaction ID once the claim has been submitted."""
+        raise NotImplementedError
+
+    def complete(self, key, response_status, response_body):
+        """Store the final response so retries can replay it."""
+        raise NotImplementedError
+
+    def discard(self, key, transaction_id=None):
+        """
+        Forget `key` (the claim failed before anything reached the network). With a
+        `transaction_id`, only an in-progress record holding that transaction is removed, so
+        of several retries that find the same dropped transaction exactly one gives it up.
+        Returns True when a record was removed.
+        """
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the record for `key`, or None."""
+        raise NotImplementedError
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Process-local store; retries must reach the same worker."""
+
+    def __init__(self, retention=DEFAULT_RETENTION):
+        self.retention = retention
+        self._records = OrderedDict()  # Insertion order is creation order, oldest first
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Caller holds the lock; stops at the first record still inside the retention window
+        cutoff = now - self.retention
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record["created_at"] >= cutoff:
+                break
+            del self._records[key]
+
+    def begin(self, key, fingerprint, claim_id, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._evict(now)
+            record = self._records.get(key)
+            if record is not None:
+                if record["fingerprint"] != fingerprint:
+                    raise IdempotencyConflict(key)
+                return dict(record), False
+            record = {
+                "key": key,
+                "fingerprint": fingerprint,
+                "claim_id": claim_id,
+                "status": STATUS_IN_PROGRESS,
+                "transaction_id": None,
+                "response_status": None,
+                "response_body": None,
+                "created_at": now,
+            }
+            self._records[key] = record
+            return dict(record), True
+
+    def attach_transaction(self, key, tx_id):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record["transaction_id"] = tx_id
+
+    def complete(self, key, response_status, response_body):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record["status"] = STATUS_COMPLETED
+                record["response_status"] = response_status
+                record["response_body"] = response_body
+
+    def discard(self, key, transaction_id=None):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                return False
+            if transaction_id is not None and (
+                record["status"] != STATUS_IN_PROGRESS or record["transaction_id"] != transaction_id
+            ):
+                return False
+            del self._records[key]
+            return True
+
+    def get(self, key):
+        with self._lock:
+            record = self._records.get(key)
+            return dict(record) if record is not None else None
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """SQLite-backed store shared by every worker using the same database file."""
+
+    CREATE_SQL = [
+        """
+        CREATE TABLE IF NOT EXISTS claim_idempotency (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            claim_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            transaction_id TEXT,
+            response_status INTEGER,
+            response_body TEXT,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS claim_idempotency_created ON claim_idempotency (created_at)",
+    ]
+    SELECT_SQL = """
+        SELECT key, fingerprint, claim_id, status, transaction_id, response_status, response_body, created_at
+        FROM claim_idempotency WHERE key = ?
+    """
+    INSERT_SQL = """
+        INSERT INTO claim_idempotency (key, fingerprint, claim_id, status, created_at) VALUES (?, ?, ?, ?, ?)
+    """
+    EVICT_SQL = "DELETE FROM claim_idempotency WHERE created_at < ?"
+    ATTACH_SQL = "UPDATE claim_idempotency SET transaction_id = ? WHERE key = ?"
+    COMPLETE_SQL = "UPDATE claim_idempotency SET status = ?, response_status = ?, response_body = ? WHERE key = ?"
+    DELETE_SQL = "DELETE FROM claim_idempotency WHERE key = ?"
+    DELETE_IN_PROGRESS_SQL = "DELETE FROM claim_idempotency WHERE key = ? AND status = ? AND transaction_id = ?"
+
+    def __init__(self, path, retention=DEFAULT_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        self._next_evict = 0.0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.CREATE_SQL:
+            conn.execute(statement)
+
+    def _connection(self):
+        return thread_connection(self._local, self.path)
+
+    @staticmethod
+    def _row_to_record(row):
+        return {
+            "key": row[0],
+            "fingerprint": row[1],
+            "claim_id": row[2],
+            "status": row[3],
+            "transaction_id": row[4],
+            "response_status": row[5],
+            "response_body": json.loads(row[6]) if row[6] is not None else None,
+            "created_at": row[7],
+        }
+
+    def begin(self, key, fingerprint, claim_id, now=None):
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        # IMMEDIATE so two workers racing on the same key cannot both insert it
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired keys are swept at most once per interval rather than on every claim
+            if now >= self._next_evict:
+                self._next_evict = now + EVICT_INTERVAL
+                conn.execute(self.EVICT_SQL, (now - self.retention,))
+            row = conn.execute(self.SELECT_SQL, (key,)).fetchone()
+            if row is None:
+                conn.execute(self.INSERT_SQL, (key, fingerprint, claim_id, STATUS_IN_PROGRESS, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is not None:
+            record = self._row_to_record(row)
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyConflict(key)
+            return record, False
+        return {
+            "key": key,
+            "fingerprint": fingerprint,
+            "claim_id": claim_id,
+            "status": STATUS_IN_PROGRESS,
+            "transaction_id": None,
+            "response_status": None,
+            "response_body": None,
+            "created_at": now,
+        }, True
+
+    def attach_transaction(self, key, tx_id):
+        self._connection().execute(self.ATTACH_SQL, (tx_id, key))
+
+    def complete(self, key, response_status, response_body):
+        self._connection().execute(
+            self.COMPLETE_SQL, (STATUS_COMPLETED, response_status, json.dumps(response_body), key)
+        )
+
+    def discard(self, key, transaction_id=None):
+        if transaction_id is None:
+            cursor = self._connection().execute(self.DELETE_SQL, (key,))
+        else:
+            cursor = self._connection().execute(
+                self.DELETE_IN_PROGRESS_SQL, (key, STATUS_IN_PROGRESS, transaction_id)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, key):
+        row = self._connection().execute(self.SELECT_SQL, (key,)).fetchone()
+        return self._row_to_record(row) if row else None
+
+
+def create_idempotency_store(db_path=None):
+    """
+    Build the configured idempotency store: SQLite when a database path (or
+    STREAMFI_SESSION_DB) is set, so retries may land on any worker; in-memory otherwise.
+    """
+    db_path = db_path or os.environ.get("STREAMFI_SESSION_DB")
+    if db_path:
+        return SQLiteIdempotencyStore(db_path)
+    return InMemoryIdempotencyStore()
@@ -0,0 +1,227 @@
+"""
+Load test for the StreamFi backend against an in-process algod stand-in.
+Runs server.py behind a threaded WSGI server, swaps its algod client for
+fake_algod.FakeAlgodClient, and drives /api/login, /api/balance, /api/claim
+and /api/logout at a fixed concurrency. Reports p50/p95/p99 latency and
+throughput per endpoint so changes can be compared before a deploy.
+
+Usage:
+    python loadtest.py --users 50 --concurrency 16 --balance-polls 10
+    python loadtest.py --algod-latency 0.05 --failure-rate 0.01 --json results.json
+"""
+
+import argparse
+import atexit
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from algosdk import account, mnemonic
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+# The fake algod does not check signatures: without a signer service, server.py signs
+# in-process with a throwaway key (never the company's)
+if not os.environ.get("STREAMFI_SIGNER_SOCKET"):
+    os.environ["STREAMFI_ALLOW_LOCAL_SIGNER"] = "1"
+    os.environ["STREAMFI_SIGNER_MNEMONIC"] = mnemonic.from_private_key(account.generate_account()[0])
+    os.environ.pop("STREAMFI_SIGNER_MNEMONIC_FILE", None)
+
+# Fake claims go to a throwaway ledger, never the persistent one
+if not os.environ.get("STREAMFI_HISTORY_DB"):
+    _ledger_dir = tempfile.mkdtemp(prefix="streamfi-loadtest-")
+    atexit.register(shutil.rmtree, _ledger_dir, True)
+    os.environ["STREAMFI_HISTORY_DB"] = os.path.join(_ledger_dir, "history.db")
+
+import server
+from fake_algod import FakeAlgodClient
+from log_config import configure_logging
+
+ENDPOINTS = ["login", "balance", "claim", "logout"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """Collects per-endpoint latencies and error counts from many threads."""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, wall_time):
+        results = {}
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies[endpoint])
+            results[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(values) / wall_time, 2) if wall_time else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            }
+        return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Skips werkzeug's per-request access log line."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ApiClient:
+    """Keep-alive JSON client; one per worker thread."""
+
+    def __init__(self, host, port):
+        self.conn = http.client.HTTPConnection(host, port, timeout=60)
+
+    def post(self, path, payload):
+        body = json.dumps(payload)
+        self.conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else {}
+
+
+def run_user(client_factory, recorder, name, balance_polls, claim_amount, async_claims, claim_retries):
+    """
+    One simulated employee: login, poll the balance, claim once, log out.
+    With claim_retries the claim is re-sent that many times under the same idempotency key,
+    as a client would after timeouts; retries should be answered without new transfers.
+    """
+    client = client_factory()
+
+    def timed(endpoint, payload):
+        started = time.perf_counter()
+        try:
+            status, data = client.post(f"/api/{endpoint}", payload)
+            ok = status < 400 and "error" not in data
+        except Exception:
+            ok = False
+        recorder.record(endpoint, time.perf_counter() - started, ok)
+
+    timed("login", {"name": name})
+    for _ in range(balance_polls):
+        timed("balance", {"name": name})
+    claim = {"name": name, "amount": claim_amount, "async": async_claims, "idempotency_key": f"{name}-claim"}
+    for _ in range(1 + claim_retries):
+        timed("claim", claim)
+    timed("logout", {"name": name})
+
+
+def claim_phase_means():
+    """Mean milliseconds per claim phase, read from the server's metrics registry."""
+    means = {}
+    for phase in ("params", "sign", "submit", "queue", "confirm"):
+        count, total = server.CLAIM_PHASE_LATENCY.summary(phase=phase)
+        if count:
+            means[phase] = round(total / count * 1000, 2)
+    return means
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the StreamFi backend against a fake algod")
+    parser.add_argument("--users", type=int, default=50, help="simulated employees (one session each)")
+    parser.add_argument("--concurrency", type=int, default=16, help="employees driven in parallel")
+    parser.add_argument("--balance-polls", type=int, default=10, help="/api/balance calls per employee")
+    parser.add_argument("--claim-amount", type=float, default=1, help="STRM claimed per employee")
+    parser.add_argument("--async-claims", action="store_true", help="use the async claim mode")
+    parser.add_argument("--claim-retries", type=int, default=0, help="times each claim is retried with its idempotency key")
+    parser.add_argument("--algod-latency", type=float, default=0.02, help="seconds added to every algod call")
+    parser.add_argument("--algod-jitter", type=float, default=0.01, help="uniform extra latency (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of algod calls that fail")
+    parser.add_argument("--round-time", type=float, default=0.5, help="seconds per fake round")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--show-server-output", action="store_true", help="keep server logs at STREAMFI_LOG_LEVEL instead of silencing them")
+    args = parser.parse_args()
+
+    fake = FakeAlgodClient(
+        latency=args.algod_latency,
+        jitter=args.algod_jitter,
+        failure_rate=args.failure_rate,
+        round_time=args.round_time,
+        seed=42,
+    )
+    server.set_algod_client(fake)
+    # Treasury holding large enough that the backend's balance check never turns claims away
+    fake.credit(server.COMPANY_ADDRESS, 10 ** 15, asset_id=server.STRM_ASSET_ID)
+
+    # Synthetic roster so every simulated user has its own session. Claims are capped at the
+    # accrued balance, so the rate is high enough to cover --claim-amount within milliseconds.
+    names = [f"loadtest-{i:05d}" for i in range(args.users)]
+    server.roster.add({"name": name, "designation": "Load Test", "rate": 1000} for name in names)
+
+    app = server.create_app(start_background=False)
+    if not args.show_server_output:
+        configure_logging("OFF")  # Claim events would drown the report
+    httpd = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+    port = httpd.server_port
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    recorder = Recorder()
+    local = threading.local()
+
+    def client_factory():
+        if not hasattr(local, "client"):
+            local.client = ApiClient("127.0.0.1", port)
+        return local.client
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(run_user, client_factory, recorder, name,
+                        args.balance_polls, args.claim_amount, args.async_claims, args.claim_retries)
+            for name in names
+        ]
+        for future in futures:
+            future.result()
+    wall_time = time.perf_counter() - started
+    httpd.shutdown()
+
+    results = {
+        "config": vars(args),
+        "wall_time_s": round(wall_time, 3),
+        "endpoints": recorder.summary(wall_time),
+        "algod_calls": fake.call_counts(),
+        "claim_phases_ms": claim_phase_means(),
+    }
+
+    print(f"\n{'=' * 78}")
+    print(f" STREAMFI LOAD TEST - {args.users} users, concurrency {args.concurrency}, {wall_time:.2f}s")
+    print(f"{'=' * 78}")
+    print(f" {'endpoint':<10}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, row in results["endpoints"].items():
+        print(f" {endpoint:<10}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+    print(f" algod calls: {results['algod_calls']}")
+    phases = ", ".join(f"{phase} {mean}" for phase, mean in results["claim_phases_ms"].items())
+    print(f" claim phases (mean ms): {phases or 'n/a'}")
+    print(f"{'=' * 78}\n")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Structured logging for the StreamFi backend.
+Request handlers log events as `event key=value ...` lines (or JSON objects) through
+the "streamfi" logger instead of printing banners, so output can be aggregated,
+filtered by level, or switched off entirely.
+
+    STREAMFI_LOG_LEVEL   DEBUG, INFO (default), WARNING, ERROR or OFF
+    STREAMFI_LOG_FORMAT  "text" (default) or "json"
+"""
+
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger("streamfi")
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Renders `timestamp level event key=value ...`."""
+
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        parts = [self.formatTime(record), record.levelname, record.getMessage()]
+        parts.extend(f"{key}={value}" for key, value in fields.items())
+        line = " ".join(str(part) for part in parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders one JSON object per line for log shippers."""
+
+    def format(self, record):
+        payload = {"ts": record.created, "level": record.levelname, "event": record.getMessage()}
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level=None, fmt=None):
+    """Attach a stderr handler to the streamfi logger according to the environment (idempotent)."""
+    level = (level or os.environ.get("STREAMFI_LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("STREAMFI_LOG_FORMAT", "text")).lower()
+
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    if level == "OFF":
+        logger.disabled = True
+        return logger
+
+    logger.disabled = False
+    logger.setLevel(level)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+    logger.addHandler(handler)
+    return logger
+
+
+def log_event(event, level=logging.INFO, exc_info=False, **fields):
+    """Log `event` with structured fields; cheap no-op when the level is disabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
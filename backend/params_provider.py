@@ -0,0 +1,138 @@
+"""
+Shared, cached suggested transaction params for StreamFi.
+Takes the /v2/transactions/params round-trip off every transaction we build:
+params are fetched once and reused until the chain nears their last valid
+round or the network fee changes. Used by the backend and the contracts/ scripts.
+"""
+
+import copy
+import logging
+import threading
+import time
+
+from log_config import log_event
+
+
+class SuggestedParamsProvider:
+    """
+    Caches algod suggested_params and refreshes them only when needed.
+
+    Without the background thread (one-shot scripts) cached params are reused for
+    `max_age` seconds. With start() a follower thread watches rounds through
+    status_after_block and refreshes when the current round is within `refresh_margin`
+    rounds of last_valid, or when a periodic fee check sees a different fee.
+    """
+
+    def __init__(self, algod_client, refresh_margin=20, fee_check_rounds=10, max_age=60):
+        self.algod_client = algod_client
+        self.refresh_margin = refresh_margin  # Refresh this many rounds before last_valid
+        self.fee_check_rounds = fee_check_rounds  # Re-check the network fee every N rounds
+        self.max_age = max_age  # Seconds cached params stay usable without the follower thread
+        self._params = None
+        self._fetched_at = 0.0
+        self._current_round = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One suggested_params call at a time on a cache miss
+        self._thread = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self):
+        """Return suggested params, serving from cache whenever they are still usable."""
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return copy.copy(self._params)
+            self.misses += 1
+        # Single flight: the first caller fetches, concurrent misses wait and reuse its params
+        with self._refresh_lock:
+            with self._lock:
+                if self._is_fresh():
+                    return copy.copy(self._params)
+            return copy.copy(self.refresh())
+
+    def refresh(self):
+        """Fetch new params from algod and replace the cached copy."""
+        params = self.algod_client.suggested_params()
+        with self._lock:
+            self._params = params
+            self._fetched_at = time.monotonic()
+            self._current_round = max(self._current_round or 0, params.first)
+            self.refreshes += 1
+        return params
+
+    def invalidate(self):
+        """Drop the cached params (e.g. after a submission is rejected for bad rounds or fee)."""
+        with self._lock:
+            self._params = None
+
+    def stats(self):
+        """Cache counters for monitoring."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "last_valid": self._params.last if self._params else None,
+                "current_round": self._current_round,
+            }
+
+    def start(self):
+        """Start the round-following refresh thread (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="params-provider", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the refresh thread; cached params keep being served by max_age."""
+        self._stop.set()
+
+    def _is_fresh(self):
+        # Caller holds the lock
+        if self._params is None:
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            # Follower knows the current round: usable until close to last_valid
+            return self._current_round is not None and self._current_round < self._params.last - self.refresh_margin
+        return time.monotonic() - self._fetched_at < self.max_age
+
+    def _run(self):
+        rounds_since_fee_check = 0
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    last_round = self._current_round
+                if last_round is None:
+                    self.refresh()
+                    continue
+                # Blocks until the next round, so this costs one call per round
+                status = self.algod_client.status_after_block(last_round)
+                current = status.get("last-round", last_round)
+                with self._lock:
+                    self._current_round = current
+                    near_expiry = self._params is None or current >= self._params.last - self.refresh_margin
+                rounds_since_fee_check += 1
+                if near_expiry:
+                    self.refresh()
+                    rounds_since_fee_check = 0
+                elif rounds_since_fee_check >= self.fee_check_rounds:
+                    self._refresh_if_fee_changed()
+                    rounds_since_fee_check = 0
+            except Exception as e:
+                log_event("params_refresh_failed", level=logging.WARNING, error=e)
+                self._stop.wait(1)
+
+    def _refresh_if_fee_changed(self):
+        latest = self.algod_client.suggested_params()
+        with self._lock:
+            cached = self._params
+            if cached is None or latest.fee != cached.fee or latest.min_fee != cached.min_fee:
+                self._params = latest
+                self._fetched_at = time.monotonic()
+                self.refreshes += 1
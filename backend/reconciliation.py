@@ -0,0 +1,391 @@
+"""
+Claim history and on-chain reconciliation for StreamFi.
+Every claim the backend makes is written to a local claim ledger (employee, amount,
+claim ID, transaction ID), which outlives sessions and logouts. A follower pulls
+the company wallet's STRM transfers from an indexer incrementally, starting after
+the last round it has seen, and caches them next to the ledger. Transfers carry
+their claim ID in the note, so the two sides join on an index and the differences
+between what the backend recorded and what actually moved on-chain come out of a
+few queries instead of a chain rescan.
+
+    STREAMFI_INDEXER_ADDRESS      indexer to follow (default: public TestNet indexer; "off" disables)
+    STREAMFI_INDEXER_START_ROUND  first round to follow on an empty cache (default: the first
+                                  round any ledger claim was valid in, else the indexer's
+                                  current round, so the wallet's history is not rescanned)
+    STREAMFI_HISTORY_DB           SQLite file for the ledger and transfer cache (default:
+                                  STREAMFI_SESSION_DB, else streamfi_history.db next to this module)
+
+The ledger must outlive restarts: the follower resumes after the last round it stored, so
+transfers that landed while the backend was down are still matched to their claims.
+"""
+
+import base64
+import logging
+import os
+import threading
+import time
+
+from log_config import log_event
+from sqlite_util import thread_connection
+
+DEFAULT_INDEXER_ADDRESS = "https://testnet-idx.algonode.cloud"
+
+# Claim states in the ledger
+CLAIM_PENDING = "pending"  # Reserved, not yet submitted
+CLAIM_SUBMITTED = "submitted"
+CLAIM_FAILED = "failed"  # Never reached the network, or expired without landing; the reservation was released
+
+# Discrepancy kinds reported by ClaimHistory.discrepancies()
+MISSING_ON_CHAIN = "missing_on_chain"  # Submitted claim with no transfer after the grace period
+AMOUNT_MISMATCH = "amount_mismatch"  # Transfer amount differs from the claimed amount
+FAILED_BUT_ON_CHAIN = "failed_but_on_chain"  # Released as failed, yet the transfer landed
+UNRECORDED_TRANSFER = "unrecorded_transfer"  # STRM left the company wallet without a claim record
+
+# Seconds a submitted claim may go without a matching transfer before it is flagged
+DEFAULT_GRACE_SECONDS = 120
+
+# Transfers requested per indexer page
+INDEXER_PAGE_SIZE = 1000
+
+# Longest validity window of an Algorand transaction, in rounds
+MAX_TXN_LIFE = 1000
+
+# Ledger file used when neither STREAMFI_HISTORY_DB nor STREAMFI_SESSION_DB is set
+DEFAULT_HISTORY_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamfi_history.db")
+
+
+class ClaimHistory:
+    """SQLite ledger of claims plus the cache of on-chain transfers they reconcile against."""
+
+    CREATE_SQL = [
+        """
+        CREATE TABLE IF NOT EXISTS claim_ledger (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            claim_id TEXT NOT NULL UNIQUE,
+            employee TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            mode TEXT,
+            status TEXT NOT NULL,
+            transaction_id TEXT,
+            last_valid INTEGER,
+            error TEXT,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS claim_ledger_employee ON claim_ledger (employee, seq)",
+        """
+        CREATE TABLE IF NOT EXISTS chain_transfers (
+            transaction_id TEXT PRIMARY KEY,
+            confirmed_round INTEGER NOT NULL,
+            round_time INTEGER,
+            receiver TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            note TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS chain_transfers_note ON chain_transfers (note)",
+        "CREATE TABLE IF NOT EXISTS follower_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    ]
+    INSERT_CLAIM_SQL = """
+        INSERT OR IGNORE INTO claim_ledger (claim_id, employee, amount, mode, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    ATTACH_SQL = "UPDATE claim_ledger SET status = ?, transaction_id = ?, last_valid = ?, error = NULL WHERE claim_id = ?"
+    FAIL_SQL = "UPDATE claim_ledger SET status = ?, error = ? WHERE claim_id = ? AND transaction_id IS NULL"
+    DROP_SQL = "UPDATE claim_ledger SET status = ?, error = ? WHERE claim_id = ? AND transaction_id = ?"
+    CLAIM_SQL = """
+        SELECT c.status, c.transaction_id, c.last_valid, t.transaction_id, t.confirmed_round
+        FROM claim_ledger c LEFT JOIN chain_transfers t ON t.note = c.claim_id
+        WHERE c.claim_id = ?
+    """
+    INSERT_TRANSFER_SQL = """
+        INSERT OR IGNORE INTO chain_transfers (transaction_id, confirmed_round, round_time, receiver, amount, note)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    # Only ever moves forward, so concurrent followers in several workers cannot rewind it
+    SET_CURSOR_SQL = """
+        INSERT INTO follower_state (key, value) VALUES ('last_round', ?)
+        ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)
+    """
+    GET_CURSOR_SQL = "SELECT value FROM follower_state WHERE key = 'last_round'"
+    EARLIEST_LAST_VALID_SQL = "SELECT MIN(last_valid) FROM claim_ledger"
+    HISTORY_SQL = """
+        SELECT c.seq, c.claim_id, c.amount, c.mode, c.status, c.transaction_id, c.error, c.created_at,
+               t.transaction_id, t.confirmed_round, t.amount
+        FROM claim_ledger c LEFT JOIN chain_transfers t ON t.note = c.claim_id
+        WHERE c.employee = :employee AND (:before IS NULL OR c.seq < :before)
+        ORDER BY c.seq DESC LIMIT :limit
+    """
+    DISCREPANCY_SQL = {
+        MISSING_ON_CHAIN: """
+            SELECT c.claim_id, c.employee, c.transaction_id, c.amount, NULL
+            FROM claim_ledger c LEFT JOIN chain_transfers t ON t.note = c.claim_id
+            WHERE c.status = 'submitted' AND t.transaction_id IS NULL AND c.created_at < :cutoff
+        """,
+        AMOUNT_MISMATCH: """
+            SELECT c.claim_id, c.employee, t.transaction_id, c.amount, t.amount
+            FROM claim_ledger c JOIN chain_transfers t ON t.note = c.claim_id
+            WHERE t.amount != c.amount
+        """,
+        FAILED_BUT_ON_CHAIN: """
+            SELECT c.claim_id, c.employee, t.transaction_id, c.amount, t.amount
+            FROM claim_ledger c JOIN chain_transfers t ON t.note = c.claim_id
+            WHERE c.status = 'failed'
+        """,
+        UNRECORDED_TRANSFER: """
+            SELECT t.note, NULL, t.transaction_id, NULL, t.amount
+            FROM chain_transfers t LEFT JOIN claim_ledger c ON c.claim_id = t.note
+            WHERE c.claim_id IS NULL
+        """,
+    }
+    # Per employee: what the ledger says was paid versus what the chain shows
+    TOTALS_SQL = """
+        SELECT c.employee,
+               SUM(CASE WHEN c.status != 'failed' THEN c.amount ELSE 0 END),
+               COALESCE(SUM(t.amount), 0),
+               COUNT(*)
+        FROM claim_ledger c LEFT JOIN chain_transfers t ON t.note = c.claim_id
+        WHERE :employee IS NULL OR c.employee = :employee
+        GROUP BY c.employee ORDER BY c.employee
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.CREATE_SQL:
+            conn.execute(statement)
+
+    def _connection(self):
+        return thread_connection(self._local, self.path)
+
+    # -- claim ledger (written by the claim path) --------------------------------------
+
+    def record_claim(self, claim_id, employee, amount, mode=None, now=None):
+        """Write a reserved claim to the ledger (a retried claim with the same ID is ignored)."""
+        now = now if now is not None else time.time()
+        self._connection().execute(self.INSERT_CLAIM_SQL, (claim_id, employee, amount, mode, CLAIM_PENDING, now))
+
+    def attach_transaction(self, claim_id, tx_id, last_valid=None):
+        """The claim's transfer was submitted as `tx_id`; it cannot land after round `last_valid`."""
+        self._connection().execute(self.ATTACH_SQL, (CLAIM_SUBMITTED, tx_id, last_valid, claim_id))
+
+    def mark_failed(self, claim_id, error):
+        """The claim never reached the network (its reservation was released)."""
+        self._connection().execute(self.FAIL_SQL, (CLAIM_FAILED, str(error), claim_id))
+
+    def mark_dropped(self, claim_id, tx_id, error):
+        """The claim's transaction `tx_id` was rejected or expired without landing (reservation released)."""
+        self._connection().execute(self.DROP_SQL, (CLAIM_FAILED, str(error), claim_id, tx_id))
+
+    def claim(self, claim_id):
+        """
+        The ledger's view of one claim: {"status", "transaction_id", "last_valid", "confirmed_round",
+        "synced_round"}, where confirmed_round is set once its transfer has been seen on-chain.
+        None for an unknown claim.
+        """
+        row = self._connection().execute(self.CLAIM_SQL, (claim_id,)).fetchone()
+        if row is None:
+            return None
+        status, tx_id, last_valid, chain_tx, chain_round = row
+        return {
+            "status": status,
+            "transaction_id": chain_tx or tx_id,
+            "last_valid": last_valid,
+            "confirmed_round": chain_round,
+            "synced_round": self.cursor(),
+        }
+
+    # -- transfer cache (written by the follower) ---------------------------------------
+
+    def cursor(self):
+        """Last round the follower has fully ingested, or None before the first pass."""
+        row = self._connection().execute(self.GET_CURSOR_SQL).fetchone()
+        return row[0] if row else None
+
+    def first_claim_round(self):
+        """The earliest round any recorded claim's transaction could have landed in, or None."""
+        row = self._connection().execute(self.EARLIEST_LAST_VALID_SQL).fetchone()
+        return max(row[0] - MAX_TXN_LIFE, 1) if row[0] is not None else None
+
+    def store_transfers(self, transfers, last_round):
+        """Cache a batch of transfers and move the cursor to `last_round` in one transaction."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(self.INSERT_TRANSFER_SQL, transfers)
+            conn.execute(self.SET_CURSOR_SQL, (last_round,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # -- queries ----------------------------------------------------------------------
+
+    def history(self, employee, limit=50, before=None):
+        """
+        An employee's claims, newest first, with the on-chain transfer each matched.
+        Returns (entries, next_before): pass next_before back as `before` for the next page.
+        """
+        rows = self._connection().execute(
+            self.HISTORY_SQL, {"employee": employee, "before": before, "limit": limit}
+        ).fetchall()
+        entries = []
+        for seq, claim_id, amount, mode, status, tx_id, error, created_at, chain_tx, chain_round, chain_amount in rows:
+            entries.append({
+                "claim_id": claim_id,
+                "amount_base_units": amount,
+                "mode": mode,
+                # A transfer on-chain settles the question whatever the backend thought happened
+                "status": "confirmed" if chain_tx else status,
+                "transaction_id": chain_tx or tx_id,
+                "confirmed_round": chain_round,
+                "on_chain_amount_base_units": chain_amount,
+                "error": error,
+                "created_at": created_at,
+            })
+        next_before = rows[-1][0] if len(rows) == limit else None
+        return entries, next_before
+
+    def discrepancies(self, grace_seconds=DEFAULT_GRACE_SECONDS, now=None, limit=500):
+        """Ledger/chain differences, by kind: [{"kind", "claim_id", "employee", "transaction_id", ...}]."""
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        found = []
+        for kind, sql in self.DISCREPANCY_SQL.items():
+            rows = conn.execute(f"{sql} LIMIT :limit", {"cutoff": now - grace_seconds, "limit": limit}).fetchall()
+            for claim_id, employee, tx_id, off_chain, on_chain in rows:
+                found.append({
+                    "kind": kind,
+                    "claim_id": claim_id,
+                    "employee": employee,
+                    "transaction_id": tx_id,
+                    "off_chain_amount_base_units": off_chain,
+                    "on_chain_amount_base_units": on_chain,
+                })
+        return found
+
+    def totals(self, employee=None):
+        """[{"employee", "recorded_base_units", "on_chain_base_units", "claims"}] from the ledger and cache."""
+        rows = self._connection().execute(self.TOTALS_SQL, {"employee": employee}).fetchall()
+        return [
+            {"employee": name, "recorded_base_units": recorded, "on_chain_base_units": on_chain, "claims": count}
+            for name, recorded, on_chain, count in rows
+        ]
+
+
+class TransferFollower:
+    """
+    Follows STRM transfers sent by `address` through an indexer, from the round after the
+    cached cursor up to the indexer's current round, and stores them in a ClaimHistory.
+    With an empty cache it starts at `start_round`, or else at the indexer's current round
+    on the first pass: claims made from then on are covered, older transfers are not fetched.
+    """
+
+    def __init__(self, history, indexer_client, address, asset_id, interval=10.0, start_round=None):
+        self.history = history
+        self.indexer_client = indexer_client
+        self.address = address
+        self.asset_id = asset_id
+        self.interval = interval
+        self.start_round = start_round  # First round to look at when the cache is empty
+        self.passes = 0
+        self.ingested = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        """Ingest everything new since the cursor. Returns the number of transfers stored."""
+        cursor = self.history.cursor()
+        if cursor is None:
+            # Claims recorded before the first pass (e.g. while no indexer was configured)
+            # still get their transfers picked up
+            start_round = self.start_round if self.start_round is not None else self.history.first_claim_round()
+            if start_round is not None:
+                cursor = start_round - 1
+            else:
+                cursor = self.indexer_client.health()["round"]
+                self.history.store_transfers([], cursor)
+        next_page = None
+        stored = 0
+        while True:
+            response = self.indexer_client.search_transactions_by_address(
+                self.address,
+                limit=INDEXER_PAGE_SIZE,
+                next_page=next_page,
+                txn_type="axfer",
+                asset_id=self.asset_id,
+                min_round=cursor + 1,
+            )
+            transfers = []
+            for txn in response.get("transactions", []):
+                transfer = txn.get("asset-transfer-transaction", {})
+                if txn.get("sender") != self.address or not transfer.get("amount"):
+                    continue  # Incoming STRM and opt-ins are not claims
+                note = base64.b64decode(txn["note"]).decode("utf-8", "replace") if txn.get("note") else None
+                transfers.append((
+                    txn["id"], txn["confirmed-round"], txn.get("round-time"),
+                    transfer.get("receiver"), transfer["amount"], note
+                ))
+            # The cursor only moves to the indexer's round once the last page is in
+            next_page = response.get("next-token")
+            last_page = not next_page or not response.get("transactions")
+            self.history.store_transfers(transfers, response.get("current-round", cursor) if last_page else cursor)
+            stored += len(transfers)
+            if last_page:
+                break
+        self.passes += 1
+        self.ingested += stored
+        if stored:
+            log_event("transfers_ingested", count=stored, cursor=self.history.cursor())
+        return stored
+
+    def start(self):
+        """Poll every `interval` seconds in a background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="transfer-follower", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                log_event("transfer_follow_failed", level=logging.WARNING, error=e)
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self):
+        return {
+            "cursor_round": self.history.cursor(),
+            "passes": self.passes,
+            "ingested": self.ingested,
+            "errors": self.errors,
+        }
+
+
+def create_claim_history(db_path=None):
+    """
+    Build the claim history store: STREAMFI_HISTORY_DB, else STREAMFI_SESSION_DB, else
+    DEFAULT_HISTORY_DB. Always a file that survives restarts, so the transfer follower
+    resumes from its stored cursor.
+    """
+    db_path = db_path or os.environ.get("STREAMFI_HISTORY_DB") or os.environ.get("STREAMFI_SESSION_DB")
+    return ClaimHistory(db_path or DEFAULT_HISTORY_DB)
+
+
+def create_indexer_client(address=None, token=""):
+    """IndexerClient for STREAMFI_INDEXER_ADDRESS (or the public TestNet indexer); None when set to off."""
+    from algosdk.v2client import indexer
+
+    address = address or os.environ.get("STREAMFI_INDEXER_ADDRESS", DEFAULT_INDEXER_ADDRESS)
+    if address.lower() in ("off", "none", ""):
+        return None
+    return indexer.IndexerClient(token, address)
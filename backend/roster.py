@@ -0,0 +1,266 @@
+"""
+Employee roster for StreamFi, loaded from a JSON file or a SQLite table.
+Employees are indexed by their ID (the name the API is called with) in a plain
+dict of small tuples, so lookups stay O(1) and a 100k-employee roster takes a few
+tens of MB. The source is polled for changes and reloaded in the background; the
+on_change callback receives the new index after every load (the first one included),
+so active sessions can move to the roster's rates from that moment on.
+
+    STREAMFI_ROSTER=employees.json         (default: employees.json next to this file)
+    STREAMFI_ROSTER=/var/lib/streamfi/roster.db   (SQLite: table employees)
+
+JSON: a list of {"name", "designation", "rate", "address"?} objects (rate in STRM per
+second), or {"employees": [...]}. Replace the file atomically (write + rename) so a
+reload never sees half a file; a roster that fails to parse is ignored and the
+previous one stays in use.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from accrual import to_base_units
+from log_config import log_event
+
+DEFAULT_ROSTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "employees.json")
+
+# Seconds between checks of the roster source for changes
+DEFAULT_POLL_INTERVAL = 2.0
+
+# rate is STRM per second as written in the roster; rate_base_units is what sessions accrue at
+Employee = namedtuple("Employee", ("name", "designation", "rate", "rate_base_units", "address"))
+
+
+class RosterError(Exception):
+    """The roster source could not be read or has invalid entries."""
+
+
+def _employee(row):
+    name = row.get("name")
+    if not name:
+        raise RosterError(f"Roster entry without a name: {row}")
+    try:
+        rate = row.get("rate", 0)
+        rate_base_units = to_base_units(rate)
+    except ValueError as e:
+        raise RosterError(f"{name}: {e}")
+    if rate_base_units < 0:
+        raise RosterError(f"{name}: negative rate")
+    # Designations repeat across thousands of employees; interning keeps one copy of each
+    designation = sys.intern(str(row.get("designation") or ""))
+    return Employee(str(name), designation, rate, rate_base_units, row.get("address"))
+
+
+class JsonRosterSource:
+    """Roster kept in a JSON file; a change is a new (mtime, size, inode)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def rows(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RosterError(f"Cannot read roster {self.path}: {e}")
+        if isinstance(data, dict):
+            data = data.get("employees", [])
+        if not isinstance(data, list):
+            raise RosterError(f"Roster {self.path} must be a list of employees")
+        return data
+
+
+class SQLiteRosterSource:
+    """Roster kept in an `employees` table; a change is a new PRAGMA data_version."""
+
+    CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS employees (
+            name TEXT PRIMARY KEY,
+            designation TEXT NOT NULL DEFAULT '',
+            rate REAL NOT NULL,
+            address TEXT
+        )
+    """
+    SELECT_SQL = "SELECT name, designation, rate, address FROM employees"
+
+    def __init__(self, path):
+        self.path = path
+        # data_version only moves for commits made by *other* connections, so the watcher
+        # keeps one connection of its own for the life of the roster
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(self.CREATE_SQL)
+
+    def signature(self):
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def rows(self):
+        with self._lock:
+            rows = self._conn.execute(self.SELECT_SQL).fetchall()
+        return [
+            {"name": name, "designation": designation, "rate": rate, "address": address}
+            for name, designation, rate, address in rows
+        ]
+
+
+def rate_updates(employees, sessions):
+    """
+    [(name, rate_base_units)] for the sessions in `sessions` ({name: session}) whose rate
+    differs from the roster `employees` ({name: Employee}); employees no longer on the
+    roster get rate 0. Compared with what the sessions hold rather than with the previous
+    roster, so re-added employees and sessions restored after a restart are covered too.
+    """
+    updates = []
+    for name, session in sessions.items():
+        employee = employees.get(name)
+        rate = employee.rate_base_units if employee is not None else 0
+        if session["rate"] != rate:
+            updates.append((name, rate))
+    return updates
+
+
+class Roster:
+    """
+    In-memory employee index with background reloads.
+    on_change(employees) is called after every load, the first one included, with the
+    new {name: Employee} index (see rate_updates()).
+    """
+
+    def __init__(self, source, poll_interval=DEFAULT_POLL_INTERVAL, on_change=None):
+        self.source = source
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._employees = {}
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.loads = 0
+        self.failed_reloads = 0
+        self.loaded_at = None
+        self.load()
+
+    # -- lookups (lock-free: the index is replaced, never mutated in place) ---------
+
+    def get(self, name):
+        """The Employee for `name`, or None."""
+        return self._employees.get(name)
+
+    def __contains__(self, name):
+        return name in self._employees
+
+    def __len__(self):
+        return len(self._employees)
+
+    def names(self):
+        return list(self._employees)
+
+    # -- loading ---------------------------------------------------------------------
+
+    def load(self):
+        """Read the source and swap in the new index. Raises RosterError on a bad roster."""
+        with self._reload_lock:
+            signature = self.source.signature()
+            employees = {}
+            for row in self.source.rows():
+                employee = _employee(row)
+                employees[employee.name] = employee
+            previous = self._employees
+            self._employees = employees
+            self._signature = signature
+            self.loaded_at = time.time()
+            first = self.loads == 0
+            self.loads += 1
+
+        if not first:
+            changed = sum(
+                1 for name, employee in employees.items()
+                if name in previous and previous[name].rate_base_units != employee.rate_base_units
+            )
+            added = sum(1 for name in employees if name not in previous)
+            removed = sum(1 for name in previous if name not in employees)
+            log_event("roster_reloaded", employees=len(employees), rate_changes=changed, added=added, removed=removed)
+        if self.on_change is not None:
+            self.on_change(employees)
+
+    def check(self):
+        """Reload if the source changed since the last load. Returns True when it reloaded."""
+        try:
+            if self.source.signature() == self._signature:
+                return False
+            self.load()
+            return True
+        except RosterError as e:
+            # Keep serving the previous roster; remember the bad signature so it is not re-read every poll
+            self.failed_reloads += 1
+            self._signature = self.source.signature()
+            log_event("roster_reload_failed", level=logging.WARNING, error=e)
+            return False
+
+    def add(self, rows):
+        """
+        Merge roster entries ({"name", "designation", "rate"} dicts) into the in-process
+        index (load tests, fixtures). They last until the next reload of the source.
+        """
+        with self._reload_lock:
+            merged = dict(self._employees)
+            for row in rows:
+                employee = _employee(row)
+                merged[employee.name] = employee
+            self._employees = merged
+
+    # -- background polling ----------------------------------------------------------
+
+    def start(self):
+        """Poll the source for changes every poll_interval seconds (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="roster-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                log_event("roster_reload_failed", level=logging.ERROR, error=e)
+
+    def stats(self):
+        return {
+            "employees": len(self._employees),
+            "loads": self.loads,
+            "failed_reloads": self.failed_reloads,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def create_roster(path=None, on_change=None, poll_interval=None):
+    """
+    Build the roster from `path` (or STREAMFI_ROSTER, else employees.json next to this
+    module): SQLite for .db/.sqlite/.sqlite3 paths, JSON otherwise.
+    """
+    path = path or os.environ.get("STREAMFI_ROSTER") or DEFAULT_ROSTER_PATH
+    if poll_interval is None:
+        poll_interval = float(os.environ.get("STREAMFI_ROSTER_POLL", DEFAULT_POLL_INTERVAL))
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        source = SQLiteRosterSource(path)
+    else:
+        source = JsonRosterSource(path)
+    return Roster(source, poll_interval=poll_interval, on_change=on_change)
@@ -1,45 +1,332 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
-from algosdk.transaction import AssetTransferTxn, AssetOptInTxn, PaymentTxn, wait_for_confirmation
+from algosdk.error import AlgodHTTPError, ConfirmationTimeoutError
+from algosdk.transaction import AssetTransferTxn, AssetOptInTxn, PaymentTxn
+from algod_pool import submission_rejected
+from algod_router import create_routed_client
+from config import (
+    ALGOD_ADDRESS, ALGOD_TOKEN, COMPANY_ADDRESS, CONFIRMATION_ROUNDS,
+    EMPLOYEE_WALLET_ADDRESS, EXPLORER_TX_URL, SSE_KEEPALIVE_SECONDS, STRM_ASSET_ID
+)
+from block_follower import BlockFollower
+from confirmation_tracker import STATUS_CONFIRMED, ConfirmationTracker
+from settlement_batcher import SettlementBatcher
+from signer_service import create_signer
+from simulate import simulate_group
+from params_provider import SuggestedParamsProvider
+from session_store import create_session_store
+from roster import create_roster, rate_updates
+from treasury import TreasuryCache, TreasuryInsufficient
+from reconciliation import DEFAULT_GRACE_SECONDS, TransferFollower, create_claim_history, create_indexer_client
+from idempotency_store import STATUS_COMPLETED, IdempotencyConflict, create_idempotency_store
+from accrual import BASE_UNITS_PER_STRM, InsufficientAccrual, NS_PER_SECOND, claimable, now_ns, to_base_units, to_strm
+from session_events import create_event_broker, format_sse, session_payload
+from metrics import MetricsRegistry
+from log_config import configure_logging, log_event
+from contextlib import contextmanager
+from functools import wraps
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
 import time
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS so frontend hosted elsewhere can call these endpoints
+# All endpoints live on this blueprint; create_app() builds the Flask app around it
+api = Blueprint("api", __name__)
 
-# TestNet Configuration
-ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"  # Public TestNet RPC endpoint
-ALGOD_TOKEN = ""  # No token needed for public Algonode endpoints
-STRM_ASSET_ID = 749531304  # ARC-20 token asset id used by this demo
+# Network, wallets and asset come from config.py (shared with async_server.py)
 
-# WALLET 1: Company wallet (holds STRM tokens that will be streamed / claimed)
-COMPANY_ADDRESS = "ZX2LBXKXNBRCJVECB7AHU22PPMDIDHCRAPKEVZ5UIUSGZF2LISTEG3IPEQ"
-COMPANY_MNEMONIC = "cluster coin olympic congress ribbon lamp despair maple dizzy disagree undo inquiry purchase hamster curve nuclear topic shaft evil glide loud soldier talk absent wool"
-# Convert mnemonic phrase into a private key that can sign transactions
-company_private_key = mnemonic.to_private_key(COMPANY_MNEMONIC)
-
-# WALLET 2: Employee collective wallet (where tokens are transferred when claimed)
-# For demo simplicity, this single wallet acts as the recipient for all employee claims
-EMPLOYEE_WALLET_ADDRESS = "QZTLJBJSCVDHPCJXT3LQGDCRNBA3IRYVCPLFEA3GWN6YCTNOP4FPH7F4HE"
+# Signs company transactions through the signer service (STREAMFI_SIGNER_SOCKET); startup fails
+# without one unless STREAMFI_ALLOW_LOCAL_SIGNER=1 allows in-process signing for development
+signer = create_signer()
 
 # Initialize Algod client to communicate with Algorand TestNet
-algod_client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
-
-# Employee definitions for the demo. Each has a name, role, and streaming rate (STRM per second)
-EMPLOYEES = {
-    "Anirudh": {"designation": "Blockchain Developer", "rate": 2},
-    "Saksham": {"designation": "Frontend Engineer", "rate": 3},
-    "Harshavardhan": {"designation": "Backend Engineer", "rate": 1.5},
-    "Sundaram": {"designation": "Smart Contract Auditor", "rate": 2.5},
-    "Shashi": {"designation": "Product Manager", "rate": 4},
-    "Sumit": {"designation": "UI/UX Designer", "rate": 1}
-}
-
-# Tracks active streaming sessions per employee. Each entry stores start_time, rate, and total_claimed
+# (pooled keep-alive connections, per-call timeouts, retries for reads). Set
+# STREAMFI_ALGOD_ADDRESSES to a comma-separated list to route across several nodes
+# by latency, with automatic failover.
+algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+
+# Shared suggested-params cache so claims skip the params round-trip to algod
+params_provider = SuggestedParamsProvider(algod_client)
+
+# Tracks active streaming sessions per employee. Each entry stores start_ns, rate (base units/second),
+# total_claimed and carried (base units)
 streaming_sessions = {}
 
-@app.route('/api/health', methods=['GET'])
+# Session storage: the dict above by default, int64 columns when STREAMFI_SESSION_STORE=compact,
+# or a shared SQLite database when STREAMFI_SESSION_DB is set (survives restarts, works across gunicorn workers)
+session_store = create_session_store(sessions=streaming_sessions)
+
+# Pushes session changes to dashboards subscribed through /api/balance/stream; shared with
+# the other workers through the session database when STREAMFI_SESSION_DB is set
+session_events = create_event_broker()
+
+# Event streams this process serves at once. Each one holds a worker thread, so the rest are
+# refused (503) and those dashboards poll /api/balance instead of starving login and claims.
+# gunicorn.conf.py adds this many threads per worker on top of STREAMFI_THREADS.
+# Serve streams from async_server.py to hold thousands of them.
+MAX_EVENT_STREAMS = int(os.environ.get("STREAMFI_MAX_STREAMS", "32"))
+_event_streams = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+def apply_roster_changes(employees):
+    """
+    Move active sessions to the roster's rates from this moment on: what accrued at the
+    old rate is kept. Employees no longer on the roster stop accruing (rate 0). Runs on
+    the first load too, so sessions restored from STREAMFI_SESSION_DB pick up the roster.
+    """
+    now = now_ns()
+    updates = rate_updates(employees, session_store.all())
+    for name, rate in updates:
+        session = session_store.change_rate(name, rate, now)
+        if session is not None:
+            session_events.publish(name, "session", session_payload(session))
+    if updates:
+        log_event("roster_rates_applied", changed=len(updates), stopped=sum(1 for _, rate in updates if rate == 0))
+
+# Employee roster (name, designation, rate in STRM per second) from employees.json, or the
+# file / SQLite database in STREAMFI_ROSTER. Edits are picked up without a restart.
+roster = create_roster(on_change=apply_roster_changes)
+
+# Cached STRM balance of the company wallet: claims reserve against it and fail fast when the
+# treasury cannot cover them, instead of finding out from a rejected submission
+treasury = TreasuryCache(
+    algod_client,
+    COMPANY_ADDRESS,
+    STRM_ASSET_ID,
+    refresh_interval=float(os.environ.get("STREAMFI_TREASURY_REFRESH", "4"))
+)
+
+# Idempotency records for keyed claims (shared through SQLite when STREAMFI_SESSION_DB is set)
+idempotency_store = create_idempotency_store()
+
+# One thread follows the chain (status_after_block + block txids once per round) and resolves
+# every claim waiting for confirmation, sync or async, instead of one polling loop per claim
+block_follower = BlockFollower(algod_client)
+
+# Follows asynchronously submitted claims until they confirm, so workers are not blocked waiting
+confirmation_tracker = ConfirmationTracker(block_follower)
+
+# Ledger of every claim (kept after logout) and a cache of the company wallet's STRM transfers,
+# followed incrementally through the indexer (STREAMFI_INDEXER_ADDRESS) for reconciliation
+claim_history = create_claim_history()
+indexer_client = create_indexer_client()
+transfer_follower = None
+if indexer_client is not None:
+    transfer_follower = TransferFollower(
+        claim_history,
+        indexer_client,
+        COMPANY_ADDRESS,
+        STRM_ASSET_ID,
+        interval=float(os.environ.get("STREAMFI_INDEXER_POLL", "10")),
+        start_round=int(os.environ["STREAMFI_INDEXER_START_ROUND"]) if os.environ.get("STREAMFI_INDEXER_START_ROUND") else None
+    )
+
+# Optional claim batching: claims arriving within this window (seconds) are settled together
+# as atomic groups of up to 16 transfers. 0 keeps the one-transaction-per-claim behaviour.
+SETTLEMENT_BATCH_WINDOW = float(os.environ.get("STREAMFI_BATCH_WINDOW", "0"))
+settlement_batcher = None
+if SETTLEMENT_BATCH_WINDOW > 0:
+    settlement_batcher = SettlementBatcher(
+        algod_client,
+        sender=COMPANY_ADDRESS,
+        signer=signer,
+        asset_id=STRM_ASSET_ID,
+        window=SETTLEMENT_BATCH_WINDOW,
+        params_source=params_provider.get,
+        follower=block_follower
+    )
+
+# Metrics served at /metrics in the Prometheus text format (per process)
+metrics = MetricsRegistry()
+HTTP_REQUESTS = metrics.counter(
+    "streamfi_http_requests_total", "HTTP requests by route, method and status code", ("route", "method", "status")
+)
+HTTP_LATENCY = metrics.histogram(
+    "streamfi_http_request_duration_seconds", "Time to build a response, by route", ("route",)
+)
+CLAIM_PHASE_LATENCY = metrics.histogram(
+    "streamfi_claim_phase_duration_seconds",
+    "Claim time split into params fetch, signing, submission, batch queueing, confirmation and dry-run simulation",
+    ("phase",)
+)
+CLAIMS = metrics.counter("streamfi_claims_total", "Claims by mode and outcome", ("mode", "outcome"))
+IDEMPOTENT_REPLAYS = metrics.counter(
+    "streamfi_idempotent_replays_total", "Claim retries answered from an idempotency record instead of a new transfer"
+)
+ALGOD_ERRORS = metrics.counter(
+    "streamfi_algod_errors_total", "Failed algod calls on the claim path, by phase and HTTP status", ("phase", "code")
+)
+metrics.gauge("streamfi_active_sessions", "Employees with an active streaming session", lambda: session_store.count())
+metrics.gauge("streamfi_roster", "Roster size and reload counters", lambda: _numeric_stats(roster.stats()), ("stat",))
+metrics.gauge("streamfi_event_stream_subscribers", "Open /api/balance/stream connections", session_events.subscriber_count)
+metrics.gauge("streamfi_in_flight_claims", "Claim requests currently being handled", lambda: _in_flight_claims)
+metrics.gauge("streamfi_pending_confirmations", "Async claims awaiting confirmation", confirmation_tracker.pending_count)
+metrics.gauge(
+    "streamfi_settlement_queue_depth", "Claims queued or being settled by the batcher",
+    lambda: settlement_batcher.pending_count() if settlement_batcher is not None else None
+)
+
+def _numeric_stats(stats):
+    """{(key,): value} for the numeric entries of a stats() dict (labelled gauge format)."""
+    return {
+        (key,): value for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+def _algod_node_stats():
+    """Per-node health, latency and failure counts when algod calls go through the router."""
+    stats = algod_client.stats() if hasattr(algod_client, "stats") else {}
+    values = {}
+    for node in stats.get("nodes", []):
+        for key in ("healthy", "latency_ms", "requests", "failures"):
+            if node[key] is not None:
+                values[(node["address"], key)] = int(node[key]) if key == "healthy" else node[key]
+    return values
+
+metrics.gauge("streamfi_treasury", "Treasury STRM balance cache (base units) and counters", lambda: _numeric_stats(treasury.stats()), ("stat",))
+metrics.gauge("streamfi_block_follower", "Shared confirmation follower counters", lambda: _numeric_stats(block_follower.stats()), ("stat",))
+metrics.gauge("streamfi_params_cache", "Suggested-params cache counters", lambda: _numeric_stats(params_provider.stats()), ("stat",))
+metrics.gauge(
+    "streamfi_algod_client", "Algod client counters (requests, retries, timeouts, errors, failovers)",
+    lambda: _numeric_stats(algod_client.stats()) if hasattr(algod_client, "stats") else None, ("stat",)
+)
+metrics.gauge("streamfi_algod_node", "Per-node algod routing state", _algod_node_stats, ("address", "stat"))
+
+@contextmanager
+def claim_phase(phase):
+    """Time one phase of a claim and count algod errors raised inside it."""
+    started = time.perf_counter()
+    try:
+        yield
+    except AlgodHTTPError as e:
+        ALGOD_ERRORS.inc(phase=phase, code=e.code if e.code is not None else "connection")
+        raise
+    except ConfirmationTimeoutError:
+        ALGOD_ERRORS.inc(phase=phase, code="timeout")
+        raise
+    finally:
+        CLAIM_PHASE_LATENCY.observe(time.perf_counter() - started, phase=phase)
+
+@api.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@api.after_request
+def _record_request_metrics(response):
+    # Label by the route pattern (e.g. /api/claim/<claim_id>) so IDs do not explode the series count
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route)
+    return response
+
+def reserve_claim(employee_name, amount_base_units):
+    """
+    Reserve a claim against the employee's accrued balance before the transfer is sent.
+    Atomic in every store, so concurrent claims cannot spend the same accrual twice.
+    Returns the updated session (None without an active session); raises InsufficientAccrual.
+    """
+    session = session_store.claim(employee_name, amount_base_units, now_ns())
+    if session is not None:
+        session_events.publish(employee_name, "session", session_payload(session))
+    return session
+
+def release_claim(employee_name, amount_base_units, claim_id=None, error=None, tx_id=None):
+    """
+    Return a reserved amount to the balance when its transfer provably never reached the
+    network (failed before submission, or refused by algod; see submission_rejected), or
+    when its submitted transaction `tx_id` was dropped or expired without landing.
+    """
+    if claim_id is not None:
+        treasury.release(claim_id)
+        if tx_id is not None:
+            claim_history.mark_dropped(claim_id, tx_id, error)
+        else:
+            claim_history.mark_failed(claim_id, error)
+    session = session_store.release(employee_name, amount_base_units)
+    if session is not None:
+        session_events.publish(employee_name, "session", session_payload(session))
+    return session
+
+def set_algod_client(client):
+    """
+    Point the backend and its background helpers at a different algod client
+    (used by the load-test harness to swap in fake_algod.FakeAlgodClient).
+    """
+    global algod_client
+    algod_client = client
+    params_provider.algod_client = client
+    block_follower.reset(client)
+    treasury.algod_client = client
+    if settlement_batcher is not None:
+        settlement_batcher.algod_client = client
+        settlement_batcher.params_source = params_provider.get
+    params_provider.invalidate()
+
+def set_indexer_client(client, start_round=None):
+    """
+    Follow transfers through a different indexer client (e.g. fake_algod.FakeIndexerClient),
+    from `start_round` when the transfer cache is still empty.
+    """
+    global indexer_client, transfer_follower
+    indexer_client = client
+    if transfer_follower is None:
+        transfer_follower = TransferFollower(claim_history, client, COMPANY_ADDRESS, STRM_ASSET_ID)
+    transfer_follower.indexer_client = client
+    if start_round is not None:
+        transfer_follower.start_round = start_round
+
+# In-flight claim accounting so a shutting-down worker can drain before exiting
+_in_flight_claims = 0
+_in_flight_cond = threading.Condition()
+_draining = False
+
+def track_in_flight(view):
+    """Count requests to `view` as in-flight claims and refuse new ones while draining."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        global _in_flight_claims
+        with _in_flight_cond:
+            if _draining:
+                return jsonify({"error": "Server is shutting down, retry shortly"}), 503
+            _in_flight_claims += 1
+        try:
+            return view(*args, **kwargs)
+        finally:
+            with _in_flight_cond:
+                _in_flight_claims -= 1
+                _in_flight_cond.notify_all()
+    return wrapper
+
+def drain(timeout=30):
+    """
+    Stop accepting claims and wait for in-flight work to finish: open claim requests,
+    queued batch settlements and claims still awaiting confirmation.
+    Returns True if everything drained within `timeout` seconds.
+    """
+    global _draining
+    deadline = time.monotonic() + timeout
+    with _in_flight_cond:
+        _draining = True
+        while _in_flight_claims > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _in_flight_cond.wait(remaining)
+    
+    # Background work: queued groups and claims the tracker is still following
+    while time.monotonic() < deadline:
+        batches_pending = settlement_batcher.pending_count() if settlement_batcher is not None else 0
+        if batches_pending == 0 and confirmation_tracker.pending_count() == 0:
+            return True
+        time.sleep(0.1)
+    return False
+
+@api.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint.
     Returns basic runtime metadata so frontend or CI can validate the service is online.
@@ -49,159 +336,707 @@ def health():
         "network": "testnet",
         "company_wallet": COMPANY_ADDRESS,
         "employee_wallet": EMPLOYEE_WALLET_ADDRESS,
-        "asset_id": STRM_ASSET_ID
+        "asset_id": STRM_ASSET_ID,
+        "signer": "service" if os.environ.get("STREAMFI_SIGNER_SOCKET") else "local",
+        "roster": roster.stats(),
+        "treasury": treasury.stats(),
+        "transfer_follower": transfer_follower.stats() if transfer_follower is not None else None,
+        "params_cache": params_provider.stats(),
+        "block_follower": block_follower.stats(),
+        "algod": algod_client.stats() if hasattr(algod_client, "stats") else None
     })
 
-@app.route('/api/login', methods=['POST'])
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint: request, claim-phase, session and algod metrics."""
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+@api.route('/api/login', methods=['POST'])
 def login():
     """
     Start streaming session for an employee.
     Expects JSON payload with 'name'. If the employee exists, create a streaming session
-    storing start_time, rate, and total_claimed.
+    storing start_ns, rate (base units per second), and total_claimed.
     """
     try:
         data = request.json
         employee_name = data.get('name')
         
-        if employee_name not in EMPLOYEES:
-            # Employee not known in demo dataset
+        employee = roster.get(employee_name)
+        if employee is None:
+            # Employee not in the roster
             return jsonify({"error": "Employee not found"}), 404
         
-        employee = EMPLOYEES[employee_name]
-        
         # Start a new streaming session for the employee
-        streaming_sessions[employee_name] = {
-            "start_time": time.time(),
-            "rate": employee["rate"],
-            "total_claimed": 0
-        }
+        session = session_store.start(employee_name, employee.rate_base_units, now_ns())
+        session_events.publish(employee_name, "session", session_payload(session))
         
-        # Log for server-side debugging during demo
-        print(f"✅ {employee_name} logged in - Streaming started")
+        log_event("login", employee=employee_name, rate=employee.rate)
         
         # Return basic session metadata to the frontend
         return jsonify({
             "success": True,
-            "rate": employee["rate"],
-            "designation": employee["designation"]
+            "rate": employee.rate,
+            "designation": employee.designation
         })
         
     except Exception as e:
         # Unexpected error while starting a session
-        print(f"❌ Login error: {e}")
+        log_event("login_failed", level=logging.ERROR, error=e)
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/balance', methods=['POST'])
+@api.route('/api/balance', methods=['POST'])
 def get_balance():
     """
     Calculate and return the current claimable balance for an employee.
-    The balance is computed as elapsed_seconds * rate from the streaming session.
-    Returns rounded balance and elapsed_seconds for UI display.
+    The balance is what has accrued since login (integer base units) minus what was claimed,
+    returned in STRM and in base units along with elapsed_seconds for UI display.
     """
     try:
         data = request.json
         employee_name = data.get('name')
         
-        if employee_name not in streaming_sessions:
+        session = session_store.get(employee_name)
+        if session is None:
             # No active session, nothing is claimable
             return jsonify({"balance": 0})
         
-        session = streaming_sessions[employee_name]
-        elapsed_time = time.time() - session["start_time"]
-        claimable = elapsed_time * session["rate"]
+        now = now_ns()
+        balance = claimable(session, now)
         
-        # Return human-friendly numbers (rounded)
         return jsonify({
-            "balance": round(claimable, 2),
-            "elapsed_seconds": round(elapsed_time, 2)
+            "balance": to_strm(balance),
+            "balance_base_units": balance,
+            "elapsed_seconds": round((now - session["start_ns"]) / NS_PER_SECOND, 2)
         })
         
     except Exception as e:
         # Return error info to the caller if anything goes wrong
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/claim', methods=['POST'])
+# Page size limits for the bulk balance endpoint
+BULK_BALANCE_DEFAULT_LIMIT = 500
+BULK_BALANCE_MAX_LIMIT = 5000
+
+@api.route('/api/balances', methods=['POST'])
+def get_balances():
+    """
+    Claimable balances for many employees in one request.
+    Expects JSON with 'names' (a list of employee names, or "all" for every active session)
+    and optional 'offset' / 'limit' for paging through large rosters (sorted by name).
+    Employees without an active session are omitted; 'total' counts every match.
+    """
+    try:
+        data = request.json or {}
+        names = data.get('names', 'all')
+        try:
+            offset = max(int(data.get('offset', 0)), 0)
+            limit = min(max(int(data.get('limit', BULK_BALANCE_DEFAULT_LIMIT)), 1), BULK_BALANCE_MAX_LIMIT)
+        except (TypeError, ValueError):
+            return jsonify({"error": "offset and limit must be integers"}), 400
+        
+        if names == 'all':
+            names = None
+        elif not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            return jsonify({"error": "names must be a list of employee names or \"all\""}), 400
+        
+        now = now_ns()
+        total, rows = session_store.balances(now, names=names, offset=offset, limit=limit)
+        next_offset = offset + len(rows)
+        
+        return jsonify({
+            "balances": [
+                {
+                    "name": name,
+                    "balance": to_strm(balance),
+                    "balance_base_units": balance,
+                    "elapsed_seconds": round(elapsed / NS_PER_SECOND, 2)
+                }
+                for name, balance, elapsed in rows
+            ],
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < total else None,
+            "as_of": now / NS_PER_SECOND
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/balance/stream', methods=['GET'])
+def balance_stream():
+    """
+    Server-Sent Events stream of an employee's session.
+    Sends the current session (start_time, rate, total_claimed, server_time) once, then a new
+    "session" event after every claim or re-login and a "logout" event when streaming stops.
+    Clients compute balance = carried + (now - start_time) * rate - total_claimed themselves,
+    so no per-second polling.
+    With STREAMFI_SESSION_DB set, events from the other workers are relayed here too.
+    Past MAX_EVENT_STREAMS open streams this answers 503 and the dashboard falls back to polling.
+    """
+    employee_name = request.args.get('name')
+    if employee_name not in roster:
+        return jsonify({"error": "Employee not found"}), 404
+    if not _event_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many open event streams, poll /api/balance"}), 503, {"Retry-After": "30"}
+    
+    # Subscribe before reading the snapshot so no change can slip in between
+    events = session_events.subscribe(employee_name)
+    
+    def generate():
+        session = session_store.get(employee_name)
+        if session is not None:
+            yield format_sse("session", session_payload(session))
+        else:
+            yield format_sse("logout", {"total_claimed": 0})
+        while True:
+            try:
+                event, data = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event, data)
+    
+    def close():
+        # Runs when the client disconnects, even if the stream never started
+        session_events.unsubscribe(employee_name, events)
+        _event_streams.release()
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(close)
+    return response
+
+# Longest accepted idempotency key
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+def claim_identity(employee_name, idempotency_key):
+    """
+    Deterministic identifiers for a keyed claim: the store key, the claim ID (also the
+    transaction note) and a 32-byte Algorand lease. While a transfer with a given lease is
+    valid the network rejects any other transfer from the company wallet with the same
+    lease, so even a retry that misses the idempotency record cannot pay twice.
+    """
+    key = f"{employee_name}:{idempotency_key}"
+    claim_id = hashlib.sha256(b"streamfi-claim-id:" + key.encode()).hexdigest()[:32]
+    lease = hashlib.sha256(b"streamfi-claim-lease:" + key.encode()).digest()
+    return key, claim_id, lease
+
+@api.route('/api/claim', methods=['POST'])
+@track_in_flight
 def claim_tokens():
     """
     Transfer STRM tokens from Company Wallet to Employee Collective Wallet.
-    Expects JSON with 'name' and 'amount'. Validates employee exists and amount is >= 1 STRM.
-    Constructs an Algorand AssetTransferTxn, signs it with the company private key,
-    submits it to the network, waits for confirmation, and updates session totals.
+    Expects JSON with 'name' and 'amount'. Validates employee exists and amount is >= 1 STRM
+    and no more than the employee's session has accrued; the amount is reserved against the
+    balance before the transfer is sent. Constructs an Algorand AssetTransferTxn, signs it
+    with the company private key, submits it to the network and waits for confirmation.
+
+    With "async": true in the payload the request returns 202 right after submission
+    with a claim_id; confirmation is followed in the background and can be read
+    from GET /api/claim/<claim_id>.
+
+    An Idempotency-Key header (or "idempotency_key" field) makes retries safe: a repeated
+    request with the same key returns the first request's result instead of transferring again.
+
+    With "dry_run": true (or ?dry_run=1) the transfer is only simulated: nothing is reserved,
+    signed or submitted, and the response predicts success, fee and opcode cost.
     """
     try:
         data = request.json
         employee_name = data.get('name')
-        amount = float(data.get('amount', 0))
+        async_mode = bool(data.get('async', False))
+        dry_run = bool(data.get('dry_run', False)) or request.args.get('dry_run', '').lower() in ("1", "true")
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         
-        if employee_name not in EMPLOYEES:
+        if employee_name not in roster:
             return jsonify({"error": "Employee not found"}), 404
         
+        # Convert STRM to integer base units (2 decimals), rounding down to the token's precision
+        try:
+            amount_base_units = to_base_units(data.get('amount', 0))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Enforce a minimum claim amount for demo
-        if amount < 1:
+        if amount_base_units < BASE_UNITS_PER_STRM:
             return jsonify({"error": "Minimum 1 STRM required"}), 400
         
-        # Convert STRM to base units. This demo assumes 2 decimals -> multiply by 100
-        amount_base_units = int(amount * 100)
-        
-        # Print informative logs for the operator during demo
-        print(f"\n{'='*70}")
-        print(f"🪙 CLAIMING TOKENS")
-        print(f"{'='*70}")
-        print(f"Employee: {employee_name}")
-        print(f"Amount: {amount} STRM")
-        print(f"From (Company): {COMPANY_ADDRESS[:10]}...{COMPANY_ADDRESS[-10:]}")
-        print(f"To (Employee Wallet): {EMPLOYEE_WALLET_ADDRESS[:10]}...{EMPLOYEE_WALLET_ADDRESS[-10:]}")
-        
-        # Fetch recommended transaction params from the algod node (fees, first/last valid rounds)
-        params = algod_client.suggested_params()
-        
-        # Build the ASA transfer transaction object
-        # This will transfer the asset STRM from the company to the employee collective wallet
-        txn = AssetTransferTxn(
-            sender=COMPANY_ADDRESS,
-            sp=params,
-            receiver=EMPLOYEE_WALLET_ADDRESS,
-            amt=amount_base_units,
-            index=STRM_ASSET_ID
-        )
-        
-        # Sign the transaction using the company's private key (server-side signing for demo)
-        signed_txn = txn.sign(company_private_key)
+        if dry_run:
+            return _dry_run_claim(employee_name, amount_base_units)
+        
+        if not idempotency_key:
+            return _submit_claim(employee_name, amount_base_units, async_mode, confirmation_tracker.new_claim_id())
+        
+        idempotency_key = str(idempotency_key)
+        if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return jsonify({"error": f"Idempotency key longer than {MAX_IDEMPOTENCY_KEY_LENGTH} characters"}), 400
+        
+        key, claim_id, lease = claim_identity(employee_name, idempotency_key)
+        fingerprint = json.dumps({"name": employee_name, "amount": amount_base_units}, sort_keys=True)
+        try:
+            record, created = idempotency_store.begin(key, fingerprint, claim_id)
+        except IdempotencyConflict:
+            return jsonify({"error": "Idempotency key was already used for a different claim"}), 422
+        if not created:
+            IDEMPOTENT_REPLAYS.inc()
+            replayed = _replay_claim(record)
+            if replayed is not None:
+                return replayed
+            # The first attempt's transfer can no longer land and was given up: claim afresh
+            record, created = idempotency_store.begin(key, fingerprint, claim_id)
+            if not created:
+                return _in_progress_response(record)
+        
+        response = _submit_claim(employee_name, amount_base_units, async_mode, claim_id, lease=lease, idempotency_key=key)
+        response, status = response if isinstance(response, tuple) else (response, 200)
+        if status == 202:
+            # Async: the record stays in progress until the tracker sees the transfer confirm
+            pass
+        elif status < 400:
+            idempotency_store.complete(key, status, response.get_json())
+        elif idempotency_store.get(key)["transaction_id"] is None:
+            # Released before anything reached the network: let a retry start over
+            idempotency_store.discard(key)
+        # Otherwise the transfer is out there; the record stays in progress and a retry looks it up
+        return response, status
+        
+    except Exception as e:
+        log_event("claim_failed", level=logging.ERROR, error=e)
+        return jsonify({"error": str(e)}), 500
+
+def _replay_claim(record):
+    """
+    Answer a retried claim from its idempotency record instead of transferring again.
+    Returns None when the first attempt's transaction was dropped or expired without
+    landing: its reservation has been returned and the key forgotten, so the caller
+    starts the claim over.
+    """
+    if record["status"] == STATUS_COMPLETED:
+        response = jsonify(record["response_body"])
+        response.headers["Idempotent-Replayed"] = "true"
+        return response, record["response_status"]
+    
+    tx_id = record["transaction_id"]
+    if tx_id is not None:
+        # The first attempt submitted but never answered (timed out, crashed, or is async)
+        claim = json.loads(record["fingerprint"])
+        outcome, detail, landed_tx_id = _claim_outcome(record["claim_id"], tx_id)
+        if outcome == STATUS_CONFIRMED:
+            payload = _confirmed_claim_payload(record["claim_id"], to_strm(claim["amount"]), landed_tx_id, detail)
+            idempotency_store.complete(record["key"], 200, payload)
+            response = jsonify(payload)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response, 200
+        if outcome == CLAIM_DROPPED:
+            # Only the retry that removes the record gives the reservation back
+            if idempotency_store.discard(record["key"], tx_id):
+                release_claim(claim["name"], claim["amount"], record["claim_id"], detail, tx_id=tx_id)
+                log_event("claim_dropped", level=logging.WARNING, claim_id=record["claim_id"], tx_id=tx_id,
+                          error=detail)
+            return None
+    
+    return _in_progress_response(record)
+
+def _in_progress_response(record):
+    """409 for a keyed claim whose first attempt has not resolved yet."""
+    return jsonify({
+        "error": "A claim with this idempotency key is still in progress",
+        "claim_id": record["claim_id"],
+        "transaction_id": record["transaction_id"]
+    }), 409
+
+# _claim_outcome() result for a transaction that can no longer land
+CLAIM_DROPPED = "dropped"
+
+def _claim_outcome(claim_id, tx_id):
+    """
+    What became of a submitted claim transaction, as (outcome, detail, transaction ID):
+    (STATUS_CONFIRMED, block, tx) once it landed, (CLAIM_DROPPED, reason, tx) once it
+    was rejected or the reconciliation ledger has followed the chain past its last valid
+    round without seeing it, else (None, None, tx) while that is still undecided.
+    """
+    # algod's pool knows recent transactions; a 404 means it no longer holds this one
+    try:
+        info = algod_client.pending_transaction_info(tx_id)
+    except Exception:
+        info = {}
+    if info.get("confirmed-round", 0) > 0:
+        return STATUS_CONFIRMED, info["confirmed-round"], tx_id
+    if info.get("pool-error"):
+        return CLAIM_DROPPED, info["pool-error"], tx_id
+    
+    # Past the pool, the ledger's followed transfers decide (they match on the claim ID note)
+    ledger = claim_history.claim(claim_id)
+    if ledger is not None:
+        if ledger["confirmed_round"]:
+            return STATUS_CONFIRMED, ledger["confirmed_round"], ledger["transaction_id"]
+        if ledger["last_valid"] is not None and (ledger["synced_round"] or 0) >= ledger["last_valid"]:
+            return CLAIM_DROPPED, f"Expired after round {ledger['last_valid']} without landing", tx_id
+    
+    # An async claim this worker followed to confirmation
+    tracked = confirmation_tracker.get(claim_id)
+    if tracked is not None and tracked["status"] == STATUS_CONFIRMED and tracked["transaction_id"] == tx_id:
+        return STATUS_CONFIRMED, tracked["block"], tx_id
+    return None, None, tx_id
+
+def _dry_run_claim(employee_name, amount_base_units):
+    """
+    Predict whether a claim would go through: the accrual check runs without reserving,
+    then the unsigned transfer is simulated by algod. Failing backend checks answer like a
+    real claim would; otherwise 200 with the simulation result.
+    """
+    session = session_store.get(employee_name)
+    if session is None:
+        return jsonify({"error": "No active streaming session"}), 400
+    available = claimable(session, now_ns())
+    if amount_base_units > available:
+        return jsonify({
+            "error": "Amount exceeds accrued balance",
+            "claimable": to_strm(available),
+            "claimable_base_units": available
+        }), 400
+    
+    with claim_phase("params"):
+        params = params_provider.get()
+    txn = AssetTransferTxn(
+        sender=COMPANY_ADDRESS,
+        sp=params,
+        receiver=EMPLOYEE_WALLET_ADDRESS,
+        amt=amount_base_units,
+        index=STRM_ASSET_ID
+    )
+    with claim_phase("simulate"):
+        result = simulate_group(algod_client, [txn])
+    CLAIMS.inc(mode="dry_run", outcome="would_succeed" if result["would_succeed"] else "would_fail")
+    log_event("claim_simulated", employee=employee_name, amount=to_strm(amount_base_units),
+              would_succeed=result["would_succeed"], failure=result["failure_message"])
+    
+    return jsonify({
+        "dry_run": True,
+        "would_succeed": result["would_succeed"],
+        "failure_message": result["failure_message"],
+        "amount": to_strm(amount_base_units),
+        "claimable": to_strm(available),
+        "fee": result["fee"],
+        "opcode_cost": result["opcode_cost"],
+        "round": result["last_round"],
+        "from": COMPANY_ADDRESS,
+        "to": EMPLOYEE_WALLET_ADDRESS
+    })
+
+def _submit_claim(employee_name, amount_base_units, async_mode, claim_id, lease=None, idempotency_key=None):
+    """
+    Reserve, sign, submit and (unless async) confirm one claim.
+    `lease` goes into the transaction's lease field; `idempotency_key` gets the transaction ID
+    attached as soon as the transfer has been submitted.
+    """
+    mode = ("batched_" if settlement_batcher is not None else "") + ("async" if async_mode else "sync")
+    amount = to_strm(amount_base_units)
+    try:
+        # Cap the claim at what has actually accrued, and hold it so a concurrent claim cannot spend it too
+        try:
+            session = reserve_claim(employee_name, amount_base_units)
+        except InsufficientAccrual as e:
+            return jsonify({
+                "error": "Amount exceeds accrued balance",
+                "claimable": to_strm(e.claimable),
+                "claimable_base_units": e.claimable
+            }), 400
+        if session is None:
+            return jsonify({"error": "No active streaming session"}), 400
+        # Treasury check from the cached balance: no algod round-trip, nothing signed
+        try:
+            treasury.reserve(claim_id, amount_base_units)
+        except TreasuryInsufficient as e:
+            release_claim(employee_name, amount_base_units)
+            log_event("claim_rejected", level=logging.WARNING, claim_id=claim_id, error=e)
+            CLAIMS.inc(mode=mode, outcome="treasury_insufficient")
+            return jsonify({
+                "error": "Company treasury cannot cover this claim right now",
+                "treasury_available_base_units": e.available
+            }), 503
+        try:
+            claim_history.record_claim(claim_id, employee_name, amount_base_units, mode=mode)
+        except Exception:
+            # Nothing was sent: give back both reservations before reporting the error
+            treasury.release(claim_id)
+            release_claim(employee_name, amount_base_units)
+            raise
+        
+        log_event("claim_started", claim_id=claim_id, employee=employee_name, amount=amount, mode=mode,
+                  sender=COMPANY_ADDRESS, receiver=EMPLOYEE_WALLET_ADDRESS)
+        
+        if settlement_batcher is not None:
+            return _claim_via_batcher(employee_name, amount, amount_base_units, claim_id, async_mode, mode,
+                                      lease, idempotency_key)
+        
+        try:
+            # Recommended transaction params (fees, first/last valid rounds), served from the shared cache
+            with claim_phase("params"):
+                params = params_provider.get()
+            
+            # Build the ASA transfer transaction object
+            # This will transfer the asset STRM from the company to the employee collective wallet.
+            # The claim ID goes in the note so two equal claims in the same round get distinct tx IDs.
+            txn = AssetTransferTxn(
+                sender=COMPANY_ADDRESS,
+                sp=params,
+                receiver=EMPLOYEE_WALLET_ADDRESS,
+                amt=amount_base_units,
+                index=STRM_ASSET_ID,
+                note=claim_id.encode(),
+                lease=lease
+            )
+            
+            # Sign the transaction with the company key (via the signer service when configured)
+            with claim_phase("sign"):
+                signed_txn = signer.sign(txn)
+        except Exception as e:
+            # Nothing was signed, so nothing can reach the network: the reserved amount goes back
+            release_claim(employee_name, amount_base_units, claim_id, str(e))
+            raise
         
         # Send the signed transaction to the network
-        print("📤 Sending transaction to blockchain...")
-        tx_id = algod_client.send_transaction(signed_txn)
-        print(f"✅ Transaction ID: {tx_id}")
+        tx_id = txn.get_txid()
+        try:
+            with claim_phase("submit"):
+                algod_client.send_transaction(signed_txn)
+        except Exception as e:
+            if submission_rejected(e):
+                # algod was never reached or refused the transfer, so the reservation goes back
+                release_claim(employee_name, amount_base_units, claim_id, str(e))
+                raise
+            # Timeout, 5xx or dropped response: the transfer may have landed. Keep the reservation
+            # and follow the transaction ID like any submission; the follower (or, past that,
+            # the reconciliation ledger) decides whether it went through
+            log_event("claim_submit_uncertain", level=logging.WARNING, claim_id=claim_id, tx_id=tx_id, error=e)
+        treasury.submitted(claim_id, txn.last_valid_round)
+        claim_history.attach_transaction(claim_id, tx_id, txn.last_valid_round)
+        if idempotency_key is not None:
+            idempotency_store.attach_transaction(idempotency_key, tx_id)
+        log_event("claim_submitted", claim_id=claim_id, tx_id=tx_id)
+        
+        if async_mode:
+            # Hand confirmation off to the background tracker and free this worker immediately
+            confirmation_tracker.track(
+                claim_id,
+                tx_id,
+                details={"name": employee_name, "amount": amount, "idempotency_key": idempotency_key},
+                on_confirmed=_async_claim_confirmed
+            )
+            CLAIMS.inc(mode=mode, outcome="pending")
+            return _pending_claim_response(claim_id, amount, tx_id)
         
-        # Wait for transaction confirmation for up to a small number of rounds (blocking)
-        print("⏳ Waiting for confirmation...")
-        confirmed_txn = wait_for_confirmation(algod_client, tx_id, 4)
+        # Wait for transaction confirmation for up to a small number of rounds (blocking).
+        # A submitted transfer may still land after a timeout, so its reservation is kept.
+        with claim_phase("confirm"):
+            confirmed_txn = block_follower.wait(tx_id, CONFIRMATION_ROUNDS)
+        treasury.confirmed(claim_id, confirmed_txn['confirmed-round'])
         
-        print(f"✅ Confirmed in block: {confirmed_txn['confirmed-round']}")
-        print(f"{'='*70}\n")
+        log_event("claim_confirmed", claim_id=claim_id, tx_id=tx_id, block=confirmed_txn['confirmed-round'])
+        CLAIMS.inc(mode=mode, outcome="confirmed")
         
-        # If the employee has an active session, update their total claimed and reset timer
-        if employee_name in streaming_sessions:
-            streaming_sessions[employee_name]["total_claimed"] += amount
-            streaming_sessions[employee_name]["start_time"] = time.time()  # Reset the streaming timer
+        return _confirmed_claim_response(claim_id, amount, tx_id, confirmed_txn['confirmed-round'])
+        
+    except Exception as e:
+        # Log and return errors to the caller
+        log_event("claim_failed", level=logging.ERROR, claim_id=claim_id, error=e)
+        CLAIMS.inc(mode=mode, outcome="failed")
+        return jsonify({"error": str(e)}), 500
+
+def _claim_via_batcher(employee_name, amount, amount_base_units, claim_id, async_mode, mode,
+                       lease=None, idempotency_key=None):
+    """
+    Settle an already reserved claim through the settlement batcher.
+    The transfer joins the current atomic group; the group is signed and submitted once
+    and its confirmation is awaited once for every claim in it.
+    """
+    details = {"name": employee_name, "amount": amount, "idempotency_key": idempotency_key}
+    future = settlement_batcher.submit(EMPLOYEE_WALLET_ADDRESS, amount_base_units, note=claim_id.encode(), lease=lease)
+    
+    if async_mode:
+        # Register the claim before its group is sent; the transaction ID is attached on submission
+        confirmation_tracker.track(claim_id, None, details=details, on_confirmed=_async_claim_confirmed)
+        
+        def on_submitted(done):
+            # The batcher fails a claim only when its group provably never reached the network
+            if done.exception() is not None:
+                release_claim(employee_name, amount_base_units, claim_id, str(done.exception()))
+                if idempotency_key is not None:
+                    idempotency_store.discard(idempotency_key)
+                confirmation_tracker.fail(claim_id, str(done.exception()))
+            else:
+                treasury.submitted(claim_id, done.result()["last_valid"])
+                claim_history.attach_transaction(claim_id, done.result()["transaction_id"], done.result()["last_valid"])
+                if idempotency_key is not None:
+                    idempotency_store.attach_transaction(idempotency_key, done.result()["transaction_id"])
+                confirmation_tracker.set_transaction(claim_id, done.result()["transaction_id"])
+        
+        future.add_done_callback(on_submitted)
+        log_event("claim_queued", claim_id=claim_id)
+        CLAIMS.inc(mode=mode, outcome="pending")
+        return _pending_claim_response(claim_id, amount, None)
+    
+    # Batch window, group signing and submission all happen while the claim is queued
+    try:
+        with claim_phase("queue"):
+            submitted = future.result()
+    except Exception as e:
+        # Failed before submission or refused by algod (an uncertain submission still resolves)
+        release_claim(employee_name, amount_base_units, claim_id, str(e))
+        raise
+    tx_id = submitted["transaction_id"]
+    treasury.submitted(claim_id, submitted["last_valid"])
+    claim_history.attach_transaction(claim_id, tx_id, submitted["last_valid"])
+    if idempotency_key is not None:
+        idempotency_store.attach_transaction(idempotency_key, tx_id)
+    log_event("claim_submitted", claim_id=claim_id, tx_id=tx_id, group_size=submitted['group_size'])
+    
+    with claim_phase("confirm"):
+        block = settlement_batcher.confirmation(submitted["group_id"]).result()
+    treasury.confirmed(claim_id, block)
+    log_event("claim_confirmed", claim_id=claim_id, tx_id=tx_id, block=block)
+    CLAIMS.inc(mode=mode, outcome="confirmed")
+    
+    return _confirmed_claim_response(claim_id, amount, tx_id, block, group_id=submitted["group_id"])
+
+def _async_claim_confirmed(record):
+    """
+    Tracker callback: an async claim confirmed. The next treasury read can settle it, and
+    a keyed claim's record now stores the confirmed response for retries to replay.
+    """
+    treasury.confirmed(record["claim_id"], record["block"])
+    idempotency_key = record["details"].get("idempotency_key")
+    if idempotency_key is not None:
+        payload = _confirmed_claim_payload(record["claim_id"], record["details"]["amount"],
+                                           record["transaction_id"], record["block"])
+        idempotency_store.complete(idempotency_key, 200, payload)
+
+def _pending_claim_response(claim_id, amount, tx_id):
+    """202 response for a claim whose confirmation is tracked in the background."""
+    return jsonify({
+        "success": True,
+        "claim_id": claim_id,
+        "status": "pending",
+        "status_url": f"/api/claim/{claim_id}",
+        "transaction_id": tx_id,
+        "amount": amount,
+        "from": COMPANY_ADDRESS,
+        "to": EMPLOYEE_WALLET_ADDRESS,
+        "explorer_url": f"{EXPLORER_TX_URL}{tx_id}" if tx_id else None
+    }), 202
+
+def _confirmed_claim_response(claim_id, amount, tx_id, block, group_id=None):
+    """Response for a claim that has been confirmed on-chain."""
+    return jsonify(_confirmed_claim_payload(claim_id, amount, tx_id, block, group_id))
+
+def _confirmed_claim_payload(claim_id, amount, tx_id, block, group_id=None):
+    """JSON body of a confirmed claim (also what a keyed claim's retries replay)."""
+    # Return transaction details for frontend display and explorer linking
+    payload = {
+        "success": True,
+        "claim_id": claim_id,
+        "transaction_id": tx_id,
+        "amount": amount,
+        "block": block,
+        "from": COMPANY_ADDRESS,
+        "to": EMPLOYEE_WALLET_ADDRESS,
+        "explorer_url": f"{EXPLORER_TX_URL}{tx_id}"
+    }
+    if group_id is not None:
+        payload["group_id"] = group_id
+    return payload
+
+@api.route('/api/claim/<claim_id>', methods=['GET'])
+def claim_status(claim_id):
+    """
+    Report the status of an asynchronously submitted claim.
+    Status is one of pending, confirmed or failed; confirmed claims include the block.
+    """
+    record = confirmation_tracker.get(claim_id)
+    if record is None:
+        return jsonify({"error": "Claim not found"}), 404
+    
+    tx_id = record["transaction_id"]
+    return jsonify({
+        "claim_id": claim_id,
+        "status": record["status"],
+        "transaction_id": tx_id,
+        "block": record["block"],
+        "error": record["error"],
+        "amount": record["details"].get("amount"),
+        "explorer_url": f"{EXPLORER_TX_URL}{tx_id}" if tx_id else None
+    })
+
+# Page size limits for claim history
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 500
+
+@api.route('/api/transactions', methods=['GET'])
+def transactions():
+    """
+    Claim history for one employee, newest first, kept across sessions and logouts.
+    Query: name (required), limit, before (the next_before of the previous page).
+    Each entry carries the ledger status, or "confirmed" with the round once the
+    transfer has been seen on-chain.
+    """
+    try:
+        employee_name = request.args.get('name')
+        if not employee_name:
+            return jsonify({"error": "name is required"}), 400
+        limit = min(max(int(request.args.get('limit', HISTORY_DEFAULT_LIMIT)), 1), HISTORY_MAX_LIMIT)
+        before = request.args.get('before')
+        before = int(before) if before else None
+        
+        entries, next_before = claim_history.history(employee_name, limit=limit, before=before)
+        for entry in entries:
+            entry["amount"] = to_strm(entry["amount_base_units"])
+            tx_id = entry["transaction_id"]
+            entry["explorer_url"] = f"{EXPLORER_TX_URL}{tx_id}" if tx_id else None
         
-        # Return transaction details for frontend display and explorer linking
         return jsonify({
-            "success": True,
-            "transaction_id": tx_id,
-            "amount": amount,
-            "block": confirmed_txn['confirmed-round'],
-            "from": COMPANY_ADDRESS,
-            "to": EMPLOYEE_WALLET_ADDRESS,
-            "explorer_url": f"https://testnet.explorer.perawallet.app/tx/{tx_id}"
+            "name": employee_name,
+            "transactions": entries,
+            "limit": limit,
+            "next_before": next_before,
+            "synced_round": claim_history.cursor()
         })
         
+    except ValueError:
+        return jsonify({"error": "limit and before must be integers"}), 400
     except Exception as e:
-        # Log and return errors to the caller
-        print(f"❌ Claim error: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/logout', methods=['POST'])
+@api.route('/api/reconciliation', methods=['GET'])
+def reconciliation():
+    """
+    Differences between the claim ledger and the STRM transfers seen on-chain, plus
+    recorded vs on-chain totals per employee (?name= for one). ?sync=1 pulls new
+    transfers from the indexer first instead of waiting for the follower.
+    Submitted claims younger than ?grace= seconds are not reported as missing yet.
+    """
+    try:
+        if request.args.get('sync') in ("1", "true") and transfer_follower is not None:
+            transfer_follower.poll_once()
+        grace = float(request.args.get('grace', DEFAULT_GRACE_SECONDS))
+        discrepancies = claim_history.discrepancies(grace_seconds=grace)
+        
+        return jsonify({
+            "synced_round": claim_history.cursor(),
+            "discrepancies": discrepancies,
+            "totals": claim_history.totals(request.args.get('name')),
+            "balanced": not discrepancies
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/logout', methods=['POST'])
 def logout():
     """
     End streaming session for an employee.
@@ -211,11 +1046,12 @@ def logout():
         data = request.json
         employee_name = data.get('name')
         
-        if employee_name in streaming_sessions:
-            total_claimed = streaming_sessions[employee_name]["total_claimed"]
-            # Remove the session data to stop streaming
-            del streaming_sessions[employee_name]
-            print(f"✅ {employee_name} logged out - Total claimed: {total_claimed} STRM")
+        # Remove the session data to stop streaming
+        session = session_store.end(employee_name)
+        if session is not None:
+            total_claimed = to_strm(session["total_claimed"])
+            session_events.publish(employee_name, "logout", {"total_claimed": total_claimed})
+            log_event("logout", employee=employee_name, total_claimed=total_claimed)
         
         return jsonify({"success": True})
         
@@ -223,6 +1059,30 @@ def logout():
         # Return any error encountered during logout
         return jsonify({"error": str(e)}), 500
 
+def create_app(start_background=True):
+    """
+    Application factory used by the dev server, wsgi.py (gunicorn) and asgi.py.
+    With start_background the params follower thread is started and a drain hook is
+    registered so in-flight claims finish before the process exits.
+    """
+    configure_logging()  # STREAMFI_LOG_LEVEL / STREAMFI_LOG_FORMAT; OFF silences request logs
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS so frontend hosted elsewhere can call these endpoints
+    app.register_blueprint(api)
+    
+    if start_background:
+        # Follow rounds in the background so cached params are refreshed before they expire
+        params_provider.start()
+        roster.start()  # Reload the roster when its file or table changes
+        treasury.start()  # Re-read the treasury balance and settle confirmed claims
+        if transfer_follower is not None:
+            transfer_follower.start()  # Cache new company-wallet STRM transfers for reconciliation
+        if hasattr(algod_client, "start"):
+            algod_client.start()  # Periodic health/latency probes across algod nodes
+        atexit.register(drain, float(os.environ.get("STREAMFI_DRAIN_TIMEOUT", "30")))
+    
+    return app
+
 if __name__ == '__main__':
     # Startup banner prints useful runtime info for the demo operator
     print("\n" + "=" * 70)
@@ -232,11 +1092,13 @@ if __name__ == '__main__':
     print(f" Employee Wallet: {EMPLOYEE_WALLET_ADDRESS}")
     print(f" STRM Asset ID: {STRM_ASSET_ID}")
     print(f" Network: Algorand TestNet")
-    print(f" Employees: {len(EMPLOYEES)}")
+    print(f" Employees: {len(roster)}")
     print("=" * 70)
     print(f"\n Flow: Company Wallet → Employee Collective Wallet")
     print(f" (Same wallet for demo - both already opted-in!)")
     print("\n ✅ Server running on http://localhost:5000\n")
     print(" Press CTRL+C to stop\n")
-    # Run the Flask development server on port 5000 for local demos
+    # Run the Flask development server on port 5000 for local demos.
+    # For production use gunicorn (see gunicorn.conf.py / wsgi.py) or an ASGI server (asgi.py).
+    app = create_app()
     app.run(debug=True, port=5000, use_reloader=False)
@@ -0,0 +1,190 @@
+"""
+Publish/subscribe for streaming session changes.
+Backs the Server-Sent Events balance stream: dashboards receive the session
+once and then only change events (login, claim, logout), and extrapolate the
+balance locally instead of polling /api/balance every second.
+
+Subscribers are always local to the process. With STREAMFI_SESSION_DB set (several
+workers sharing sessions), events are also appended to a table in that database, and
+every process relays the other processes' events to its own subscribers, so a claim
+served by one worker reaches dashboards streaming from any other.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from accrual import NS_PER_SECOND, to_strm
+from log_config import log_event
+from sqlite_util import thread_connection
+
+
+def session_payload(session):
+    """
+    Session fields a client needs to extrapolate the balance locally:
+    claimable = floor(elapsed * rate_base_units) - total_claimed_base_units.
+    The STRM / seconds fields are the same values for display.
+    After a rate change, carried_base_units holds what accrued at earlier rates:
+    claimable = carried_base_units + floor(elapsed * rate_base_units) - total_claimed_base_units.
+    """
+    return {
+        "start_time": session["start_ns"] / NS_PER_SECOND,
+        "rate": to_strm(session["rate"]),
+        "total_claimed": to_strm(session["total_claimed"]),
+        "rate_base_units": session["rate"],
+        "total_claimed_base_units": session["total_claimed"],
+        "carried_base_units": session.get("carried", 0),
+        "server_time": time.time()
+    }
+
+
+class SessionEventBroker:
+    """
+    Fans out session events to subscribers, keyed by employee name.
+    Each subscriber gets its own bounded queue; a subscriber that stops reading
+    simply drops events instead of blocking publishers.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, name, q=None):
+        """
+        Register a subscriber for `name` and return its event queue.
+        `q` may be any object with a put_nowait() that raises queue.Full when full
+        (the asyncio server passes one that hands events to its event loop).
+        """
+        if q is None:
+            q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(name, set()).add(q)
+        return q
+
+    def unsubscribe(self, name, q):
+        """Remove a subscriber queue previously returned by subscribe()."""
+        with self._lock:
+            subscribers = self._subscribers.get(name)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[name]
+
+    def publish(self, name, event, data):
+        """Send `event` with JSON-serialisable `data` to every subscriber of `name`."""
+        self._deliver(name, event, data)
+
+    def _deliver(self, name, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(name, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                pass  # Slow consumer; it will resync from the next full session event
+
+    def subscriber_count(self):
+        """Total number of open subscriptions (for monitoring)."""
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+class SQLiteSessionEventBroker(SessionEventBroker):
+    """
+    Broker whose events also reach subscribers in other processes through a shared
+    SQLite database. publish() delivers locally and appends the event to the
+    session_events table. A relay thread (started with the first subscriber) polls the
+    table every `poll_interval` seconds and delivers rows written by other processes.
+    Rows older than `retention` seconds are pruned.
+    """
+
+    CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS session_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            name TEXT NOT NULL,
+            event TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created REAL NOT NULL
+        )
+    """
+    INSERT_SQL = "INSERT INTO session_events (origin, name, event, data, created) VALUES (?, ?, ?, ?, ?)"
+    SELECT_SQL = "SELECT seq, origin, name, event, data FROM session_events WHERE seq > ? ORDER BY seq LIMIT 1000"
+    LAST_SEQ_SQL = "SELECT COALESCE(MAX(seq), 0) FROM session_events"
+    PRUNE_SQL = "DELETE FROM session_events WHERE created < ?"
+
+    def __init__(self, path, max_queue=100, poll_interval=0.25, retention=60):
+        super().__init__(max_queue)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"  # Marks this process's own rows
+        self._local = threading.local()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.relayed = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(self.CREATE_SQL)
+
+    def _connection(self):
+        return thread_connection(self._local, self.path)
+
+    def subscribe(self, name, q=None):
+        q = super().subscribe(name, q)
+        self._start()
+        return q
+
+    def publish(self, name, event, data):
+        self._deliver(name, event, data)
+        try:
+            self._connection().execute(self.INSERT_SQL, (self.origin, name, event, json.dumps(data), time.time()))
+        except sqlite3.Error as e:
+            # The local dashboards already have the event; other workers resync on their next one
+            log_event("session_event_share_failed", level=logging.WARNING, employee=name, error=e)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._relay, name="session-event-relay", daemon=True)
+                self._thread.start()
+
+    def _relay(self):
+        conn = self._connection()
+        last_seq = conn.execute(self.LAST_SEQ_SQL).fetchone()[0]  # Only events from now on
+        pruned_at = 0.0
+        while True:
+            try:
+                for seq, origin, name, event, data in conn.execute(self.SELECT_SQL, (last_seq,)).fetchall():
+                    last_seq = seq
+                    if origin != self.origin:
+                        self._deliver(name, event, json.loads(data))
+                        self.relayed += 1
+                if time.monotonic() - pruned_at > self.retention:
+                    conn.execute(self.PRUNE_SQL, (time.time() - self.retention,))
+                    pruned_at = time.monotonic()
+            except sqlite3.Error as e:
+                log_event("session_event_relay_failed", level=logging.WARNING, error=e)
+            time.sleep(self.poll_interval)
+
+
+def create_event_broker(db_path=None):
+    """
+    Build the session event broker: shared through SQLite when a database path (or
+    STREAMFI_SESSION_DB) is given, like the session store, otherwise in-process only.
+    """
+    db_path = db_path or os.environ.get("STREAMFI_SESSION_DB")
+    if db_path:
+        return SQLiteSessionEventBroker(db_path, poll_interval=float(os.environ.get("STREAMFI_EVENT_POLL", "0.25")))
+    return SessionEventBroker()
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,373 @@
+"""
+Streaming session storage for StreamFi.
+Sessions hold start_ns, rate, total_claimed and carried per employee, all integers
+(see accrual.py). The in-memory store keeps the original module-level dict; the compact
+store keeps the same fields in int64 columns (session_table.py) for very large session
+counts; the SQLite store persists sessions across restarts and lets several worker
+processes share the same accrual state.
+"""
+
+import json
+import os
+import threading
+
+from accrual import NS_PER_SECOND, InsufficientAccrual, accrued, change_rate, claimable
+from session_table import SessionTable
+from sqlite_util import thread_connection
+
+
+class SessionStore:
+    """
+    Interface for session backends.
+    Session dicts always carry the keys start_ns (int nanoseconds), rate (base units per
+    second), total_claimed (base units claimed since login) and carried (base units accrued
+    at earlier rates before start_ns).
+    """
+
+    def start(self, name, rate, now_ns):
+        """Create (or restart) a session for `name` and return it."""
+        raise NotImplementedError
+
+    def get(self, name):
+        """Return the session for `name`, or None when there is no active session."""
+        raise NotImplementedError
+
+    def end(self, name):
+        """Remove the session for `name` and return it, or None if it did not exist."""
+        raise NotImplementedError
+
+    def claim(self, name, amount, now_ns):
+        """
+        Atomically reserve `amount` base units against what the session has accrued by now_ns.
+        Returns the updated session, or None when `name` has no active session.
+        Raises InsufficientAccrual when `amount` exceeds the claimable balance.
+        """
+        raise NotImplementedError
+
+    def release(self, name, amount):
+        """
+        Give back a reservation whose transfer was never submitted.
+        Returns the updated session, or None when `name` has no active session.
+        """
+        raise NotImplementedError
+
+    def change_rate(self, name, rate, now_ns):
+        """
+        Move the session to `rate` from now_ns on, keeping what accrued at the old rate.
+        A no-op when the session already runs at `rate`, so every worker may apply the same
+        roster change. Returns the session, or None when `name` has no active session.
+        """
+        raise NotImplementedError
+
+    def all(self):
+        """Return a {name: session} snapshot of every active session."""
+        raise NotImplementedError
+
+    def count(self):
+        """Number of active sessions."""
+        raise NotImplementedError
+
+    def balances(self, now_ns, names=None, offset=0, limit=None):
+        """
+        Claimable balances for many sessions in one pass, ordered by name.
+        `names` restricts the result to those employees (None means every active session).
+        Returns (total_matching, [(name, claimable_base_units, elapsed_ns), ...]) for the requested page.
+        """
+        raise NotImplementedError
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store backed by a plain dict (the original demo behaviour)."""
+
+    def __init__(self, sessions=None):
+        self.sessions = sessions if sessions is not None else {}
+        self._lock = threading.Lock()
+
+    def start(self, name, rate, now_ns):
+        session = {"start_ns": now_ns, "rate": rate, "total_claimed": 0, "carried": 0}
+        with self._lock:
+            self.sessions[name] = session
+        return dict(session)
+
+    def get(self, name):
+        session = self.sessions.get(name)
+        return dict(session) if session is not None else None
+
+    def end(self, name):
+        with self._lock:
+            return self.sessions.pop(name, None)
+
+    def claim(self, name, amount, now_ns):
+        with self._lock:
+            session = self.sessions.get(name)
+            if session is None:
+                return None
+            available = claimable(session, now_ns)
+            if amount > available:
+                raise InsufficientAccrual(amount, available)
+            session["total_claimed"] += amount
+            return dict(session)
+
+    def release(self, name, amount):
+        with self._lock:
+            session = self.sessions.get(name)
+            if session is None:
+                return None
+            session["total_claimed"] = max(session["total_claimed"] - amount, 0)
+            return dict(session)
+
+    def change_rate(self, name, rate, now_ns):
+        with self._lock:
+            session = self.sessions.get(name)
+            if session is None:
+                return None
+            if session["rate"] != rate:
+                session.update(change_rate(session, rate, now_ns))
+            return dict(session)
+
+    def all(self):
+        with self._lock:
+            return {name: dict(session) for name, session in self.sessions.items()}
+
+    def count(self):
+        return len(self.sessions)
+
+    def balances(self, now_ns, names=None, offset=0, limit=None):
+        with self._lock:
+            if names is None:
+                selected = sorted(self.sessions)
+            else:
+                selected = sorted(set(names).intersection(self.sessions))
+            page = selected[offset:offset + limit if limit is not None else None]
+            # Pull the page out as columns, then accrue them with one zipped expression
+            starts = [self.sessions[name]["start_ns"] for name in page]
+            rates = [self.sessions[name]["rate"] for name in page]
+            carried = [self.sessions[name]["carried"] for name in page]
+            claimed = [self.sessions[name]["total_claimed"] for name in page]
+        elapsed = [max(now_ns - start, 0) for start in starts]
+        amounts = [
+            max(k + accrued(r, s, now_ns) - c, 0) for r, s, c, k in zip(rates, starts, claimed, carried)
+        ]
+        return len(selected), list(zip(page, amounts, elapsed))
+
+
+class CompactSessionStore(SessionStore):
+    """
+    Process-local store backed by a SessionTable: int64 columns instead of a dict per
+    session, with logged-out slots reused (STREAMFI_SESSION_STORE=compact).
+    """
+
+    def __init__(self):
+        self.table = SessionTable()
+        self._lock = threading.Lock()
+
+    def start(self, name, rate, now_ns):
+        with self._lock:
+            return self.table.start(name, rate, now_ns)
+
+    def get(self, name):
+        with self._lock:
+            return self.table.get(name)
+
+    def end(self, name):
+        with self._lock:
+            return self.table.end(name)
+
+    def claim(self, name, amount, now_ns):
+        with self._lock:
+            return self.table.claim(name, amount, now_ns)
+
+    def release(self, name, amount):
+        with self._lock:
+            return self.table.release(name, amount)
+
+    def change_rate(self, name, rate, now_ns):
+        with self._lock:
+            return self.table.change_rate(name, rate, now_ns)
+
+    def all(self):
+        with self._lock:
+            return dict(self.table.items())
+
+    def count(self):
+        return len(self.table)
+
+    def balances(self, now_ns, names=None, offset=0, limit=None):
+        with self._lock:
+            if names is None:
+                selected = sorted(self.table.names())
+            else:
+                selected = sorted(name for name in set(names) if name in self.table)
+            page = selected[offset:offset + limit if limit is not None else None]
+            return len(selected), self.table.balances(now_ns, page)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store that survives restarts and is safe to share between processes.
+    Runs in WAL mode so readers never block the writer; claims run in a single
+    IMMEDIATE transaction so concurrent claims cannot overdraw the accrual.
+    """
+
+    # Statements are bound with parameters, so sqlite3 prepares each one once per connection
+    CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS accrual_sessions (
+            name TEXT PRIMARY KEY,
+            start_ns INTEGER NOT NULL,
+            rate INTEGER NOT NULL,
+            total_claimed INTEGER NOT NULL DEFAULT 0,
+            carried INTEGER NOT NULL DEFAULT 0
+        )
+    """
+    UPSERT_SQL = """
+        INSERT INTO accrual_sessions (name, start_ns, rate, total_claimed) VALUES (?, ?, ?, 0)
+        ON CONFLICT(name) DO UPDATE SET start_ns = excluded.start_ns, rate = excluded.rate, total_claimed = 0, carried = 0
+    """
+    SELECT_SQL = "SELECT start_ns, rate, total_claimed, carried FROM accrual_sessions WHERE name = ?"
+    SELECT_ALL_SQL = "SELECT name, start_ns, rate, total_claimed, carried FROM accrual_sessions"
+    COUNT_ALL_SQL = "SELECT COUNT(*) FROM accrual_sessions"
+    DELETE_SQL = "DELETE FROM accrual_sessions WHERE name = ?"
+    # Claimable balances are computed inside SQLite in one set-based query, with the same
+    # whole-seconds/remainder split as accrual.accrued() so the integer products cannot overflow.
+    # Names arrive as a JSON array so the statement text is the same for any number of names.
+    BALANCES_SQL = f"""
+        SELECT name,
+               MAX(carried
+                   + (MAX(:now - start_ns, 0) / {NS_PER_SECOND}) * rate
+                   + (MAX(:now - start_ns, 0) % {NS_PER_SECOND}) * rate / {NS_PER_SECOND}
+                   - total_claimed, 0),
+               MAX(:now - start_ns, 0)
+        FROM accrual_sessions
+        WHERE :names IS NULL OR name IN (SELECT value FROM json_each(:names))
+        ORDER BY name LIMIT :limit OFFSET :offset
+    """
+    COUNT_SQL = """
+        SELECT COUNT(*) FROM accrual_sessions WHERE ? IS NULL OR name IN (SELECT value FROM json_each(?))
+    """
+    CLAIM_SQL = "UPDATE accrual_sessions SET total_claimed = total_claimed + ? WHERE name = ?"
+    RELEASE_SQL = "UPDATE accrual_sessions SET total_claimed = MAX(total_claimed - ?, 0) WHERE name = ?"
+    CHANGE_RATE_SQL = "UPDATE accrual_sessions SET start_ns = ?, rate = ?, carried = ? WHERE name = ?"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(self.CREATE_SQL)
+
+    def _connection(self):
+        return thread_connection(self._local, self.path)
+
+    @staticmethod
+    def _row_to_session(row):
+        return {"start_ns": row[0], "rate": row[1], "total_claimed": row[2], "carried": row[3]}
+
+    def start(self, name, rate, now_ns):
+        self._connection().execute(self.UPSERT_SQL, (name, now_ns, rate))
+        return {"start_ns": now_ns, "rate": rate, "total_claimed": 0, "carried": 0}
+
+    def get(self, name):
+        row = self._connection().execute(self.SELECT_SQL, (name,)).fetchone()
+        return self._row_to_session(row) if row else None
+
+    def end(self, name):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(self.SELECT_SQL, (name,)).fetchone()
+            if row:
+                conn.execute(self.DELETE_SQL, (name,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._row_to_session(row) if row else None
+
+    def claim(self, name, amount, now_ns):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front, so the check-and-reserve cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(self.SELECT_SQL, (name,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            session = self._row_to_session(row)
+            available = claimable(session, now_ns)
+            if amount > available:
+                raise InsufficientAccrual(amount, available)
+            conn.execute(self.CLAIM_SQL, (amount, name))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        session["total_claimed"] += amount
+        return session
+
+    def release(self, name, amount):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(self.RELEASE_SQL, (amount, name))
+            row = conn.execute(self.SELECT_SQL, (name,)).fetchone() if cursor.rowcount else None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._row_to_session(row) if row else None
+
+    def change_rate(self, name, rate, now_ns):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(self.SELECT_SQL, (name,)).fetchone()
+            session = self._row_to_session(row) if row else None
+            if session is not None and session["rate"] != rate:
+                session = change_rate(session, rate, now_ns)
+                conn.execute(self.CHANGE_RATE_SQL, (session["start_ns"], rate, session["carried"], name))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return session
+
+    def all(self):
+        rows = self._connection().execute(self.SELECT_ALL_SQL).fetchall()
+        return {row[0]: self._row_to_session(row[1:]) for row in rows}
+
+    def count(self):
+        return self._connection().execute(self.COUNT_ALL_SQL).fetchone()[0]
+
+    def balances(self, now_ns, names=None, offset=0, limit=None):
+        names_json = json.dumps(list(names)) if names is not None else None
+        conn = self._connection()
+        # Count and page read from one snapshot
+        conn.execute("BEGIN")
+        try:
+            total = conn.execute(self.COUNT_SQL, (names_json, names_json)).fetchone()[0]
+            rows = conn.execute(
+                self.BALANCES_SQL,
+                {"now": now_ns, "names": names_json, "limit": limit if limit is not None else -1, "offset": offset}
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return total, [tuple(row) for row in rows]
+
+
+def create_session_store(db_path=None, sessions=None, kind=None):
+    """
+    Build the configured session store.
+    With a database path (or STREAMFI_SESSION_DB) sessions go to SQLite; otherwise they stay
+    in process: in the given dict, or in a compact column table when `kind` (or
+    STREAMFI_SESSION_STORE) is "compact".
+    """
+    db_path = db_path or os.environ.get("STREAMFI_SESSION_DB")
+    if db_path:
+        return SQLiteSessionStore(db_path)
+    kind = kind or os.environ.get("STREAMFI_SESSION_STORE", "dict")
+    if kind == "compact":
+        return CompactSessionStore()
+    return InMemorySessionStore(sessions)
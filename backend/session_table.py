@@ -0,0 +1,142 @@
+"""
+Compact in-memory session table for large numbers of concurrent streams.
+A dict per session costs a few hundred bytes of object overhead before any data.
+Here the four session fields live in contiguous int64 columns (array('q')): start_ns,
+rate, total_claimed and carried. Each employee name maps to a slot, which costs
+32 bytes of column data plus one dict entry. The columns grow a block of slots at a
+time. A logged-out employee's slot goes on a free list and is reused by the next
+login, so the columns do not grow with churn.
+Bulk accrual walks the columns with zip instead of looking up string keys per session.
+
+Values must fit in a signed 64-bit integer. Nanosecond timestamps (about 1.8e18 today)
+and base-unit amounts do.
+"""
+
+from array import array
+
+from accrual import InsufficientAccrual, accrued
+
+# Slots added at a time when the table is full (one extend per column instead of an append per login)
+GROWTH_BLOCK = 1024
+
+
+class SessionTable:
+    """
+    Sessions stored column-wise, addressed by name through a name -> slot index.
+    Not thread-safe by itself; CompactSessionStore (session_store.py) adds the lock.
+    """
+
+    def __init__(self):
+        self.start_ns = array("q")
+        self.rate = array("q")
+        self.total_claimed = array("q")
+        self.carried = array("q")
+        self._slots = {}  # name -> slot
+        self._names = []  # slot -> name (None for a free slot)
+        self._free = []  # Unused slots (given back by end() or not yet handed out), lowest last
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def capacity(self):
+        """Slots allocated in the columns (active sessions plus free slots)."""
+        return len(self._names)
+
+    def names(self):
+        return list(self._slots)
+
+    def _session(self, slot):
+        return {
+            "start_ns": self.start_ns[slot],
+            "rate": self.rate[slot],
+            "total_claimed": self.total_claimed[slot],
+            "carried": self.carried[slot],
+        }
+
+    def start(self, name, rate, now_ns):
+        """Create (or restart) the session for `name` in its slot, a free slot or a new one."""
+        slot = self._slots.get(name)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._names[slot] = name
+            self._slots[name] = slot
+        self.start_ns[slot] = now_ns
+        self.rate[slot] = rate
+        self.total_claimed[slot] = 0
+        self.carried[slot] = 0
+        return self._session(slot)
+
+    def _grow(self):
+        first = len(self._names)
+        zeros = array("q", bytes(8 * GROWTH_BLOCK))
+        for column in (self.start_ns, self.rate, self.total_claimed, self.carried):
+            column.extend(zeros)
+        self._names.extend([None] * GROWTH_BLOCK)
+        self._free.extend(range(first + GROWTH_BLOCK - 1, first - 1, -1))
+
+    def get(self, name):
+        slot = self._slots.get(name)
+        return self._session(slot) if slot is not None else None
+
+    def end(self, name):
+        """Remove the session and free its slot; returns the session or None."""
+        slot = self._slots.pop(name, None)
+        if slot is None:
+            return None
+        session = self._session(slot)
+        self._names[slot] = None
+        self._free.append(slot)
+        return session
+
+    def claimable(self, slot, now_ns):
+        total = self.carried[slot] + accrued(self.rate[slot], self.start_ns[slot], now_ns)
+        return max(total - self.total_claimed[slot], 0)
+
+    def claim(self, name, amount, now_ns):
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        available = self.claimable(slot, now_ns)
+        if amount > available:
+            raise InsufficientAccrual(amount, available)
+        self.total_claimed[slot] += amount
+        return self._session(slot)
+
+    def release(self, name, amount):
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        self.total_claimed[slot] = max(self.total_claimed[slot] - amount, 0)
+        return self._session(slot)
+
+    def change_rate(self, name, rate, now_ns):
+        """Bank what accrued at the old rate in carried and restart accrual at now_ns (see accrual.change_rate)."""
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        if self.rate[slot] != rate:
+            self.carried[slot] += accrued(self.rate[slot], self.start_ns[slot], now_ns)
+            self.start_ns[slot] = now_ns
+            self.rate[slot] = rate
+        return self._session(slot)
+
+    def items(self):
+        """(name, session) for every active session."""
+        return [(name, self._session(slot)) for name, slot in self._slots.items()]
+
+    def balances(self, now_ns, names):
+        """[(name, claimable, elapsed_ns)] for `names` (all must be active), in the given order."""
+        slots = [self._slots[name] for name in names]
+        starts = [self.start_ns[s] for s in slots]
+        rates = [self.rate[s] for s in slots]
+        claimed = [self.total_claimed[s] for s in slots]
+        carried = [self.carried[s] for s in slots]
+        return [
+            (name, max(k + accrued(r, start, now_ns) - c, 0), max(now_ns - start, 0))
+            for name, start, r, c, k in zip(names, starts, rates, claimed, carried)
+        ]
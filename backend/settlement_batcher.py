@@ -0,0 +1,177 @@
+"""
+Batched claim settlement for StreamFi.
+Collects claims for a short window and settles them as atomic transaction
+groups of up to 16 STRM transfers, so a burst of claims costs one params
+fetch, one submission and one confirmation wait per group instead of per claim.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from algosdk.transaction import AssetTransferTxn, assign_group_id
+
+from algod_pool import submission_rejected
+from block_follower import follower_for
+from log_config import log_event
+
+# Algorand caps atomic groups at 16 transactions
+MAX_GROUP_SIZE = 16
+
+
+class SettlementBatcher:
+    """
+    Packs queued STRM transfers into atomic groups and submits each group once.
+
+    submit() returns a Future that resolves after the group is sent, with the
+    claim's transaction_id, group_id, group_index, group_size and last_valid (the last
+    round the group can be confirmed in). A group is
+    atomic: if it fails before submission or algod refuses it, every claim in it fails
+    with the same error. A submission that may have been accepted (timeout, 5xx) still
+    resolves, and confirmation() decides whether the group landed.
+    confirmation(group_id) returns a Future shared by every claim in the group.
+    """
+
+    def __init__(self, algod_client, sender, signer, asset_id,
+                 window=0.2, max_group_size=MAX_GROUP_SIZE, wait_rounds=4, params_source=None, follower=None):
+        self.algod_client = algod_client
+        # Shared BlockFollower that resolves group confirmations (one algod pass per round)
+        self.follower = follower or follower_for(algod_client)
+        # Callable returning suggested params (e.g. SuggestedParamsProvider.get); defaults to algod
+        self.params_source = params_source or algod_client.suggested_params
+        self.sender = sender
+        self.signer = signer  # LocalSigner or RemoteSigner; the whole group is signed in one call
+        self.asset_id = asset_id
+        self.window = window  # Seconds to keep collecting after the first claim arrives
+        self.max_group_size = min(max_group_size, MAX_GROUP_SIZE)
+        self.wait_rounds = wait_rounds
+        self._queue = []
+        self._in_progress = 0  # Claims taken off the queue whose group is being submitted
+        self._cond = threading.Condition()
+        self._confirmations = {}
+        self._confirm_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="group-confirm")
+        self._thread = None
+
+    def start(self):
+        """Start the batching thread (idempotent)."""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="settlement-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, receiver, amount_base_units, note=None, lease=None):
+        """
+        Queue one STRM transfer. Returns a Future resolved once its group is submitted.
+        `lease` (32 bytes) makes the network reject any other transfer with the same lease
+        while this one is valid.
+        """
+        future = Future()
+        with self._cond:
+            self._queue.append({
+                "receiver": receiver,
+                "amount": amount_base_units,
+                "note": note,
+                "lease": lease,
+                "future": future,
+            })
+            self._cond.notify()
+        self.start()
+        return future
+
+    def pending_count(self):
+        """Claims queued but not yet submitted."""
+        with self._cond:
+            return len(self._queue) + self._in_progress
+
+    def confirmation(self, group_id):
+        """Future resolving to the confirmed round of a submitted group (one wait per group)."""
+        with self._cond:
+            return self._confirmations[group_id]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._settle(batch)
+            except Exception as e:
+                # Group is atomic: the whole batch fails together
+                for item in batch:
+                    if not item["future"].done():
+                        item["future"].set_exception(e)
+            finally:
+                with self._cond:
+                    self._in_progress = 0
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # Keep collecting until the window closes or a full group is ready
+            deadline = time.monotonic() + self.window
+            while len(self._queue) < self.max_group_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:self.max_group_size]
+            del self._queue[:self.max_group_size]
+            self._in_progress = len(batch)
+            return batch
+
+    def _settle(self, batch):
+        # One params fetch shared by the whole group
+        params = self.params_source()
+        txns = [
+            AssetTransferTxn(
+                sender=self.sender,
+                sp=params,
+                receiver=item["receiver"],
+                amt=item["amount"],
+                index=self.asset_id,
+                note=item["note"],
+                lease=item["lease"]
+            )
+            for item in batch
+        ]
+        if len(txns) > 1:
+            assign_group_id(txns)
+        signed = self.signer.sign_many(txns)
+
+        tx_ids = [stxn.get_txid() for stxn in signed]
+        group_id = tx_ids[0]  # The first transaction ID identifies the group
+
+        # Single submission for the whole group
+        try:
+            self.algod_client.send_transactions(signed)
+        except Exception as e:
+            if submission_rejected(e):
+                raise
+            # algod may have taken the group: follow it like a sent one rather than fail claims that landed
+            log_event("group_submit_uncertain", level=logging.WARNING, group_id=group_id, error=e)
+        with self._cond:
+            self._confirmations[group_id] = self._confirm_pool.submit(self._wait_for_group, group_id)
+
+        for index, item in enumerate(batch):
+            item["future"].set_result({
+                "transaction_id": tx_ids[index],
+                "group_id": group_id,
+                "group_index": index,
+                "group_size": len(batch),
+                "last_valid": params.last,
+            })
+
+    def _wait_for_group(self, group_id):
+        try:
+            # Groups confirm atomically, so waiting on the first transaction covers all of them
+            confirmed = self.follower.wait(group_id, self.wait_rounds)
+            return confirmed["confirmed-round"]
+        finally:
+            # Drop the shared future a little later so late readers still find it
+            timer = threading.Timer(60, self._forget, args=(group_id,))
+            timer.daemon = True
+            timer.start()
+
+    def _forget(self, group_id):
+        with self._cond:
+            self._confirmations.pop(group_id, None)
@@ -0,0 +1,305 @@
+"""
+Transaction signing for StreamFi, optionally out of process.
+The signer service is a separate process that owns the company key and signs
+batches of transactions sent to it over a Unix socket, spreading large batches
+across every core. The backend signs only through it (STREAMFI_SIGNER_SOCKET) and
+refuses to start without it, unless in-process signing is switched on explicitly for
+development with STREAMFI_ALLOW_LOCAL_SIGNER=1. The contracts/ scripts use the socket
+when it is set and otherwise sign locally. Keys are never in the code: the service and
+any local signer read the 25-word mnemonic from STREAMFI_SIGNER_MNEMONIC_FILE (a file)
+or STREAMFI_SIGNER_MNEMONIC.
+
+    STREAMFI_SIGNER_MNEMONIC_FILE=company.key python signer_service.py --socket /run/streamfi/signer.sock
+    STREAMFI_SIGNER_SOCKET=/run/streamfi/signer.sock gunicorn -c gunicorn.conf.py wsgi:app
+
+Protocol: one JSON object per line. {"op": "address"} returns {"address": ...};
+{"op": "sign", "txns": [base64 msgpack, ...]} returns {"signed": [base64 msgpack, ...]}.
+Failures come back as {"error": "..."}.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from algosdk import account, encoding, mnemonic
+
+# Batches at least this large are split across worker processes; smaller ones are signed
+# in the connection thread, where process hand-off would cost more than the signatures
+PARALLEL_THRESHOLD = 32
+
+
+class SignerError(Exception):
+    """The signer refused a request or could not be reached."""
+
+
+class LocalSigner:
+    """Signs in-process with a private key (tooling scripts and development only)."""
+
+    def __init__(self, private_key):
+        self._private_key = private_key
+        self.address = account.address_from_private_key(private_key)
+
+    def sign(self, txn):
+        return txn.sign(self._private_key)
+
+    def sign_many(self, txns):
+        return [txn.sign(self._private_key) for txn in txns]
+
+
+class RemoteSigner:
+    """
+    Client for the signer service. Keeps one socket per thread and sends every
+    sign_many() call as a single batched request.
+    """
+
+    def __init__(self, socket_path, timeout=10):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._address = None
+
+    @property
+    def address(self):
+        if self._address is None:
+            self._address = self._call({"op": "address"})["address"]
+        return self._address
+
+    def sign(self, txn):
+        return self.sign_many([txn])[0]
+
+    def sign_many(self, txns):
+        txns = list(txns)
+        if not txns:
+            return []
+        response = self._call({"op": "sign", "txns": [encoding.msgpack_encode(txn) for txn in txns]})
+        return [encoding.msgpack_decode(signed) for signed in response["signed"]]
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock, sock.makefile("rb")
+
+    def _call(self, request):
+        payload = (json.dumps(request) + "\n").encode()
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+                sock, reader = conn
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionResetError("signer closed the connection")
+                break
+            except OSError as e:
+                # Drop the broken connection; retry once on a fresh one (the signer may have restarted)
+                if conn is not None:
+                    conn[0].close()
+                self._local.conn = None
+                if attempt == 1:
+                    raise SignerError(f"Signer unavailable at {self.socket_path}: {e}") from e
+        response = json.loads(line)
+        if "error" in response:
+            raise SignerError(response["error"])
+        return response
+
+
+def read_mnemonic(mnemonic_file=None):
+    """
+    The 25-word mnemonic from `mnemonic_file`, else the file named by
+    STREAMFI_SIGNER_MNEMONIC_FILE, else STREAMFI_SIGNER_MNEMONIC ("" when none is set).
+    """
+    mnemonic_file = mnemonic_file or os.environ.get("STREAMFI_SIGNER_MNEMONIC_FILE")
+    if mnemonic_file:
+        with open(mnemonic_file) as f:
+            return f.read().strip()
+    return os.environ.get("STREAMFI_SIGNER_MNEMONIC", "").strip()
+
+
+def create_signer(socket_path=None, allow_local=False):
+    """
+    Signer for the company wallet: the signer service when STREAMFI_SIGNER_SOCKET (or
+    `socket_path`) is set. Otherwise a LocalSigner with the key from read_mnemonic(), but
+    only for callers that allow it (the contracts/ scripts) or with the development flag
+    STREAMFI_ALLOW_LOCAL_SIGNER=1; anything else raises SignerError.
+    """
+    socket_path = socket_path or os.environ.get("STREAMFI_SIGNER_SOCKET")
+    if socket_path:
+        return RemoteSigner(socket_path)
+    if not (allow_local or os.environ.get("STREAMFI_ALLOW_LOCAL_SIGNER") == "1"):
+        raise SignerError(
+            "No signer service configured: set STREAMFI_SIGNER_SOCKET "
+            "(or STREAMFI_ALLOW_LOCAL_SIGNER=1 to sign in-process during development)"
+        )
+    words = read_mnemonic()
+    if not words:
+        raise SignerError("Local signing needs STREAMFI_SIGNER_MNEMONIC_FILE or STREAMFI_SIGNER_MNEMONIC")
+    return LocalSigner(mnemonic.to_private_key(words))
+
+
+# -- service side -------------------------------------------------------------
+
+_worker_key = None
+
+
+def _init_worker(private_key):
+    global _worker_key
+    _worker_key = private_key
+
+
+def _sign_chunk(encoded_txns):
+    """Runs in a worker process: decode, sign and re-encode a slice of the batch."""
+    return [encoding.msgpack_encode(encoding.msgpack_decode(txn).sign(_worker_key)) for txn in encoded_txns]
+
+
+class SignerService:
+    """
+    Owns the private key and signs batches for connected clients.
+    Only transactions sent by the key's own address are signed, and rekeys or
+    close-outs are refused, so a compromised backend cannot hand the wallet away.
+    """
+
+    def __init__(self, private_key, workers=None, parallel_threshold=PARALLEL_THRESHOLD):
+        self._private_key = private_key
+        self.address = account.address_from_private_key(private_key)
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._pool = None
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(private_key,)
+            )
+        self.signed = 0
+        self.batches = 0
+        self._stats_lock = threading.Lock()
+
+    def check(self, txn):
+        if txn.sender != self.address:
+            raise SignerError(f"Refusing to sign for sender {txn.sender}")
+        if getattr(txn, "rekey_to", None):
+            raise SignerError("Refusing to sign a rekey transaction")
+        if getattr(txn, "close_remainder_to", None) or getattr(txn, "close_assets_to", None):
+            raise SignerError("Refusing to sign a close-out transaction")
+
+    def sign_encoded(self, encoded_txns):
+        txns = [encoding.msgpack_decode(txn) for txn in encoded_txns]
+        for txn in txns:
+            self.check(txn)
+        if self._pool is None or len(txns) < self.parallel_threshold:
+            signed = [encoding.msgpack_encode(txn.sign(self._private_key)) for txn in txns]
+        else:
+            # Contiguous chunks, one per worker, so results come back in request order
+            size = -(-len(encoded_txns) // self.workers)
+            chunks = [encoded_txns[i:i + size] for i in range(0, len(encoded_txns), size)]
+            signed = [txn for chunk in self._pool.map(_sign_chunk, chunks) for txn in chunk]
+        with self._stats_lock:
+            self.signed += len(signed)
+            self.batches += 1
+        return signed
+
+    def handle(self, request):
+        op = request.get("op")
+        if op == "address":
+            return {"address": self.address}
+        if op == "sign":
+            return {"signed": self.sign_encoded(request.get("txns", []))}
+        if op == "stats":
+            with self._stats_lock:
+                return {"signed": self.signed, "batches": self.batches, "workers": self.workers}
+        raise SignerError(f"Unknown op {op!r}")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class _SignerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            try:
+                response = service.handle(json.loads(line))
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class _SignerSocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(private_key, socket_path, workers=None):
+    """Run the signer service on `socket_path` until interrupted."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    service = SignerService(private_key, workers=workers)
+    server = _SignerSocketServer(socket_path, _SignerRequestHandler)
+    server.service = service
+    os.chmod(socket_path, 0o600)  # Only the backend's user may ask for signatures
+    print(f"🔐 Signer for {service.address} listening on {socket_path} ({service.workers} workers)")
+    signal.signal(signal.SIGTERM, _raise_interrupt)  # Clean up the socket on a normal stop too
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StreamFi signer service (owns the company key)")
+    parser.add_argument("--socket", default=os.environ.get("STREAMFI_SIGNER_SOCKET", "/tmp/streamfi-signer.sock"))
+    parser.add_argument("--mnemonic-file", help="file holding the 25-word mnemonic (else STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC)")
+    parser.add_argument("--workers", type=int, default=None, help="signing processes (default: all cores)")
+    parser.add_argument("--bench", type=int, default=0, help="sign this many transfers locally and exit")
+    args = parser.parse_args()
+
+    words = read_mnemonic(args.mnemonic_file)
+    if not words:
+        parser.error("provide --mnemonic-file, STREAMFI_SIGNER_MNEMONIC_FILE or STREAMFI_SIGNER_MNEMONIC")
+    private_key = mnemonic.to_private_key(words)
+
+    if args.bench:
+        bench(private_key, args.bench, args.workers)
+        return
+    serve(private_key, args.socket, workers=args.workers)
+
+
+def bench(private_key, count, workers=None):
+    """Compare single-core and multi-process signing throughput for `count` transfers."""
+    from algosdk.transaction import AssetTransferTxn, SuggestedParams
+
+    address = account.address_from_private_key(private_key)
+    params = SuggestedParams(1000, 1000, 2000, "SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=", flat_fee=True)
+    encoded = [
+        encoding.msgpack_encode(AssetTransferTxn(address, params, address, i + 1, 1, note=str(i).encode()))
+        for i in range(count)
+    ]
+    for label, service_workers in (("1 process", 1), (f"{workers or os.cpu_count()} processes", workers)):
+        service = SignerService(private_key, workers=service_workers)
+        if service._pool is not None:
+            list(service._pool.map(_sign_chunk, [encoded[:1]] * service.workers))  # Start the workers first
+        started = time.perf_counter()
+        service.sign_encoded(encoded)
+        elapsed = time.perf_counter() - started
+        service.shutdown()
+        print(f" {label:<14} {count / elapsed:>10.0f} signatures/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Dry runs through algod's simulate endpoint.
+A transaction group (signed or not) is evaluated against the current ledger without
+being committed, and the response is condensed into what a caller needs before
+sending it for real: predicted success, the failure message, fees and opcode cost.
+Works with algod.AlgodClient, the AlgodRouter and fake_algod.FakeAlgodClient.
+"""
+
+import base64
+
+from algosdk import transaction
+from algosdk.v2client.models import SimulateRequest, SimulateRequestTransactionGroup
+
+# ARC-4 prefix of the log line carrying an ABI method's return value
+ABI_RETURN_PREFIX = bytes.fromhex("151f7c75")
+
+
+def _unsigned(txn):
+    return getattr(txn, "transaction", txn)
+
+
+def simulate_group(algod_client, txns, extra_opcode_budget=0, allow_unnamed_resources=False):
+    """
+    Simulate `txns` as one group. Unsigned transactions are sent with empty signatures,
+    so nothing has to be signed to find out whether a group would go through.
+
+    Returns {"would_succeed", "failure_message", "failed_at", "fee", "opcode_cost",
+    "last_round", "transactions": [{"txid", "fee", "opcode_cost", "logs", "return_value",
+    "application_index"}]}. fee is the total of the outer fees in microAlgos; opcode_cost
+    is None when the group has no app calls to measure; application_index is the ID an
+    app creation would get.
+    """
+    return simulate_groups(algod_client, [txns], extra_opcode_budget, allow_unnamed_resources)[0]
+
+
+def simulate_groups(algod_client, groups, extra_opcode_budget=0, allow_unnamed_resources=False):
+    """
+    Simulate several groups one after the other in the same round, so a later group sees
+    what an earlier one did (e.g. an app created by the first group). Returns one
+    simulate_group() result per group.
+    """
+    groups = [list(txns) for txns in groups]
+    request = SimulateRequest(
+        txn_groups=[
+            SimulateRequestTransactionGroup(txns=[
+                txn if isinstance(txn, transaction.GenericSignedTransaction) else transaction.SignedTransaction(txn, None)
+                for txn in txns
+            ])
+            for txns in groups
+        ],
+        allow_empty_signatures=True,
+        allow_unnamed_resources=allow_unnamed_resources,
+        extra_opcode_budget=extra_opcode_budget,
+    )
+    response = algod_client.simulate_transactions(request)
+    return [
+        _group_result(txns, group, response.get("last-round"))
+        for txns, group in zip(groups, response["txn-groups"])
+    ]
+
+
+def _group_result(txns, group, last_round):
+    results = []
+    for txn, result in zip(txns, group.get("txn-results", [])):
+        inner = _unsigned(txn)
+        logs = [base64.b64decode(line) for line in result.get("txn-result", {}).get("logs", [])]
+        return_value = None
+        if logs and logs[-1].startswith(ABI_RETURN_PREFIX):
+            return_value = logs[-1][len(ABI_RETURN_PREFIX):]
+        results.append({
+            "txid": inner.get_txid(),
+            "fee": inner.fee,
+            "opcode_cost": result.get("app-budget-consumed"),
+            "logs": logs,
+            "return_value": return_value,
+            "application_index": result.get("txn-result", {}).get("application-index"),
+        })
+
+    failure = group.get("failure-message") or None
+    return {
+        "would_succeed": failure is None,
+        "failure_message": failure,
+        "failed_at": group.get("failed-at"),
+        "fee": sum(_unsigned(txn).fee for txn in txns),
+        "opcode_cost": group.get("app-budget-consumed"),
+        "last_round": last_round,
+        "transactions": results,
+    }
+
+
+def describe(result):
+    """One-line summary of a simulate_group() result for script output."""
+    outcome = "would succeed" if result["would_succeed"] else f"would fail: {result['failure_message']}"
+    cost = f", {result['opcode_cost']} opcodes" if result["opcode_cost"] is not None else ""
+    return f"{outcome} (fee {result['fee'] / 1_000_000} ALGO{cost}, round {result['last_round']})"
@@ -0,0 +1,22 @@
+"""
+SQLite helpers shared by the stores that several threads (and worker processes) write
+to: sessions, idempotency records, the claim ledger and the session event log.
+"""
+
+import sqlite3
+
+
+def thread_connection(local, path):
+    """
+    The calling thread's connection to `path`, kept on the threading.local `local`.
+    sqlite3 connections are not shared across threads, so each thread opens its own. In
+    WAL mode with the busy timeout they write concurrently (a shared-cache in-memory
+    database would fail them with "table is locked" instead of waiting). Autocommit, so
+    callers open their own BEGIN IMMEDIATE transactions where they need one.
+    """
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, cached_statements=64)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per commit
+        local.conn = conn
+    return conn
@@ -0,0 +1,193 @@
+"""
+Cached STRM balance of the company treasury wallet.
+Claims are checked against the cache instead of algod: the wallet's holding is
+read with account_asset_info (one asset, not the whole account), every claim
+reserves its amount optimistically when it is built, and the reservation is
+kept until a balance read at or after the claim's confirmed round shows the
+transfer settled. A claim that would overdraw the wallet fails before anything
+is signed or sent.
+
+The cache is per process: with several gunicorn workers each one holds its own
+reservations, and the periodic refresh brings them back in line with the chain.
+"""
+
+import logging
+import threading
+import time
+
+from algosdk.error import AlgodHTTPError
+
+from log_config import log_event
+
+# Seconds between background balance reads (a little over one round)
+DEFAULT_REFRESH_INTERVAL = 4.0
+
+# Rounds after submission a reservation is kept when neither a confirmation nor the
+# transaction's last valid round is known (algod's maximum validity window)
+DEFAULT_EXPIRY_ROUNDS = 1000
+
+
+class TreasuryInsufficient(Exception):
+    """A claim would spend more STRM than the treasury has left after in-flight claims."""
+
+    def __init__(self, available, requested):
+        super().__init__(f"Treasury has {available} base units available, claim needs {requested}")
+        self.available = available
+        self.requested = requested
+
+
+class TreasuryCache:
+    """
+    Treasury STRM balance with optimistic reservations.
+
+    available = balance read from algod - reservations the read does not reflect yet
+    reserve() / release() / submitted() / confirmed() follow a claim's transfer;
+    refresh() reads the balance and drops the reservations it now covers.
+    """
+
+    def __init__(self, algod_client, address, asset_id, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.algod_client = algod_client
+        self.address = address
+        self.asset_id = asset_id
+        self.refresh_interval = refresh_interval
+        self._balance = None  # Holding as of _round; None until the first read
+        self._round = None
+        self._refreshed_at = None
+        # key -> {"amount", "last_valid": round after which it can no longer land, "confirmed_round"}
+        self._reservations = {}
+        self._lock = threading.Lock()
+        self._first_read = threading.Lock()  # One initial read, however many claims arrive at once
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+        self.rejected = 0
+        self.unchecked = 0
+
+    # -- claim path (no algod calls once the balance is known) ------------------------
+
+    def reserve(self, key, amount):
+        """
+        Hold `amount` for the claim `key`. Raises TreasuryInsufficient when the treasury
+        cannot cover it. Before the first successful read the balance is fetched once;
+        if algod cannot be reached the claim goes through unchecked.
+        """
+        if self._balance is None:
+            with self._first_read:
+                if self._balance is None:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        log_event("treasury_refresh_failed", level=logging.WARNING, error=e)
+        with self._lock:
+            if self._balance is None:
+                self.unchecked += 1
+            else:
+                available = self._balance - self._reserved()
+                if amount > available:
+                    self.rejected += 1
+                    raise TreasuryInsufficient(available, amount)
+            self._reservations[key] = {"amount": amount, "last_valid": None, "confirmed_round": None}
+
+    def release(self, key):
+        """The claim's transfer was never submitted: give its amount back."""
+        with self._lock:
+            self._reservations.pop(key, None)
+
+    def submitted(self, key, last_valid=None):
+        """The transfer is on its way; it cannot land after `last_valid`."""
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is not None:
+                if last_valid is None:
+                    last_valid = (self._round or 0) + DEFAULT_EXPIRY_ROUNDS
+                reservation["last_valid"] = last_valid
+
+    def confirmed(self, key, confirmed_round):
+        """The transfer landed in `confirmed_round`; the next read at or past it settles it."""
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is not None:
+                reservation["confirmed_round"] = confirmed_round
+            if self._round is not None and confirmed_round <= self._round:
+                self._settle()
+
+    def available(self):
+        """Spendable base units (None before the first read)."""
+        with self._lock:
+            return None if self._balance is None else self._balance - self._reserved()
+
+    # -- reconciliation against the chain ---------------------------------------------
+
+    def refresh(self):
+        """Read the treasury holding and drop the reservations settled by that round."""
+        try:
+            info = self.algod_client.account_asset_info(self.address, self.asset_id)
+            balance = info.get("asset-holding", {}).get("amount", 0)
+        except AlgodHTTPError as e:
+            if e.code != 404:
+                raise
+            balance = 0  # Not opted in: nothing to pay out with
+            info = {}
+        read_round = info.get("round")
+        with self._lock:
+            # Reads can overlap (background thread and a first claim); never go back in time
+            if read_round is not None and self._round is not None and read_round < self._round:
+                return self._balance
+            self._balance = balance
+            self._round = read_round if read_round is not None else self._round
+            self._refreshed_at = time.time()
+            self.refreshes += 1
+            self._settle()
+            return balance
+
+    def _settle(self):
+        # Caller holds the lock. A reservation is in the balance once the read round has reached
+        # its confirmation; one whose last valid round has passed either landed or never will
+        if self._round is None:
+            return
+        settled = [
+            key for key, r in self._reservations.items()
+            if (r["confirmed_round"] is not None and r["confirmed_round"] <= self._round)
+            or (r["last_valid"] is not None and r["last_valid"] < self._round)
+        ]
+        for key in settled:
+            del self._reservations[key]
+
+    def _reserved(self):
+        # Caller holds the lock
+        return sum(r["amount"] for r in self._reservations.values())
+
+    # -- background refresh -------------------------------------------------------------
+
+    def start(self):
+        """Re-read the balance every refresh_interval seconds (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="treasury-cache", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                log_event("treasury_refresh_failed", level=logging.WARNING, error=e)
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def stats(self):
+        with self._lock:
+            return {
+                "balance_base_units": self._balance,
+                "reserved_base_units": self._reserved(),
+                "available_base_units": None if self._balance is None else self._balance - self._reserved(),
+                "in_flight": len(self._reservations),
+                "round": self._round,
+                "refreshed_at": self._refreshed_at,
+                "refreshes": self.refreshes,
+                "rejected": self.rejected,
+                "unchecked": self.unchecked,
+            }
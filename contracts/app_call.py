@@ -0,0 +1,146 @@
+"""
+Call a StreamFi app from the command line: the payroll app (streamfi_boxes.py, default)
+or the single-stream app (streamfi.py, --contract streamfi).
+
+    python app_call.py APP_ID claim --mnemonic-file worker.txt --dry-run
+    python app_call.py APP_ID pause WORKER_ADDRESS
+    python app_call.py APP_ID opt_in_asset 749531304
+    python app_call.py APP_ID create_stream WORKER_ADDRESS 200
+    python app_call.py APP_ID get_claimable --contract streamfi
+
+Both apps are ABI routers: the call is built from the method's signature in
+streamfi_boxes.json / streamfi.json. With --dry-run the call is simulated through algod:
+the predicted outcome, fee, opcode cost and return value are printed and nothing is
+sent. Read-only methods (get_claimable) are always only simulated. The employer methods
+sign with the deployer (signer service when STREAMFI_SIGNER_SOCKET is set, else the key
+from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC); workers claim with their
+own key via --mnemonic-file.
+"""
+
+from algosdk import abi, encoding, mnemonic
+from algosdk.transaction import ApplicationNoOpTxn, wait_for_confirmation
+import argparse
+import json
+import os
+import sys
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from params_provider import SuggestedParamsProvider
+from signer_service import LocalSigner, create_signer
+from simulate import describe, simulate_group
+
+# TestNet Configuration
+ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
+ALGOD_TOKEN = ""
+
+# STRM Token Asset ID (the app's payout asset after opt_in_asset)
+STRM_ASSET_ID = 749531304
+
+# ABI description of each app, written by `python streamfi_boxes.py` / `python streamfi.py`
+CONTRACT_SPECS = {"boxes": "streamfi_boxes.json", "streamfi": "streamfi.json"}
+
+# Methods that send an inner transaction; the call pays its fee (fee pooling) and, once the
+# app pays in STRM, lists the asset
+PAYOUT_METHODS = ("claim", "close", "opt_in_asset")
+
+def load_contract(name):
+    """(abi.Contract, read-only method names) for "boxes" or "streamfi"."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONTRACT_SPECS[name])
+    with open(path) as f:
+        spec = json.load(f)
+    # ARC-22 "readonly" is not part of abi.Contract, so it is read from the spec itself
+    read_only = {method["name"] for method in spec["methods"] if method.get("readonly")}
+    return abi.Contract.undictify(spec), read_only
+
+def build_call(contract, sender, params, app_id, method, arguments=()):
+    """
+    NoOp ABI call for `method` with the args, box refs, foreign assets and fee it needs.
+    `arguments` fill the method's arguments in order (worker addresses, integers, asset
+    IDs); a missing asset argument defaults to STRM.
+    """
+    abi_method = contract.get_method_by_name(method)
+    app_args = [abi_method.get_selector()]
+    boxes = []
+    foreign_assets = []
+    boxed = contract.name == "streamfi_boxes"
+    arguments = list(arguments)
+    for arg in abi_method.args:
+        value = arguments.pop(0) if arguments else None
+        if arg.type == abi.ABIReferenceType.ASSET:
+            # Reference arguments are an index into foreign_assets
+            foreign_assets.append(int(value) if value else STRM_ASSET_ID)
+            app_args.append(bytes([len(foreign_assets) - 1]))
+        elif isinstance(arg.type, abi.AddressType):
+            app_args.append(arg.type.encode(value))
+            if boxed:
+                boxes.append((0, encoding.decode_address(value)))  # The worker's stream
+        else:
+            app_args.append(arg.type.encode(int(value)))
+    if boxed and method == "claim":
+        boxes.append((0, encoding.decode_address(sender)))  # The worker's own stream
+    if method in ("claim", "close"):
+        foreign_assets.append(STRM_ASSET_ID)
+    if method in PAYOUT_METHODS:
+        params.flat_fee = True
+        params.fee = 2 * params.min_fee
+    return ApplicationNoOpTxn(
+        sender=sender,
+        sp=params,
+        index=app_id,
+        app_args=app_args,
+        boxes=boxes,
+        foreign_assets=foreign_assets
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Call a method of a StreamFi app")
+    parser.add_argument("app_id", type=int)
+    parser.add_argument("method")
+    parser.add_argument("arguments", nargs="*",
+                        help="method arguments in order: worker address (create_stream/pause/resume/close), "
+                             "rate (create_stream), asset ID (opt_in_asset, default STRM)")
+    parser.add_argument("--contract", choices=sorted(CONTRACT_SPECS), default="boxes",
+                        help="payroll app (boxes, default) or single-stream app (streamfi)")
+    parser.add_argument("--mnemonic-file", help="sign with this account instead of the employer (workers claiming)")
+    parser.add_argument("--dry-run", action="store_true", help="simulate only; nothing is sent")
+    args = parser.parse_args()
+
+    contract, read_only = load_contract(args.contract)
+    methods = [m.name for m in contract.methods if m.name != "create"]
+    if args.method not in methods:
+        parser.error(f"{args.contract} methods: {', '.join(methods)}")
+    required = [arg.name for arg in contract.get_method_by_name(args.method).args
+                if arg.type != abi.ABIReferenceType.ASSET]
+    if len(args.arguments) < len(required):
+        parser.error(f"{args.method} needs: {' '.join(required)}")
+
+    if args.mnemonic_file:
+        with open(args.mnemonic_file) as f:
+            signer = LocalSigner(mnemonic.to_private_key(f.read().strip()))
+    else:
+        signer = create_signer(allow_local=True)
+
+    algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+    params_provider = SuggestedParamsProvider(algod_client)
+    txn = build_call(contract, signer.address, params_provider.get(), args.app_id, args.method, args.arguments)
+
+    # Simulate first either way: a call that would fail is not worth a round
+    result = simulate_group(algod_client, [txn])
+    print(f"🧪 {args.method}: {describe(result)}")
+    return_type = contract.get_method_by_name(args.method).returns.type
+    if result["would_succeed"] and result["transactions"][0]["return_value"] is not None:
+        print(f" Returns {return_type.decode(result['transactions'][0]['return_value'])}")
+    if args.dry_run or args.method in read_only:
+        return
+    if not result["would_succeed"]:
+        sys.exit(1)
+
+    tx_id = algod_client.send_transaction(signer.sign(txn))
+    print(f"⏳ Sent {tx_id}, waiting for confirmation...")
+    confirmed = wait_for_confirmation(algod_client, tx_id, 4)
+    print(f"✅ Confirmed in round {confirmed['confirmed-round']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Static opcode cost report for the StreamFi approval programs.
+Compiles the PyTeal contracts, walks the TEAL and reports, per method, the worst-case
+opcode cost of a call (router dispatch included) and how many state writes it can do,
+against the 700-opcode budget of a single app call.
+
+    python cost_report.py                          # report
+    python cost_report.py --check                  # also fail when a method got more expensive
+    python cost_report.py --update-baseline        # accept the current costs
+
+The baseline lives in cost_baseline.json next to this file. The analysis is static: it
+takes the most expensive branch everywhere and assumes the dispatch chain falls through
+to the selected method, so real calls cost the same or less.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import streamfi
+import streamfi_boxes
+
+# Opcode budget of one application call (pooled across the app calls of a group)
+APP_CALL_BUDGET = 700
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cost_baseline.json")
+
+# Opcodes that cost more than 1 (AVM v8); everything else costs 1
+OPCODE_COSTS = {
+    "sha256": 35,
+    "keccak256": 130,
+    "sha512_256": 45,
+    "sha3_256": 130,
+    "ed25519verify": 1900,
+    "ed25519verify_bare": 1900,
+    "ecdsa_verify": 1700,
+    "ecdsa_pk_decompress": 650,
+    "ecdsa_pk_recover": 2000,
+    "vrf_verify": 5700,
+    "bn256_add": 70,
+    "bn256_scalar_mul": 970,
+    "bn256_pairing": 8700,
+    "b+": 10, "b-": 10, "b*": 20, "b/": 20, "b%": 20, "bsqrt": 40,
+    "b|": 6, "b&": 6, "b^": 6, "b~": 4,
+}
+
+STATE_WRITES = {"app_global_put", "app_global_del", "app_local_put", "app_local_del",
+                "box_create", "box_put", "box_replace", "box_del", "box_resize", "box_splice"}
+
+TERMINATORS = {"return", "err", "retsub"}
+BRANCHES = {"bnz", "bz"}
+
+
+class CostAnalysisError(Exception):
+    """The program has a shape the static walk cannot bound (e.g. a loop)."""
+
+
+def parse_teal(source):
+    """Split TEAL into [(opcode, [args])] plus a {label: instruction index} map."""
+    instructions = []
+    labels = {}
+    for raw in source.splitlines():
+        line = raw.strip()
+        if not line or line.startswith(("//", "#pragma")):
+            continue
+        if line.endswith(":") and " " not in line:
+            labels[line[:-1]] = len(instructions)
+            continue
+        opcode, _, rest = line.partition(" ")
+        instructions.append((opcode, rest.split() if opcode not in ("byte", "method") else [rest]))
+    return instructions, labels
+
+
+class ProgramCost:
+    """Worst-case path costs over one parsed TEAL program."""
+
+    def __init__(self, source):
+        self.instructions, self.labels = parse_teal(source)
+
+    def _target(self, label):
+        if label not in self.labels:
+            raise CostAnalysisError(f"Unknown label {label}")
+        return self.labels[label]
+
+    def worst_from(self, index, weight, memo=None, visiting=None):
+        """Largest total `weight(opcode)` of any path from `index` to where the program (or subroutine) ends."""
+        memo = {} if memo is None else memo
+        visiting = set() if visiting is None else visiting
+        if index >= len(self.instructions):
+            return 0
+        if index in memo:
+            return memo[index]
+        if index in visiting:
+            raise CostAnalysisError(f"Loop through instruction {index}; cost is unbounded")
+        visiting.add(index)
+
+        opcode, args = self.instructions[index]
+        cost = weight(opcode)
+        walk = lambda i: self.worst_from(i, weight, memo, visiting)
+        if opcode in TERMINATORS:
+            total = cost
+        elif opcode == "b":
+            total = cost + walk(self._target(args[0]))
+        elif opcode in BRANCHES:
+            total = cost + max(walk(self._target(args[0])), walk(index + 1))
+        elif opcode in ("switch", "match"):
+            total = cost + max([walk(self._target(label)) for label in args] + [walk(index + 1)])
+        elif opcode == "callsub":
+            # The subroutine body ends at its retsub, then execution continues after the call
+            total = cost + walk(self._target(args[0])) + walk(index + 1)
+        else:
+            total = cost + walk(index + 1)
+
+        visiting.discard(index)
+        memo[index] = total
+        return total
+
+    def dispatch(self):
+        """
+        Find the router's method branches: `txna ApplicationArgs 0; method|byte X; ==; bnz L`
+        and the create branch `txn ApplicationID; int 0; ==; bnz L`.
+        Returns [(method name, index of the bnz, target label)].
+        """
+        found = []
+        ins = self.instructions
+        for i in range(len(ins) - 3):
+            (op0, a0), (op1, a1), (op2, _), (op3, a3) = ins[i:i + 4]
+            if op2 != "==" or op3 != "bnz":
+                continue
+            if op0 == "txna" and a0 == ["ApplicationArgs", "0"] and op1 in ("method", "byte"):
+                name = a1[0].strip('"').split("(", 1)[0]
+                found.append((name, i + 3, a3[0]))
+            elif op0 == "txn" and a0 == ["ApplicationID"] and op1 == "int" and a1 == ["0"]:
+                found.append(("(create)", i + 3, a3[0]))
+        return found
+
+    def method_costs(self):
+        """{method: {"cost": opcodes, "writes": state writes}} for every dispatched method."""
+        opcode_cost = lambda op: OPCODE_COSTS.get(op, 1)
+        write_count = lambda op: 1 if op in STATE_WRITES else 0
+        cost_memo, write_memo = {}, {}
+        report = {}
+        for name, bnz_index, label in self.dispatch():
+            # Everything before the taken bnz runs as a straight fall-through chain
+            prefix = sum(opcode_cost(op) for op, _ in self.instructions[:bnz_index + 1])
+            target = self._target(label)
+            report[name] = {
+                "cost": prefix + self.worst_from(target, opcode_cost, cost_memo),
+                "writes": self.worst_from(target, write_count, write_memo),
+            }
+        return report
+
+
+def compiled_programs():
+    """{program name: (freshly compiled approval TEAL, checked-in .teal path)}."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return {
+        "streamfi": (streamfi.compile_contract()[0], os.path.join(here, "streamfi_approval.teal")),
+        "streamfi_boxes": (streamfi_boxes.compile_contract()[0], os.path.join(here, "streamfi_boxes_approval.teal")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-method opcode cost of the StreamFi approval programs")
+    parser.add_argument("--budget", type=int, default=APP_CALL_BUDGET, help="opcode budget per call")
+    parser.add_argument("--check", action="store_true", help="fail when a method costs more than the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write current costs to {os.path.basename(BASELINE_FILE)}")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    results = {}
+    problems = []
+    for program, (teal, teal_path) in compiled_programs().items():
+        if os.path.exists(teal_path):
+            with open(teal_path) as f:
+                if f.read().strip() != teal.strip():
+                    problems.append(f"{os.path.basename(teal_path)} is stale: regenerate it from {program}.py")
+
+        analysis = ProgramCost(teal)
+        costs = analysis.method_costs()
+        results[program] = {name: entry["cost"] for name, entry in costs.items()}
+
+        print(f"\n📊 {program} ({len(analysis.instructions)} instructions)")
+        print(f" {'method':<16} {'opcodes':>8} {'budget':>8} {'writes':>7} {'baseline':>9}")
+        for name, entry in costs.items():
+            previous = baseline.get(program, {}).get(name)
+            delta = "" if previous is None else f"{previous:>6} ({entry['cost'] - previous:+d})"
+            print(f" {name:<16} {entry['cost']:>8} {entry['cost'] * 100 // args.budget:>7}% {entry['writes']:>7} {delta:>9}")
+            if entry["cost"] > args.budget:
+                problems.append(f"{program}.{name} needs {entry['cost']} opcodes, over the {args.budget} budget")
+            if args.check and previous is not None and entry["cost"] > previous:
+                problems.append(f"{program}.{name} grew from {previous} to {entry['cost']} opcodes")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n✅ Baseline written to {os.path.basename(BASELINE_FILE)}")
+
+    if problems:
+        print()
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("\n✅ Every method fits the opcode budget")
+
+
+if __name__ == "__main__":
+    main()
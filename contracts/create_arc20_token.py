@@ -3,17 +3,23 @@ ARC-20 Token Creation for StreamFi
 Hackathon Requirement: Demonstrate ARC standard usage
 """
 
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
 from algosdk.transaction import AssetConfigTxn, wait_for_confirmation
 import json
+import os
+import sys
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from params_provider import SuggestedParamsProvider
+from signer_service import create_signer
 
 # TestNet Configuration
 ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"  # Public Algonode TestNet RPC endpoint
 ALGOD_TOKEN = ""  # No token required for the public Algonode endpoint (left blank)
 
-# Your deployer mnemonic (used to derive the private key that will create the asset)
-DEPLOYER_MNEMONIC = "cluster coin olympic congress ribbon lamp despair maple dizzy disagree undo inquiry purchase hamster curve nuclear topic shaft evil glide loud soldier talk absent wool"
+# The deployer key is never in the code: the signer service (STREAMFI_SIGNER_SOCKET) holds it,
+# or it is read from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC
 
 def create_arc20_token():
     """
@@ -21,7 +27,7 @@ def create_arc20_token():
 
     This function:
     - Initializes an Algod client to communicate with the TestNet node.
-    - Derives the deployer's private key and address from the mnemonic.
+    - Sets up the deployer signer (signer service or mnemonic) and its address.
     - Verifies the deployer has sufficient ALGO to cover creation fees.
     - Builds an AssetConfigTxn with ARC-20-like parameters (decimals, manager/reserve/freeze/clawback).
     - Signs, sends, waits for confirmation, and extracts the created asset ID.
@@ -30,19 +36,22 @@ def create_arc20_token():
     
     try:
         # Initialize Algod client to talk to the Algorand TestNet via Algonode
-        algod_client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+        algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+        params_provider = SuggestedParamsProvider(algod_client)
         
-        # Convert mnemonic phrase into a private key for transaction signing
-        private_key = mnemonic.to_private_key(DEPLOYER_MNEMONIC)
-        # Derive the public address corresponding to the private key
-        creator_address = account.address_from_private_key(private_key)
+        # Signer for the deployer account: the signer service when STREAMFI_SIGNER_SOCKET is set,
+        # otherwise the mnemonic from the environment is converted to a private key locally
+        signer = create_signer(allow_local=True)
+        # Public address of the signing account
+        creator_address = signer.address
         
         # Informational print so the operator knows which address is creating the asset
         print(f" Creator Address: {creator_address}")
         
         # Check the creator's ALGO balance to ensure there are enough funds to create an asset
         # account_info returns microAlgos, divide by 1_000_000 to get ALGO
-        account_info = algod_client.account_info(creator_address)
+        # (exclude="all" leaves out the asset and app lists; only the ALGO amount is needed here)
+        account_info = algod_client.account_info(creator_address, exclude="all")
         balance = account_info.get('amount') / 1_000_000
         print(f" Balance: {balance} ALGO")
         
@@ -53,7 +62,7 @@ def create_arc20_token():
             return None
         
         # Get current suggested transaction parameters (fee, first/last valid rounds, genesis hash)
-        params = algod_client.suggested_params()
+        params = params_provider.get()
         
         # ARC-20 Token Configuration dictionary.
         # Note: `total` here is specified in base units (taking decimals into account).
@@ -89,8 +98,8 @@ def create_arc20_token():
             **token_config
         )
         
-        # Sign the transaction with the deployer's private key
-        signed_txn = txn.sign(private_key)
+        # Sign the transaction with the deployer's key
+        signed_txn = signer.sign(txn)
         
         # Submit the signed transaction to the Algorand network
         print("\n Submitting transaction to TestNet...")
@@ -1,24 +1,72 @@
-from algosdk.v2client import algod
-from algosdk import account, mnemonic, transaction
-from algosdk.transaction import ApplicationCreateTxn, OnComplete, StateSchema
+from algosdk import abi, transaction
+from algosdk.logic import get_application_address
+from algosdk.transaction import ApplicationCreateTxn, AssetTransferTxn, OnComplete, PaymentTxn, StateSchema
+import argparse
 import base64
+import os
+import sys
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from params_provider import SuggestedParamsProvider
+from signer_service import create_signer
+from simulate import describe, simulate_group, simulate_groups
+
+import streamfi
+import streamfi_boxes
+from app_call import build_call, load_contract
+
+# python deploy.py --dry-run simulates the whole deploy (app creation, funding with the box
+# MBR, STRM opt-in, payroll float and every stream) and prints the predicted outcome, fees
+# and opcode cost of each group without sending anything.
+# --contract streamfi deploys the single-stream app (streamfi.py) for the first worker below
+# instead of the box payroll app (streamfi_boxes.py)
+parser = argparse.ArgumentParser(description="Deploy a StreamFi app, opt it into STRM and fund it")
+parser.add_argument("--contract", choices=("boxes", "streamfi"), default="boxes")
+parser.add_argument("--dry-run", action="store_true", help="simulate the whole deploy; nothing is sent")
+args = parser.parse_args()
+DRY_RUN = args.dry_run
+BOXES = args.contract == "boxes"
 
 # TestNet connection
 algod_address = "https://testnet-api.algonode.cloud"
-algod_client = algod.AlgodClient("", algod_address)
+algod_client = create_routed_client("", algod_address)
+params_provider = SuggestedParamsProvider(algod_client)
 
-# Use your funded account
-passphrase = "cluster coin olympic congress ribbon lamp despair maple dizzy disagree undo inquiry purchase hamster curve nuclear topic shaft evil glide loud soldier talk absent wool"
-private_key = mnemonic.to_private_key(passphrase)
-address = account.address_from_private_key(private_key)
+# Your funded account: signs through the signer service when STREAMFI_SIGNER_SOCKET is set, else
+# with the key from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC
+signer = create_signer(allow_local=True)
+address = signer.address
+
+# Payouts are in the backend's STRM token: the app opts into it and workers claim it directly
+STRM_ASSET_ID = 749531304
+
+# Streams to open in the payroll app: (worker address, rate in STRM base units per second, 1 STRM = 100).
+# Every worker lives in the same application, one box each (replace with actual workers for production).
+# The single-stream app takes the first worker only.
+# Workers must be opted into STRM (optin_employee_wallet.py) before they can claim
+WORKERS = [
+    ("AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAY5HFKQ", 200),
+]
+
+# STRM base units moved from the deployer into the app account for payouts
+PAYROLL_FLOAT = 1_000_000
+
+# microAlgos the app account needs: its own minimum balance plus the STRM holding
+APP_MIN_BALANCE = 100_000 + 100_000
+
+# Algorand caps atomic groups at 16 transactions
+MAX_GROUP_SIZE = 16
 
 print(f" Deploying from: {address}")
 
-# Read TEAL files
-with open("streamfi_approval.teal", "r") as f:
+# Read TEAL files (generate them with: python streamfi_boxes.py / python streamfi.py)
+contract = streamfi_boxes if BOXES else streamfi
+with open(f"{contract.__name__}_approval.teal", "r") as f:
     approval_program = f.read()
 
-with open("streamfi_clear.teal", "r") as f:
+with open(f"{contract.__name__}_clear.teal", "r") as f:
     clear_program = f.read()
 
 # Compile programs
@@ -28,16 +76,21 @@ approval_binary = base64.b64decode(approval_result["result"])
 clear_result = algod_client.compile(clear_program)
 clear_binary = base64.b64decode(clear_result["result"])
 
-# Define app schema
-global_schema = StateSchema(num_uints=5, num_byte_slices=2)
+# Define app schema: the employer and payout asset live in global state, streams live in boxes
+# (the single-stream app keeps its one stream in global state too)
+global_schema = StateSchema(num_uints=contract.GLOBAL_UINTS, num_byte_slices=contract.GLOBAL_BYTE_SLICES)
 local_schema = StateSchema(num_uints=0, num_byte_slices=0)
 
-# Get suggested params
-params = algod_client.suggested_params()
+# Both apps are ABI routers: calls start with the method selector from streamfi_boxes.json /
+# streamfi.json. The single-stream app's create call opens the stream for the first worker
+abi_contract, _ = load_contract(args.contract)
+create_args = [abi_contract.get_method_by_name("create").get_selector()]
+if not BOXES:
+    worker, rate = WORKERS[0]
+    create_args += [abi.AddressType().encode(worker), abi.UintType(64).encode(rate)]
 
-# Worker address (replace with actual worker for production)
-worker_address = "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAY5HFKQ"
-rate_per_second = 1000  # 1000 microAlgos per second
+# Get suggested params (cached by the shared provider)
+params = params_provider.get()
 
 # Create application
 txn = ApplicationCreateTxn(
@@ -48,11 +101,58 @@ txn = ApplicationCreateTxn(
     clear_program=clear_binary,
     global_schema=global_schema,
     local_schema=local_schema,
-    app_args=[worker_address.encode(), rate_per_second.to_bytes(8, 'big')]
+    app_args=create_args
 )
 
+# Fund the app account with ALGO for its minimum balance and one box MBR per stream
+funding = APP_MIN_BALANCE + (streamfi_boxes.BOX_MBR * len(WORKERS) if BOXES else 0)
+
+def setup_groups(app_id):
+    """What follows the app creation: funding, STRM opt-in, float and streams, in atomic groups of up to 16."""
+    app_address = get_application_address(app_id)
+    fund_txn = PaymentTxn(sender=address, sp=params, receiver=app_address, amt=funding)
+
+    # Opt the app into STRM; the call pays the inner opt-in's fee too
+    optin_txn = build_call(abi_contract, address, params_provider.get(), app_id, "opt_in_asset", [STRM_ASSET_ID])
+
+    # Move the payroll float into the app's STRM holding
+    float_txn = AssetTransferTxn(sender=address, sp=params, receiver=app_address, amt=PAYROLL_FLOAT, index=STRM_ASSET_ID)
+
+    # Open the streams, one box each (the single stream was opened by the create call)
+    stream_txns = [
+        build_call(abi_contract, address, params_provider.get(), app_id, "create_stream", [worker, rate])
+        for worker, rate in WORKERS
+    ] if BOXES else []
+
+    # Funding, opt-in and float ride in the first group
+    groups = []
+    pending = [fund_txn, optin_txn, float_txn] + stream_txns
+    while pending:
+        group, pending = pending[:MAX_GROUP_SIZE], pending[MAX_GROUP_SIZE:]
+        if len(group) > 1:
+            transaction.assign_group_id(group)
+        groups.append(group)
+    return groups
+
+if DRY_RUN:
+    # The setup groups reference the new app ID: simulate the creation alone to learn the ID it
+    # would get, then the creation and every setup group back to back in one simulated round
+    created = simulate_group(algod_client, [txn])
+    print(f"\n🧪 Dry run: app creation {describe(created)}")
+    app_id = created["transactions"][0]["application_index"] if created["transactions"] else None
+    if not created["would_succeed"] or app_id is None:
+        sys.exit(1)
+    groups = setup_groups(app_id)
+    results = simulate_groups(algod_client, [[txn]] + groups)[1:]
+    for number, (group, result) in enumerate(zip(groups, results), 1):
+        print(f"🧪 Setup group {number}/{len(groups)} ({len(group)} transactions): {describe(result)}")
+    total_fees = txn.fee + sum(result["fee"] for result in results)
+    print(f" Total fees {total_fees / 1_000_000} ALGO; the app would hold {funding / 1_000_000} ALGO "
+          f"{'(box MBR included) ' if BOXES else ''}and {PAYROLL_FLOAT / 100} STRM")
+    sys.exit(0 if all(result["would_succeed"] for result in results) else 1)
+
 # Sign and send
-signed_txn = txn.sign(private_key)
+signed_txn = signer.sign(txn)
 tx_id = algod_client.send_transaction(signed_txn)
 
 print(f"\n Transaction ID: {tx_id}")
@@ -64,7 +164,16 @@ transaction.wait_for_confirmation(algod_client, tx_id, 4)
 # Get app ID
 ptx = algod_client.pending_transaction_info(tx_id)
 app_id = ptx["application-index"]
+app_address = get_application_address(app_id)
 
-print(f"\n StreamFI Contract Deployed!")
+print(f"\n StreamFI {'Payroll' if BOXES else 'Single-Stream'} App Deployed!")
 print(f" App ID: {app_id}")
-print(f" View on AlgoExplorer: https://lora.algokit.io/testnet/account/ZX2LBXKXNBRCJVECB7AHU22PPMDIDHCRAPKEVZ5UIUSGZF2LISTEG3IPEQ")
+print(f" App Address: {app_address}")
+
+for group in setup_groups(app_id):
+    signed_group = signer.sign_many(group)
+    group_tx_id = algod_client.send_transactions(signed_group)
+    transaction.wait_for_confirmation(algod_client, group_tx_id, 4)
+
+print(f"\n Funded app with {funding / 1_000_000} ALGO and {PAYROLL_FLOAT / 100} STRM, opened {len(WORKERS) if BOXES else 1} stream(s)")
+print(f" View on Lora: https://lora.algokit.io/testnet/application/{app_id}")
@@ -4,18 +4,25 @@ This is a ONE-TIME setup script
 """
 
 from algosdk import account, mnemonic
-from algosdk.v2client import algod
 from algosdk.transaction import AssetOptInTxn, PaymentTxn, wait_for_confirmation
+import os
+import sys
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from params_provider import SuggestedParamsProvider
+from signer_service import create_signer
 
 # TestNet Configuration
 ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
 ALGOD_TOKEN = ""
 STRM_ASSET_ID = 749531304
 
-# Company wallet (to fund employee wallet with ALGO)
-COMPANY_MNEMONIC = "cluster coin olympic congress ribbon lamp despair maple dizzy disagree undo inquiry purchase hamster curve nuclear topic shaft evil glide loud soldier talk absent wool"
-company_private_key = mnemonic.to_private_key(COMPANY_MNEMONIC)
-company_address = account.address_from_private_key(company_private_key)
+# Company wallet (to fund employee wallet with ALGO): signer service if STREAMFI_SIGNER_SOCKET is
+# set, else the key from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC
+company_signer = create_signer(allow_local=True)
+company_address = company_signer.address
 
 # Employee collective wallet
 EMPLOYEE_WALLET_ADDRESS = "QZTLJBJSCVDHPCJXT3LQGDCRNBA3IRYVCPLFEA3GWN6YCTNOP4FPH7F4HE"
@@ -32,7 +39,9 @@ print(f" STRM Asset ID: {STRM_ASSET_ID}")
 print("=" * 70)
 
 # Initialize Algod client
-algod_client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+# Funding and opt-in reuse the same cached suggested params
+params_provider = SuggestedParamsProvider(algod_client)
 
 def check_and_fund_employee_wallet():
     """
@@ -45,7 +54,7 @@ def check_and_fund_employee_wallet():
         
         if balance < 0.2:
             print(f"\n💰 Funding employee wallet with 0.5 ALGO for fees...")
-            params = algod_client.suggested_params()
+            params = params_provider.get()
             
             txn = PaymentTxn(
                 sender=company_address,
@@ -54,7 +63,7 @@ def check_and_fund_employee_wallet():
                 amt=500000  # 0.5 ALGO
             )
             
-            signed_txn = txn.sign(company_private_key)
+            signed_txn = company_signer.sign(txn)
             tx_id = algod_client.send_transaction(signed_txn)
             
             print(f"📤 Funding transaction sent: {tx_id}")
@@ -63,7 +72,7 @@ def check_and_fund_employee_wallet():
             
     except Exception as e:
         print(f"\n💰 Creating and funding employee wallet...")
-        params = algod_client.suggested_params()
+        params = params_provider.get()
         
         txn = PaymentTxn(
             sender=company_address,
@@ -72,7 +81,7 @@ def check_and_fund_employee_wallet():
             amt=500000  # 0.5 ALGO
         )
         
-        signed_txn = txn.sign(company_private_key)
+        signed_txn = company_signer.sign(txn)
         tx_id = algod_client.send_transaction(signed_txn)
         
         print(f"📤 Funding transaction sent: {tx_id}")
@@ -113,7 +122,7 @@ def optin_to_strm():
             
             # Opt-in to STRM
             print(f"\n🔓 Opting in to STRM token...")
-            params = algod_client.suggested_params()
+            params = params_provider.get()
             
             txn = AssetOptInTxn(
                 sender=employee_address,
@@ -0,0 +1,356 @@
+"""
+Bulk Employee Provisioning for StreamFi
+Reads a roster, generates a wallet per employee, funds the wallets from the company
+account and opts them into STRM, non-interactively.
+
+    python provision_employees.py roster.csv
+    python provision_employees.py roster.csv --rehearse     # against the in-process fake algod
+
+Roster: CSV with a header row (name, designation, rate) or a JSON list of objects with
+the same keys. Keys are generated in parallel across cores; funding payments go out in
+atomic groups of 16 signed by the company signer, and opt-ins in atomic groups of 16
+signed with the new keys.
+
+Progress is appended to a checkpoint file (JSON lines, one event per step), so a run that
+stops part-way picks up where it left off when started again with the same checkpoint.
+The checkpoint holds the new wallets' mnemonics: it is created owner-only (0600), and
+the address list for the backend goes to a separate --out file without secrets.
+"""
+
+from algosdk import account, encoding, mnemonic
+from algosdk.transaction import AssetOptInTxn, PaymentTxn, assign_group_id
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from block_follower import BlockFollower
+from params_provider import SuggestedParamsProvider
+from signer_service import LocalSigner, create_signer
+
+# TestNet Configuration
+ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
+ALGOD_TOKEN = ""
+STRM_ASSET_ID = 749531304
+
+# Algorand caps atomic groups at 16 transactions
+MAX_GROUP_SIZE = 16
+
+# Each new wallet gets its minimum balance, the STRM holding's minimum balance and the opt-in fee
+FUND_AMOUNT = 100_000 + 100_000 + 1_000
+
+# Groups submitted before waiting for the oldest one to confirm
+DEFAULT_IN_FLIGHT = 32
+
+
+# -- parallel helpers (run in worker processes) --------------------------------
+
+def _generate_accounts(count):
+    accounts = []
+    for _ in range(count):
+        private_key, address = account.generate_account()
+        accounts.append((address, mnemonic.from_private_key(private_key)))
+    return accounts
+
+
+def _sign_with_mnemonics(pairs):
+    """Sign [(mnemonic, encoded txn)] with their own keys; returns encoded signed txns."""
+    return [
+        encoding.msgpack_encode(encoding.msgpack_decode(txn).sign(mnemonic.to_private_key(words)))
+        for words, txn in pairs
+    ]
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _split(flat, groups):
+    """Cut a flat list back into lists the sizes of `groups`."""
+    split = []
+    for group in groups:
+        split.append(flat[:len(group)])
+        flat = flat[len(group):]
+    return split
+
+
+# -- roster and checkpoint -------------------------------------------------------
+
+def load_roster(path):
+    """[{"name", "designation", "rate"}] from a CSV or JSON roster; names must be unique."""
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    roster = []
+    seen = set()
+    for row in rows:
+        name = (row.get("name") or "").strip()
+        if not name:
+            raise ValueError(f"Roster row without a name: {row}")
+        if name in seen:
+            raise ValueError(f"Duplicate roster name: {name}")
+        seen.add(name)
+        roster.append({"name": name, "designation": (row.get("designation") or "").strip(), "rate": float(row.get("rate") or 0)})
+    return roster
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines log of provisioning events, replayed on start.
+    Events: generated (name, address, mnemonic), fund_submitted / funded / opted_in (names).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.accounts = {}  # name -> {"address", "mnemonic"}
+        self.fund_submitted = set()
+        self.funded = set()
+        self.opted_in = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._file = os.fdopen(fd, "a")
+
+    def _apply(self, event):
+        kind = event["event"]
+        if kind == "generated":
+            self.accounts[event["name"]] = {"address": event["address"], "mnemonic": event["mnemonic"]}
+        elif kind == "fund_submitted":
+            self.fund_submitted.update(event["names"])
+        elif kind == "funded":
+            self.funded.update(event["names"])
+        elif kind == "opted_in":
+            self.opted_in.update(event["names"])
+
+    def record(self, events):
+        """Append events and flush them to disk before returning."""
+        for event in events:
+            self._apply(event)
+            self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# -- pipeline ----------------------------------------------------------------------
+
+class Provisioner:
+    """Runs the generate / fund / opt-in stages over a roster, checkpointing each step."""
+
+    def __init__(self, algod_client, signer, checkpoint, asset_id=STRM_ASSET_ID,
+                 fund_amount=FUND_AMOUNT, in_flight=DEFAULT_IN_FLIGHT, workers=None):
+        self.algod_client = algod_client
+        self.params_provider = SuggestedParamsProvider(algod_client)
+        self.follower = BlockFollower(algod_client)  # Confirms a whole window of groups per round
+        self.signer = signer
+        self.checkpoint = checkpoint
+        self.asset_id = asset_id
+        self.fund_amount = fund_amount
+        self.in_flight = in_flight
+        self.workers = workers or os.cpu_count() or 1
+        self.timings = {}  # stage -> (items, transactions, seconds)
+
+    def run(self, roster):
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self.generate(roster, pool)
+            self.fund(roster)
+            self.opt_in(roster, pool)
+
+    def _timed(self, stage, items, transactions, started):
+        self.timings[stage] = (items, transactions, time.perf_counter() - started)
+
+    def generate(self, roster, pool):
+        missing = [row["name"] for row in roster if row["name"] not in self.checkpoint.accounts]
+        started = time.perf_counter()
+        if missing:
+            per_worker = -(-len(missing) // self.workers)
+            sizes = [len(chunk) for chunk in _chunks(missing, per_worker)]
+            generated = [acct for batch in pool.map(_generate_accounts, sizes) for acct in batch]
+            self.checkpoint.record([
+                {"event": "generated", "name": name, "address": address, "mnemonic": words}
+                for name, (address, words) in zip(missing, generated)
+            ])
+        self._timed("generate", len(missing), 0, started)
+        print(f" 🔑 Generated {len(missing)} wallets ({len(roster) - len(missing)} from checkpoint)")
+
+    def _already_funded(self, names):
+        """Wallets whose funding went out before an interrupted run but was never recorded."""
+        funded = []
+        for name in names:
+            address = self.checkpoint.accounts[name]["address"]
+            if self.algod_client.account_info(address).get("amount", 0) >= self.fund_amount:
+                funded.append(name)
+        return funded
+
+    def fund(self, roster):
+        started = time.perf_counter()
+        pending = [row["name"] for row in roster if row["name"] not in self.checkpoint.funded]
+        # A crash between submission and the funded record must not pay twice: check the ledger first
+        recovered = self._already_funded([name for name in pending if name in self.checkpoint.fund_submitted])
+        if recovered:
+            self.checkpoint.record([{"event": "funded", "names": recovered}])
+            pending = [name for name in pending if name not in recovered]
+
+        def build_window(groups):
+            params = self.params_provider.get()
+            windows = []
+            for names in groups:
+                txns = [
+                    PaymentTxn(
+                        sender=self.signer.address,
+                        sp=params,
+                        receiver=self.checkpoint.accounts[name]["address"],
+                        amt=self.fund_amount,
+                        # Lease per wallet: while valid, the network refuses a second funding payment
+                        lease=hashlib.sha256(b"streamfi-provision-fund:" + name.encode()).digest()
+                    )
+                    for name in names
+                ]
+                if len(txns) > 1:
+                    assign_group_id(txns)
+                windows.append(txns)
+            # One signer call per window, so the signer service can spread it across cores
+            signed = self.signer.sign_many([txn for txns in windows for txn in txns])
+            return _split(signed, groups)
+
+        sent = self._submit_groups(pending, build_window, "fund_submitted", "funded")
+        self._timed("fund", len(pending), sent, started)
+        print(f" 💰 Funded {len(pending)} wallets with {self.fund_amount / 1_000_000} ALGO each")
+
+    def opt_in(self, roster, pool):
+        started = time.perf_counter()
+        pending = [row["name"] for row in roster if row["name"] not in self.checkpoint.opted_in]
+
+        def build_window(groups):
+            params = self.params_provider.get()
+            pairs = []
+            for names in groups:
+                txns = [
+                    AssetOptInTxn(sender=self.checkpoint.accounts[name]["address"], sp=params, index=self.asset_id)
+                    for name in names
+                ]
+                if len(txns) > 1:
+                    assign_group_id(txns)
+                pairs.extend(
+                    (self.checkpoint.accounts[name]["mnemonic"], encoding.msgpack_encode(txn))
+                    for name, txn in zip(names, txns)
+                )
+            # Each opt-in is signed with its wallet's own key; the window is split across the pool
+            per_worker = -(-len(pairs) // self.workers)
+            signed = [
+                encoding.msgpack_decode(txn)
+                for chunk in pool.map(_sign_with_mnemonics, _chunks(pairs, per_worker)) for txn in chunk
+            ]
+            return _split(signed, groups)
+
+        # Repeating an opt-in is harmless, so no submitted marker is needed to resume safely
+        sent = self._submit_groups(pending, build_window, None, "opted_in")
+        self._timed("opt_in", len(pending), sent, started)
+        print(f" ✅ Opted {len(pending)} wallets into asset {self.asset_id}")
+
+    def _submit_groups(self, names, build_window, submitted_event, done_event):
+        """
+        Send `names` in groups of 16, up to `in_flight` groups at a time, then wait for each
+        window to confirm and record it. `build_window(groups)` returns the signed groups.
+        Returns the number of transactions sent.
+        """
+        groups = _chunks(names, MAX_GROUP_SIZE)
+        sent = 0
+        for window in _chunks(groups, self.in_flight):
+            signed_groups = build_window(window)
+            if submitted_event:
+                self.checkpoint.record([{"event": submitted_event, "names": [n for group in window for n in group]}])
+            tx_ids = [self.algod_client.send_transactions(signed) for signed in signed_groups]
+            # Every group in the window is resolved by the same per-round pass of the follower
+            confirmations = [self.follower.watch(tx_id, 4) for tx_id in tx_ids]
+            for group, confirmation in zip(window, confirmations):
+                # Groups are atomic: one confirmed transaction means the whole group landed
+                confirmation.result()
+                self.checkpoint.record([{"event": done_event, "names": group}])
+            sent += sum(len(group) for group in window)
+        return sent
+
+    def report(self):
+        print(f"\n 📊 Throughput")
+        print(f" {'stage':<10} {'wallets':>8} {'txns':>7} {'seconds':>9} {'wallets/s':>10} {'txns/s':>8}")
+        for stage, (items, transactions, seconds) in self.timings.items():
+            rate = items / seconds if seconds and items else 0
+            tx_rate = transactions / seconds if seconds and transactions else 0
+            print(f" {stage:<10} {items:>8} {transactions:>7} {seconds:>9.2f} {rate:>10.1f} {tx_rate:>8.1f}")
+
+
+def write_roster_out(path, roster, checkpoint):
+    """Provisioned roster for the backend: name, designation, rate and wallet address (no secrets)."""
+    entries = [
+        {**row, "address": checkpoint.accounts[row["name"]]["address"]}
+        for row in roster if row["name"] in checkpoint.opted_in
+    ]
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate, fund and opt in employee wallets from a roster")
+    parser.add_argument("roster", help="CSV (name,designation,rate) or JSON roster")
+    parser.add_argument("--checkpoint", help="progress file (default: <roster>.checkpoint.jsonl)")
+    parser.add_argument("--out", help="provisioned roster for the backend (default: <roster>.provisioned.json)")
+    parser.add_argument("--fund-amount", type=int, default=FUND_AMOUNT, help="microAlgos sent to each new wallet")
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT, help="groups submitted before waiting")
+    parser.add_argument("--workers", type=int, default=None, help="processes for key generation and signing")
+    parser.add_argument("--rehearse", action="store_true", help="run against the in-process fake algod")
+    args = parser.parse_args()
+
+    base = os.path.splitext(args.roster)[0]
+    roster = load_roster(args.roster)
+    checkpoint = Checkpoint(args.checkpoint or f"{base}.checkpoint.jsonl")
+
+    if args.rehearse:
+        from fake_algod import FakeAlgodClient
+        algod_client = FakeAlgodClient(round_time=0.5)
+        # The fake does not check signatures, so a rehearsal needs no company key
+        signer = LocalSigner(account.generate_account()[0])
+    else:
+        algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+        # Funds the new wallets: signer service if STREAMFI_SIGNER_SOCKET is set, else the key
+        # from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC
+        signer = create_signer(allow_local=True)
+
+    print("=" * 70)
+    print(f" 👥 PROVISIONING {len(roster)} EMPLOYEES" + (" (rehearsal)" if args.rehearse else ""))
+    print("=" * 70)
+    print(f" Funding from: {signer.address}")
+    print(f" Checkpoint:   {checkpoint.path}")
+
+    provisioner = Provisioner(algod_client, signer, checkpoint, fund_amount=args.fund_amount,
+                              in_flight=args.in_flight, workers=args.workers)
+    started = time.perf_counter()
+    try:
+        provisioner.run(roster)
+    finally:
+        checkpoint.close()
+        provisioner.report()
+
+    out = args.out or f"{base}.provisioned.json"
+    count = write_roster_out(out, roster, checkpoint)
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ {count}/{len(roster)} employees provisioned ({elapsed:.1f}s this run); roster written to {out}")
+    print(" Keep the checkpoint file safe: it holds the new wallets' mnemonics.")
+
+
+if __name__ == "__main__":
+    main()
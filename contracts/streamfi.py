@@ -1,77 +1,142 @@
 from pyteal import *
+import json
 
-def approval_program():
-    # Global state keys
-    employer_key = Bytes("employer")
-    worker_key = Bytes("worker")
-    rate_key = Bytes("rate")
-    start_time_key = Bytes("start")
-    last_claim_key = Bytes("last_claim")
-    total_claimed_key = Bytes("claimed")
-    
-    # Initialize stream
-    on_create = Seq([
+# Global state keys
+employer_key = Bytes("employer")
+worker_key = Bytes("worker")
+rate_key = Bytes("rate")
+start_time_key = Bytes("start")
+last_claim_key = Bytes("last_claim")
+total_claimed_key = Bytes("claimed")
+asset_key = Bytes("asset")  # Payout ASA, 0 while paying in microAlgos
+
+# State the app needs at creation: 5 uints (rate, start, last_claim, claimed, asset) and
+# 2 byte slices (employer, worker). Intermediates live in scratch space, not global state
+GLOBAL_UINTS = 5
+GLOBAL_BYTE_SLICES = 2
+
+# ABI methods that never write state; callers can simulate them instead of sending
+# a transaction (ARC-22 "readonly" in streamfi.json)
+READ_ONLY_METHODS = ["get_claimable"]
+
+# Every method is a NoOp app call; updates, deletes and opt-ins are rejected by the router
+router = Router(
+    "streamfi",
+    BareCallActions(),
+    clear_state=Approve(),
+)
+
+
+# Accrued since the last claim; evaluated into scratch by the callers, never stored in state
+def owed_since_last_claim():
+    return (Global.latest_timestamp() - App.globalGet(last_claim_key)) * App.globalGet(rate_key)
+
+
+# Pay out from the app account: microAlgos, or the opted-in ASA once there is one.
+# Inner transactions carry no fee of their own; the calling transaction pays for them
+def pay(receiver, amount):
+    return If(App.globalGet(asset_key) == Int(0)).Then(
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: receiver,
+            TxnField.amount: amount,
+            TxnField.fee: Int(0)
+        })
+    ).Else(
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: App.globalGet(asset_key),
+            TxnField.asset_receiver: receiver,
+            TxnField.asset_amount: amount,
+            TxnField.fee: Int(0)
+        })
+    )
+
+
+# Initialize stream: worker address and rate per second (microAlgos, or base units of the
+# payout ASA once the app is opted in)
+@router.method(no_op=CallConfig.CREATE)
+def create(worker: abi.Address, rate: abi.Uint64):
+    return Seq([
         App.globalPut(employer_key, Txn.sender()),
-        App.globalPut(worker_key, Txn.application_args[0]),
-        App.globalPut(rate_key, Btoi(Txn.application_args[1])),
+        App.globalPut(worker_key, worker.get()),
+        App.globalPut(rate_key, rate.get()),
         App.globalPut(start_time_key, Global.latest_timestamp()),
         App.globalPut(last_claim_key, Global.latest_timestamp()),
         App.globalPut(total_claimed_key, Int(0)),
-        Approve()
-    ])
-    
-    # Get claimable balance
-    get_claimable = Seq([
-        App.globalPut(Bytes("temp_time"), Minus(Global.latest_timestamp(), App.globalGet(last_claim_key))),
-        App.globalPut(Bytes("temp_claimable"), Mul(App.globalGet(Bytes("temp_time")), App.globalGet(rate_key))),
-        Approve()
+        App.globalPut(asset_key, Int(0)),
     ])
-    
-    # Worker claims tokens
-    claim_tokens = Seq([
-        Assert(Txn.sender() == App.globalGet(worker_key)),
-        App.globalPut(Bytes("time_elapsed"), Minus(Global.latest_timestamp(), App.globalGet(last_claim_key))),
-        App.globalPut(Bytes("claimable"), Mul(App.globalGet(Bytes("time_elapsed")), App.globalGet(rate_key))),
-        Assert(App.globalGet(Bytes("claimable")) > Int(0)),
-        InnerTxnBuilder.Begin(),
-        InnerTxnBuilder.SetFields({
-            TxnField.type_enum: TxnType.Payment,
-            TxnField.receiver: App.globalGet(worker_key),
-            TxnField.amount: App.globalGet(Bytes("claimable")),
+
+
+# Employer opts the app into the payout ASA (e.g. STRM); claims pay in it from then on.
+# Set once, so the agreed rate cannot silently change unit
+@router.method
+def opt_in_asset(asset: abi.Asset):
+    return Seq([
+        Assert(Txn.sender() == App.globalGet(employer_key)),
+        Assert(App.globalGet(asset_key) == Int(0)),
+        App.globalPut(asset_key, asset.asset_id()),
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: asset.asset_id(),
+            TxnField.asset_receiver: Global.current_application_address(),
+            TxnField.asset_amount: Int(0),
             TxnField.fee: Int(0)
         }),
-        InnerTxnBuilder.Submit(),
-        App.globalPut(last_claim_key, Global.latest_timestamp()),
-        App.globalPut(total_claimed_key, Add(App.globalGet(total_claimed_key), App.globalGet(Bytes("claimable")))),
-        Approve()
     ])
-    
-    # Fund contract
-    fund_contract = Seq([
-        Assert(Txn.sender() == App.globalGet(employer_key)),
-        Approve()
+
+
+# Get claimable balance (read-only: returns the amount, writes nothing)
+@router.method
+def get_claimable(*, output: abi.Uint64):
+    return output.set(owed_since_last_claim())
+
+
+# Worker claims tokens; returns the amount paid out
+@router.method
+def claim(*, output: abi.Uint64):
+    claimable = ScratchVar(TealType.uint64)
+    return Seq([
+        Assert(Txn.sender() == App.globalGet(worker_key)),
+        claimable.store(owed_since_last_claim()),
+        Assert(claimable.load() > Int(0)),
+        pay(Txn.sender(), claimable.load()),
+        App.globalPut(last_claim_key, Global.latest_timestamp()),
+        App.globalPut(total_claimed_key, App.globalGet(total_claimed_key) + claimable.load()),
+        output.set(claimable.load()),
     ])
-    
-    # Router
-    program = Cond(
-        [Txn.application_id() == Int(0), on_create],
-        [Txn.application_args[0] == Bytes("get_claimable"), get_claimable],
-        [Txn.application_args[0] == Bytes("claim"), claim_tokens],
-        [Txn.application_args[0] == Bytes("fund"), fund_contract],
-    )
-    
-    return program
 
-def clear_program():
-    return Approve()
+
+# Fund contract
+@router.method
+def fund():
+    return Assert(Txn.sender() == App.globalGet(employer_key))
+
+
+def compile_contract(version=8):
+    """Compile the router: returns (approval TEAL, clear TEAL, ARC-4 contract dict)."""
+    # Scratch slots instead of frame pointers: the method bodies are small and this drops the
+    # proto/frame_dig bookkeeping from every call
+    approval, clear, contract = router.compile_program(
+        version=version, optimize=OptimizeOptions(scratch_slots=True, frame_pointers=False)
+    )
+    spec = contract.dictify()
+    # Flag read-only methods per ARC-22
+    for method in spec["methods"]:
+        if method["name"] in READ_ONLY_METHODS:
+            method["readonly"] = True
+    return approval, clear, spec
 
 if __name__ == "__main__":
+    approval, clear, spec = compile_contract()
+
     with open("streamfi_approval.teal", "w") as f:
-        compiled = compileTeal(approval_program(), mode=Mode.Application, version=8)
-        f.write(compiled)
-    
+        f.write(approval)
+
     with open("streamfi_clear.teal", "w") as f:
-        compiled = compileTeal(clear_program(), mode=Mode.Application, version=8)
-        f.write(compiled)
-    
+        f.write(clear)
+
+    with open("streamfi.json", "w") as f:
+        json.dump(spec, f, indent=2)
+
     print("✅ Contracts compiled to TEAL!")
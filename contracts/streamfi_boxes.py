@@ -0,0 +1,236 @@
+from pyteal import *
+import json
+
+# Multi-stream version of streamfi.py: one application holds every worker's stream in a box
+# keyed by the worker's 32-byte address, instead of one application per worker.
+#
+# Box layout (40 bytes, five big-endian uint64 fields):
+#   rate        payout per second
+#   last        timestamp accrual was last settled at
+#   accrued     settled but not yet claimed
+#   claimed     total paid out so far
+#   paused      1 while the stream is paused
+#
+# Payouts are in microAlgos until the employer opts the app into an ASA (opt_in_asset);
+# from then on rates are base units of that asset per second and every payout is an
+# inner AssetTransfer of it, the same STRM the backend streams. Inner transactions carry
+# no fee of their own, so calls that pay out must cover one extra minimum fee, and calls
+# that pay in the asset must list it in their foreign assets.
+#
+# Like streamfi.py this is an ABI router: calls start with the method selector from
+# streamfi_boxes.json, and worker arguments are ABI addresses.
+RATE = 0
+LAST_UPDATE = 8
+ACCRUED = 16
+CLAIMED = 24
+PAUSED = 32
+STREAM_SIZE = 40
+
+# Global state: 1 uint (asset) and 1 byte slice (employer); streams live in boxes
+GLOBAL_UINTS = 1
+GLOBAL_BYTE_SLICES = 1
+
+# Minimum balance the app account needs per stream box: 2500 + 400 * (key length + box size)
+BOX_MBR = 2500 + 400 * (32 + STREAM_SIZE)
+
+# Global state keys
+employer_key = Bytes("employer")
+asset_key = Bytes("asset")  # Payout ASA, 0 while paying in microAlgos
+
+# Every method is a NoOp app call; updates, deletes and opt-ins are rejected by the router
+router = Router(
+    "streamfi_boxes",
+    BareCallActions(),
+    clear_state=Approve(),
+)
+
+# Scratch space for the stream being worked on (no state writes for intermediates)
+worker_scratch = ScratchVar(TealType.bytes)
+stream = ScratchVar(TealType.bytes)
+owed = ScratchVar(TealType.uint64)
+
+
+def is_employer():
+    return Txn.sender() == App.globalGet(employer_key)
+
+
+def field(offset):
+    return ExtractUint64(stream.load(), Int(offset))
+
+
+def set_field(offset, value):
+    return stream.store(Replace(stream.load(), Int(offset), Itob(value)))
+
+
+def load_stream(address):
+    box = App.box_get(address)
+    return Seq([
+        worker_scratch.store(address),
+        box,
+        Assert(box.hasValue()),
+        stream.store(box.value()),
+    ])
+
+
+def save_stream():
+    return App.box_put(worker_scratch.load(), stream.load())
+
+
+# Move accrual since the last update into the accrued bucket (nothing accrues while paused)
+def settle():
+    return Seq([
+        If(field(PAUSED) == Int(0)).Then(
+            set_field(ACCRUED, field(ACCRUED) + (Global.latest_timestamp() - field(LAST_UPDATE)) * field(RATE))
+        ),
+        set_field(LAST_UPDATE, Global.latest_timestamp()),
+    ])
+
+
+def pay(receiver, amount):
+    return If(App.globalGet(asset_key) == Int(0)).Then(
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.Payment,
+            TxnField.receiver: receiver,
+            TxnField.amount: amount,
+            TxnField.fee: Int(0)
+        })
+    ).Else(
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: App.globalGet(asset_key),
+            TxnField.asset_receiver: receiver,
+            TxnField.asset_amount: amount,
+            TxnField.fee: Int(0)
+        })
+    )
+
+
+# Initialize the payroll app
+@router.method(no_op=CallConfig.CREATE)
+def create():
+    return Seq([
+        App.globalPut(employer_key, Txn.sender()),
+        App.globalPut(asset_key, Int(0)),
+    ])
+
+
+# Employer opts the app into the payout ASA. Set once: rates already agreed in one unit
+# must not silently change meaning
+@router.method
+def opt_in_asset(asset: abi.Asset):
+    return Seq([
+        Assert(is_employer()),
+        Assert(App.globalGet(asset_key) == Int(0)),
+        App.globalPut(asset_key, asset.asset_id()),
+        InnerTxnBuilder.Execute({
+            TxnField.type_enum: TxnType.AssetTransfer,
+            TxnField.xfer_asset: asset.asset_id(),
+            TxnField.asset_receiver: Global.current_application_address(),
+            TxnField.asset_amount: Int(0),
+            TxnField.fee: Int(0)
+        }),
+    ])
+
+
+# Employer opens a stream for `worker` at `rate` per second
+@router.method
+def create_stream(worker: abi.Address, rate: abi.Uint64):
+    return Seq([
+        Assert(is_employer()),
+        # box_create returns 0 when the box already exists, so a stream cannot be opened twice
+        Assert(App.box_create(worker.get(), Int(STREAM_SIZE))),
+        App.box_put(
+            worker.get(),
+            Concat(
+                Itob(rate.get()),
+                Itob(Global.latest_timestamp()),
+                Itob(Int(0)),
+                Itob(Int(0)),
+                Itob(Int(0))
+            )
+        ),
+    ])
+
+
+# Employer pauses a stream: accrual so far is kept, nothing accrues until resumed
+@router.method
+def pause(worker: abi.Address):
+    return Seq([
+        Assert(is_employer()),
+        load_stream(worker.get()),
+        Assert(field(PAUSED) == Int(0)),
+        settle(),
+        set_field(PAUSED, Int(1)),
+        save_stream(),
+    ])
+
+
+# Employer resumes a paused stream from now
+@router.method
+def resume(worker: abi.Address):
+    return Seq([
+        Assert(is_employer()),
+        load_stream(worker.get()),
+        Assert(field(PAUSED) == Int(1)),
+        set_field(LAST_UPDATE, Global.latest_timestamp()),
+        set_field(PAUSED, Int(0)),
+        save_stream(),
+    ])
+
+
+# Worker claims everything accrued on their own stream; returns the amount paid out
+@router.method
+def claim(*, output: abi.Uint64):
+    return Seq([
+        load_stream(Txn.sender()),
+        settle(),
+        owed.store(field(ACCRUED)),
+        Assert(owed.load() > Int(0)),
+        set_field(ACCRUED, Int(0)),
+        set_field(CLAIMED, field(CLAIMED) + owed.load()),
+        save_stream(),
+        pay(Txn.sender(), owed.load()),
+        output.set(owed.load()),
+    ])
+
+
+# Employer closes a stream: the worker is paid what is owed and the box (and its MBR) is freed
+@router.method
+def close(worker: abi.Address):
+    return Seq([
+        Assert(is_employer()),
+        load_stream(worker.get()),
+        settle(),
+        owed.store(field(ACCRUED)),
+        Pop(App.box_delete(worker_scratch.load())),
+        If(owed.load() > Int(0)).Then(pay(worker_scratch.load(), owed.load())),
+    ])
+
+
+# Fund contract
+@router.method
+def fund():
+    return Assert(is_employer())
+
+
+def compile_contract(version=8):
+    """Compile the router: returns (approval TEAL, clear TEAL, ARC-4 contract dict)."""
+    # Same options as streamfi.py: scratch slots instead of frame pointers
+    approval, clear, contract = router.compile_program(
+        version=version, optimize=OptimizeOptions(scratch_slots=True, frame_pointers=False)
+    )
+    return approval, clear, contract.dictify()
+
+if __name__ == "__main__":
+    approval, clear, spec = compile_contract()
+
+    with open("streamfi_boxes_approval.teal", "w") as f:
+        f.write(approval)
+
+    with open("streamfi_boxes_clear.teal", "w") as f:
+        f.write(clear)
+
+    with open("streamfi_boxes.json", "w") as f:
+        json.dump(spec, f, indent=2)
+
+    print("✅ Box-storage contracts compiled to TEAL!")
@@ -3,17 +3,21 @@ StreamFi TestNet Transaction Demo
 Simple STRM token transfer - Perfect for hackathon demo!
 """
 
-from algosdk import account, mnemonic
-from algosdk.v2client import algod
+from algosdk.error import AlgodHTTPError
 from algosdk.transaction import AssetTransferTxn, wait_for_confirmation
+import os
+import sys
+
+# Shared backend helpers (pooled/multi-node algod client, cached suggested params, signer) live in ../backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from algod_router import create_routed_client
+from params_provider import SuggestedParamsProvider
+from signer_service import create_signer
 
 # TestNet Configuration
 ALGOD_ADDRESS = "https://testnet-api.algonode.cloud"
 ALGOD_TOKEN = ""
 
-# Your creator account
-CREATOR_MNEMONIC = "cluster coin olympic congress ribbon lamp despair maple dizzy disagree undo inquiry purchase hamster curve nuclear topic shaft evil glide loud soldier talk absent wool"
-
 # STRM Token Asset ID
 STRM_ASSET_ID = 749531304
 
@@ -34,23 +38,26 @@ def send_strm_tokens():
         print()
         
         # Initialize Algod client
-        algod_client = algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+        algod_client = create_routed_client(ALGOD_TOKEN, ALGOD_ADDRESS)
+        params_provider = SuggestedParamsProvider(algod_client)
         
-        # Get private key
-        sender_private_key = mnemonic.to_private_key(CREATOR_MNEMONIC)
+        # Signer for the creator account (signer service if STREAMFI_SIGNER_SOCKET is set, else the
+        # key from STREAMFI_SIGNER_MNEMONIC_FILE / STREAMFI_SIGNER_MNEMONIC)
+        signer = create_signer(allow_local=True)
         
-        # Check balance
+        # Check balance (exclude="all" skips the account's asset/app lists; ALGO amount only)
         print("📊 Checking Account Info...")
-        account_info = algod_client.account_info(CREATOR_ADDRESS)
+        account_info = algod_client.account_info(CREATOR_ADDRESS, exclude="all")
         algo_balance = account_info.get('amount') / 1_000_000
         
-        # Find STRM token balance
-        assets = account_info.get('assets', [])
-        strm_balance = 0
-        for asset in assets:
-            if asset['asset-id'] == STRM_ASSET_ID:
-                strm_balance = asset['amount'] / 100  # 2 decimals
-                break
+        # STRM token balance: ask for the one holding instead of scanning every asset of the account
+        try:
+            holding = algod_client.account_asset_info(CREATOR_ADDRESS, STRM_ASSET_ID)["asset-holding"]
+            strm_balance = holding['amount'] / 100  # 2 decimals
+        except AlgodHTTPError as e:
+            if e.code != 404:
+                raise
+            strm_balance = 0  # Not opted in to STRM
         
         print(f"   Address: {CREATOR_ADDRESS[:10]}...{CREATOR_ADDRESS[-10:]}")
         print(f"   ALGO Balance: {algo_balance:.2f} ALGO")
@@ -68,8 +75,8 @@ def send_strm_tokens():
         print(f"   Asset ID: {STRM_ASSET_ID}")
         print()
         
-        # Get suggested params
-        params = algod_client.suggested_params()
+        # Get suggested params (cached by the shared provider)
+        params = params_provider.get()
         
         # Create asset transfer transaction
         txn = AssetTransferTxn(
@@ -81,7 +88,7 @@ def send_strm_tokens():
         )
         
         # Sign transaction
-        signed_txn = txn.sign(sender_private_key)
+        signed_txn = signer.sign(txn)
         
         # Send transaction
         print("📤 Sending transaction to blockchain...")
@@ -16,6 +16,7 @@ const employees = [
 const balances = Array(employees.length).fill(0);
 const loggedIn = Array(employees.length).fill(false);
 const balanceIntervals = {};
+const balanceStreams = {};
 
 // SVG Leaf Icons - YOUR CUSTOM DESIGN! 🍃
 const svg1 = `<svg class="icon-1" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 26.3 65.33" style="shape-rendering:geometricPrecision; text-rendering:geometricPrecision; image-rendering:optimizeQuality; fill-rule:evenodd; clip-rule:evenodd" version="1.1" xml:space="preserve" xmlns="http://www.w3.org/2000/svg"><defs></defs><g id="Layer_x0020_1"><metadata id="CorelCorpID_0Corel-Layer"></metadata><path d="M13.98 52.87c0.37,-0.8 0.6,-1.74 0.67,-2.74 1.01,1.1 2.23,2.68 1.24,3.87 -0.22,0.26 -0.41,0.61 -0.59,0.97 -2.95,5.89 3.44,10.87 2.98,0.78 0.29,0.23 0.73,0.82 1.03,1.18 0.33,0.4 0.7,0.77 1,1.15 0.29,0.64 -0.09,2.68 1.77,4.91 5.42,6.5 5.67,-2.38 0.47,-4.62 -0.41,-0.18 -0.95,-0.26 -1.28,-0.54 -0.50,-0.41 -1.23,-1.37 -1.66,-1.9 0.03,-0.43 -0.17,-0.13 0.11,-0.33 4.98,1.72 8.4,-1.04 2.38,-3.16 -1.98,-0.7 -2.9,-0.36 -4.72,0.16 -0.63,-0.58 -2.38,-3.82 -2.82,-4.76 1.21,0.56 1.72,1.17 3.47,1.3 6.5,0.5 2.31,-4.21 -2.07,-4.04 -1.12,0.04 -1.62,0.37 -2.49,0.62l-1.25 -3.11c0.03,-0.26 0.01,-0.18 0.1,-0.28 1.35,0.86 1.43,1 3.25,1.45 2.35,0.15 3.91,-0.15 1.75,-2.4 -1.22,-1.27 -2.43,-2.04 -4.22,-2.23l-2.08 0.13c-0.35,-0.58 -0.99,-2.59 -1.12,-3.3l-0.01 -0.01 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0c-0.24,-0.36 1.88,1.31 2.58,1.57 1.32,0.49 2.6,0.33 3.82,0 -0.37,-1.08 -1.17,-2.31 -2.13,-3.11 -1.79,-1.51 -3.07,-1.41 -5.22,-1.38l-0.93 -4.07c0.41,-0.57 1.41,0.9 2.82,1.36 0.96,0.31 1.94,0.41 3,0.14 2,-0.52 -2.25,-4.4 -4.53,-4.71 -0.7,-0.1 -1.23,-0.04 -1.92,-0.03 -0.46,-0.82 -0.68,-3.61 -0.92,-4.74 0.8,0.88 1.15,1.54 2.25,2.23 0.8,0.5 1.58,0.78 2.57,0.85 2.54,0.18 -0.1,-3.47 -0.87,-4.24 -1.05,-1.05 -2.34,-1.59 -4.32,-1.78l-0.33 -3.49c0.83,0.67 1.15,1.48 2.3,2.16 1.07,0.63 2.02,0.89 3.58,0.79 0.15,-1.34 -1.07,-3.39 -2.03,-4.3 -1.05,-0.99 -2.08,-1.47 -3.91,-1.68l-0.07 -3.27 0.32 -0.65c0.44,0.88 1.4,1.74 2.24,2.22 0.69,0.39 2.4,1.1 3.44,0.67 0.31,-1.92 -1.84,-4.49 -3.5,-5.29 -0.81,-0.39 -1.61,-0.41 -2.18,-0.68 -0.12,-1.28 0.27,-3.23 0.37,-4.55l-0.89 0c-0.06,1.28 -0.35,3.12 -0.34,4.31 -0.44,0.45 -0.37,0.42 -0.96,0.64 -3.88,1.49 -4.86,6.38 -3.65,7.34 1.42,-0.31 3.69,-2.14 4.16,-3.66 0.23,0.50 0.10,2.36 0.05,3.05 -1.23,0.40 -2.19,1.05 -2.92,1.82 -1.17,1.24 -2.36,4.04 -1.42,5.69 1.52,0.09 4.07,-2.49 4.49,-4.07l0.29 3.18c-2.81,0.96 -5.01,3.68 -4.18,7.43 2.06,-0.09 3.78,-2.56 4.66,-4.15 0.23,1.45 0.67,3.06 0.74,4.52 -1.26,0.93 -2.37,1.8 -2.97,3.55 -0.48,1.4 -0.49,3.72 0.19,4.55 0.59,0.71 2.06,-1.17 2.42,-1.67 1,-1.35 0.81,-1.92 1.29,-2.46l0.7 3.44c-0.49,0.45 -0.94,0.55 -1.5,1.19 -1.93,2.23 -2.14,4.33 -1.01,6.92 0.72,0.09 2.04,-1.40 2.49,-2.06 0.65,-0.95 0.79,-1.68 1.14,-2.88l0.97 2.92c-0.20,0.55 -1.84,1.32 -2.6,3.62 -0.54,1.62 -0.37,3.86 0.67,4.93 0.58,-0.09 1.85,-1.61 2.2,-2.19 0.66,-1.09 0.66,-1.64 1,-2.93l1.32 3.18c-0.23,0.72 -1.63,1.72 -1.82,4.18 -0.17,2.16 1.11,6.88 3.13,2.46zm-4.09 -16.89l-0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 -0 0.01 0.01z" class="fil0"></path></g></svg>`;
@@ -41,10 +42,8 @@ async function handleLogin(index) {
             loggedIn[index] = true;
             balances[index] = 0;
             
-            // Start balance update interval
-            balanceIntervals[employee.name] = setInterval(async () => {
-                await updateBalance(index);
-            }, 1000);
+            // Follow the session over Server-Sent Events (falls back to polling)
+            startBalanceStream(index);
             
             showNotification(`✅ ${employee.name} logged in! Streaming started.`, 'success');
             renderEmployees();
@@ -54,7 +53,7 @@ async function handleLogin(index) {
     }
 }
 
-// Update balance from backend
+// Update balance from backend (polling fallback when event streams are unavailable)
 async function updateBalance(index) {
     const employee = employees[index];
     
@@ -67,26 +66,106 @@ async function updateBalance(index) {
         
         const data = await response.json();
         balances[index] = data.balance;
-        
-        // Update UI
-        const card = document.querySelector(`[data-employee-index="${index}"]`);
-        if (card) {
-            const balanceElement = card.querySelector('.balance-value');
-            const claimButton = card.querySelector('.claim-button');
-            
-            if (balanceElement) {
-                balanceElement.textContent = `${balances[index].toFixed(2)} STRM`;
-            }
-            
-            if (claimButton) {
-                claimButton.innerHTML = `${svg1}${svg2}${svg3}Claim ${balances[index].toFixed(2)} STRM`;
-            }
-        }
+        renderBalance(index);
     } catch (error) {
         console.error(`Error updating balance for ${employee.name}:`, error);
     }
 }
 
+// Poll /api/balance every second (used only if the event stream cannot be opened)
+function startBalancePolling(index) {
+    const employee = employees[index];
+    if (balanceIntervals[employee.name]) return;
+    
+    balanceIntervals[employee.name] = setInterval(async () => {
+        await updateBalance(index);
+    }, 1000);
+}
+
+// Subscribe to session events and extrapolate the balance locally.
+// The backend sends start_time/rate once and again only after a claim or logout,
+// so an open dashboard costs one connection instead of one request per second.
+function startBalanceStream(index) {
+    const employee = employees[index];
+    
+    if (typeof EventSource === 'undefined') {
+        startBalancePolling(index);
+        return;
+    }
+    
+    const source = new EventSource(`${API_URL}/balance/stream?name=${encodeURIComponent(employee.name)}`);
+    const stream = { source, session: null, ticker: null };
+    balanceStreams[employee.name] = stream;
+    
+    source.addEventListener('session', (event) => {
+        const session = JSON.parse(event.data);
+        // Correct for clock skew between browser and server
+        session.clockOffset = Date.now() / 1000 - session.server_time;
+        stream.session = session;
+        
+        if (!stream.ticker) {
+            stream.ticker = setInterval(() => {
+                if (!stream.session) return;
+                const now = Date.now() / 1000 - stream.session.clockOffset;
+                const elapsed = Math.max(0, now - stream.session.start_time);
+                // Same integer math as the backend: carried + floor(accrued base units) - claimed base units.
+                // Rounding down means a claim for the displayed amount never exceeds the accrual.
+                const carried = stream.session.carried_base_units || 0;
+                const accrued = carried + Math.floor(elapsed * stream.session.rate_base_units);
+                balances[index] = Math.max(0, accrued - stream.session.total_claimed_base_units) / 100;
+                renderBalance(index);
+            }, 1000);
+        }
+    });
+    
+    source.addEventListener('logout', () => {
+        stream.session = null;
+        balances[index] = 0;
+        renderBalance(index);
+    });
+    
+    source.onerror = () => {
+        // Never received a session: no stream support or the backend is at its stream limit, fall back to polling
+        if (!stream.session) {
+            stopBalanceStream(employee.name);
+            startBalancePolling(index);
+        }
+        // Otherwise EventSource reconnects by itself and resends the session snapshot
+    };
+}
+
+// Close the event stream and any polling interval for an employee
+function stopBalanceStream(name) {
+    const stream = balanceStreams[name];
+    if (stream) {
+        stream.source.close();
+        if (stream.ticker) clearInterval(stream.ticker);
+        delete balanceStreams[name];
+    }
+    
+    if (balanceIntervals[name]) {
+        clearInterval(balanceIntervals[name]);
+        delete balanceIntervals[name];
+    }
+}
+
+// Write the current balance into the employee card
+function renderBalance(index) {
+    const card = document.querySelector(`[data-employee-index="${index}"]`);
+    if (card) {
+        const balanceElement = card.querySelector('.balance-value');
+        const claimButton = card.querySelector('.claim-button');
+        
+        if (balanceElement) {
+            balanceElement.textContent = `${balances[index].toFixed(2)} STRM`;
+        }
+        
+        if (claimButton) {
+            claimButton.innerHTML = `${svg1}${svg2}${svg3}Claim ${balances[index].toFixed(2)} STRM`;
+        }
+    }
+}
+
 // Claim tokens button handler
 async function handleClaim(index) {
     const employee = employees[index];
@@ -145,11 +224,8 @@ async function handleLogout(index) {
         loggedIn[index] = false;
         balances[index] = 0;
         
-        // Stop balance update interval
-        if (balanceIntervals[employee.name]) {
-            clearInterval(balanceIntervals[employee.name]);
-            delete balanceIntervals[employee.name];
-        }
+        // Stop the balance stream / polling interval
+        stopBalanceStream(employee.name);
         
         showNotification(`✅ ${employee.name} logged out!`, 'success');
         renderEmployees();
@@ -0,0 +1,88 @@
+"""
+Shared fixtures: the Flask backend wired to fake_algod.FakeAlgodClient.
+server.py builds its clients, stores and signer at import time, so the environment
+below is set before anything imports it: a throwaway local signing key (the fake does
+not check signatures), no indexer, and a ledger in a temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+from algosdk import account, mnemonic
+
+os.environ["STREAMFI_ALLOW_LOCAL_SIGNER"] = "1"
+os.environ["STREAMFI_SIGNER_MNEMONIC"] = mnemonic.from_private_key(account.generate_account()[0])
+os.environ.pop("STREAMFI_SIGNER_SOCKET", None)
+os.environ.pop("STREAMFI_SIGNER_MNEMONIC_FILE", None)
+os.environ.pop("STREAMFI_SESSION_DB", None)
+os.environ["STREAMFI_INDEXER_ADDRESS"] = "off"
+os.environ["STREAMFI_HISTORY_DB"] = os.path.join(tempfile.mkdtemp(prefix="streamfi-tests-"), "history.db")
+os.environ["STREAMFI_LOG_LEVEL"] = "OFF"
+
+import pytest
+
+import server
+from fake_algod import FakeAlgodClient
+from idempotency_store import InMemoryIdempotencyStore
+from reconciliation import ClaimHistory
+from treasury import TreasuryCache
+
+
+class ScriptedAlgod(FakeAlgodClient):
+    """
+    FakeAlgodClient whose next submissions can fail the way a real node or proxy does.
+    `submit_outcomes` is consumed one entry per submission:
+        None      accepted normally
+        "lost"    accepted, but the response never arrives (raises like a read timeout)
+        "5xx"     a gateway error; the transaction never reached the node
+        "400"     refused by algod (e.g. overspend)
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.submit_outcomes = []
+
+    def send_transactions(self, txns, **kwargs):
+        from algosdk.error import AlgodHTTPError
+
+        outcome = self.submit_outcomes.pop(0) if self.submit_outcomes else None
+        if outcome == "lost":
+            super().send_transactions(txns, **kwargs)
+            raise AlgodHTTPError("algod request timed out after 10s")
+        if outcome == "5xx":
+            raise AlgodHTTPError("bad gateway", 502)
+        if outcome == "400":
+            raise AlgodHTTPError("overspend", 400)
+        return super().send_transactions(txns, **kwargs)
+
+
+@pytest.fixture
+def algod(monkeypatch, tmp_path):
+    """A funded ScriptedAlgod behind fresh per-test stores (idempotency, ledger, treasury)."""
+    fake = ScriptedAlgod(round_time=0.1)
+    monkeypatch.setattr(server, "idempotency_store", InMemoryIdempotencyStore())
+    monkeypatch.setattr(server, "claim_history", ClaimHistory(str(tmp_path / "history.db")))
+    monkeypatch.setattr(server, "treasury", TreasuryCache(fake, server.COMPANY_ADDRESS, server.STRM_ASSET_ID))
+    server.set_algod_client(fake)
+    monkeypatch.setattr(server.block_follower, "round_timeout", 0.5)
+    fake.credit(server.COMPANY_ADDRESS, 10 ** 12, asset_id=server.STRM_ASSET_ID)
+    return fake
+
+
+@pytest.fixture
+def client(algod):
+    return server.create_app(start_background=False).test_client()
+
+
+@pytest.fixture
+def employee(client, request):
+    """A logged-in employee (unique per test) whose accrual covers a 1 STRM claim right away."""
+    name = f"test-{request.node.name}"
+    server.roster.add([{"name": name, "designation": "Test", "rate": 100_000}])
+    response = client.post("/api/login", json={"name": name})
+    assert response.status_code == 200
+    return name
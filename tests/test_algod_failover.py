@@ -0,0 +1,131 @@
+"""Retry and failover rules of algod_pool.PooledAlgodClient and algod_router.AlgodRouter."""
+
+import socket
+import threading
+
+import pytest
+from algosdk import error
+
+from algod_pool import AlgodConnectionError, PooledAlgodClient, submission_rejected
+from algod_router import AlgodRouter
+from fake_algod import FakeAlgodClient
+
+
+class DroppingNode:
+    """
+    Minimal HTTP/1.1 server whose keep-alive connections die after one answered request:
+    the second request on a connection is read and then the socket is closed unanswered.
+    Counts the requests it received per method.
+    """
+
+    def __init__(self):
+        self.hits = {"GET": 0, "POST": 0}
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen()
+        self.address = f"http://127.0.0.1:{self._sock.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self._sock.accept()
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        stream = conn.makefile("rb")
+        for answered in range(2):
+            line = stream.readline()
+            if not line:
+                return
+            length = 0
+            while True:
+                header = stream.readline()
+                if header in (b"\r\n", b""):
+                    break
+                if header.lower().startswith(b"content-length"):
+                    length = int(header.split(b":")[1])
+            stream.read(length)
+            self.hits[line.split()[0].decode()] += 1
+            if answered == 1:
+                conn.close()
+                return
+            body = b'{"txId":"TX","last-round":1}'
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                         % len(body) + body)
+
+
+def test_get_is_resent_on_a_stale_connection():
+    node = DroppingNode()
+    client = PooledAlgodClient("", node.address, retries=0)
+    client.algod_request("GET", "/status")
+    # The pooled connection dies under the second GET; it is safe to resend on a fresh one
+    assert client.algod_request("GET", "/status")["last-round"] == 1
+    assert node.hits["GET"] == 3
+
+
+def test_post_is_not_resent_on_a_stale_connection():
+    node = DroppingNode()
+    client = PooledAlgodClient("", node.address, retries=0)
+    client.algod_request("GET", "/status")
+    # The node read the submission before the connection died: resending could double it
+    with pytest.raises(error.AlgodHTTPError) as raised:
+        client.algod_request("POST", "/transactions", data=b"signed")
+    assert node.hits["POST"] == 1
+    assert not submission_rejected(raised.value)  # Uncertain, so a claim keeps its reservation
+
+
+class ScriptedNode(FakeAlgodClient):
+    """FakeAlgodClient behind algod_request, failing the next calls with the queued errors."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = []
+        self.requests = []
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None,
+                      response_format="json", timeout=None):
+        self.requests.append((method, requrl))
+        if self.failures:
+            raise self.failures.pop(0)
+        if requrl == "/status":
+            return self.status()
+        if requrl == "/transactions":
+            return {"txId": "TX"}
+        raise error.AlgodHTTPError("not found", 404)
+
+
+def routed(*nodes):
+    router = AlgodRouter("", [f"http://node{i}" for i in range(len(nodes))])
+    for state, node in zip(router.nodes, nodes):
+        state.client = node
+    router.probe()
+    return router
+
+
+def test_get_fails_over_to_the_next_node():
+    first, second = ScriptedNode(), ScriptedNode()
+    router = routed(first, second)
+    leader = router.ranked_nodes()[0].client
+    leader.failures = [error.AlgodHTTPError("bad gateway", 502)]
+    assert "last-round" in router.algod_request("GET", "/status")
+    assert router.failovers == 1
+
+
+def test_post_fails_over_only_when_the_node_was_never_reached():
+    first, second = ScriptedNode(), ScriptedNode()
+    router = routed(first, second)
+    leader = router.ranked_nodes()[0].client
+    leader.failures = [AlgodConnectionError("connection refused")]
+    assert router.algod_request("POST", "/transactions", data=b"signed") == {"txId": "TX"}
+
+
+def test_post_is_not_resubmitted_after_a_gateway_error():
+    first, second = ScriptedNode(), ScriptedNode()
+    router = routed(first, second)
+    leader = router.ranked_nodes()[0].client
+    leader.failures = [error.AlgodHTTPError("bad gateway", 502)]
+    with pytest.raises(error.AlgodHTTPError) as raised:
+        router.algod_request("POST", "/transactions", data=b"signed")
+    assert not submission_rejected(raised.value)  # The caller keeps the claim's reservation
+    other = second if leader is first else first
+    assert ("POST", "/transactions") not in other.requests
@@ -0,0 +1,116 @@
+"""Claim, submission-failure and idempotent-replay paths of server.py against the fake algod."""
+
+import time
+
+import server
+
+
+def claim(client, name, key=None, **fields):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post("/api/claim", json={"name": name, "amount": 1, **fields}, headers=headers)
+
+
+def reserved(name):
+    return server.session_store.get(name)["total_claimed"]
+
+
+def test_claim_confirms(client, algod, employee):
+    response = claim(client, employee)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["block"] > 0
+    assert algod.pending_transaction_info(body["transaction_id"])["confirmed-round"] == body["block"]
+    assert reserved(employee) == 100
+
+
+def test_rejected_submit_releases_reservation(client, algod, employee):
+    algod.submit_outcomes = ["400"]
+    response = claim(client, employee, key="rejected")
+    assert response.status_code == 500
+    assert reserved(employee) == 0
+    # Nothing reached the network, so the key is free for a retry
+    assert server.idempotency_store.get(f"{employee}:rejected") is None
+
+
+def test_ambiguous_submit_keeps_reservation(client, algod, employee):
+    algod.submit_outcomes = ["5xx"]
+    response = claim(client, employee, key="ambiguous")
+    assert response.status_code == 500
+    # A gateway error does not prove algod never took the transfer
+    assert reserved(employee) == 100
+    record = server.idempotency_store.get(f"{employee}:ambiguous")
+    assert record["status"] == "in_progress"
+    assert record["transaction_id"] is not None
+
+
+def test_lost_response_still_confirms(client, algod, employee):
+    algod.submit_outcomes = ["lost"]
+    response = claim(client, employee)
+    assert response.status_code == 200
+    assert response.get_json()["block"] > 0
+    assert reserved(employee) == 100
+
+
+def test_idempotent_replay_sends_once(client, algod, employee):
+    first = claim(client, employee, key="replay")
+    assert first.status_code == 200
+    second = claim(client, employee, key="replay")
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.get_json() == first.get_json()
+    assert algod.call_counts()["send_transactions"] == 1
+    assert reserved(employee) == 100
+
+
+def test_replay_with_different_amount_is_refused(client, algod, employee):
+    assert claim(client, employee, key="fingerprint").status_code == 200
+    response = client.post("/api/claim", json={"name": employee, "amount": 2},
+                           headers={"Idempotency-Key": "fingerprint"})
+    assert response.status_code == 422
+
+
+def test_replay_resolves_a_lost_submission_that_landed(client, algod, employee, monkeypatch):
+    # The first attempt's transfer landed but its confirmation wait gave up
+    monkeypatch.setattr(server.block_follower, "round_timeout", 0.01)
+    algod.submit_outcomes = ["lost"]
+    assert claim(client, employee, key="late").status_code == 500
+    time.sleep(0.3)
+    response = claim(client, employee, key="late")
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert algod.call_counts()["send_transactions"] == 1
+
+
+def test_replay_restarts_a_claim_whose_transaction_expired(client, algod, employee):
+    algod.submit_outcomes = ["5xx"]
+    assert claim(client, employee, key="expired").status_code == 500
+    # Still undecided: the transaction could land until its last valid round
+    assert claim(client, employee, key="expired").status_code == 409
+
+    record = server.idempotency_store.get(f"{employee}:expired")
+    ledger = server.claim_history.claim(record["claim_id"])
+    server.claim_history.store_transfers([], ledger["last_valid"])  # Followed past it, nothing landed
+
+    response = claim(client, employee, key="expired")
+    assert response.status_code == 200
+    assert algod.call_counts()["send_transactions"] == 1  # The gateway error never reached the node
+    assert reserved(employee) == 100  # Released once, then reserved again for the new transfer
+
+
+def test_async_claim_record_stays_pending_until_confirmed(client, algod, employee):
+    response = claim(client, employee, key="async", **{"async": True})
+    assert response.status_code == 202
+    key = f"{employee}:async"
+    assert server.idempotency_store.get(key)["status"] == "in_progress"
+
+    deadline = time.monotonic() + 5
+    while server.idempotency_store.get(key)["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.05)
+    record = server.idempotency_store.get(key)
+    assert record["status"] == "completed"
+    assert record["response_status"] == 200
+    assert record["response_body"]["block"] > 0
+
+    replay = claim(client, employee, key="async", **{"async": True})
+    assert replay.status_code == 200
+    assert replay.get_json()["block"] == record["response_body"]["block"]